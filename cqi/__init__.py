@@ -1,6 +1,7 @@
 # flake8: noqa
 from .api import APIClient
 from .client import CQiClient
+from .pool import BatchExecutor, SessionPool
 from .version import version, version_info
 
 __title__: str = 'CQi'
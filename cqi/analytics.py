@@ -0,0 +1,430 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple, Union, TYPE_CHECKING
+if TYPE_CHECKING:
+    from .api import APIClient
+    from .models.attributes import (
+        AlignmentAttribute,
+        PositionalAttribute,
+        StructuralAttribute
+    )
+    from .models.corpora import Corpus
+from .constants import FIELD_MATCH, FIELD_MATCHEND
+from .measures import (
+    association_measures,
+    dp,
+    juilland_d,
+    keyness_measures
+)
+
+
+class MatchAnalyticsMixin:
+    '''
+    Analyses of a set of matches that only need their number and dumps of
+    their corpus positions, shared by subcorpora (see
+    cqi.models.subcorpora.Subcorpus) and match sets (see
+    cqi.matchsets.MatchSet). Subclasses implement size and dump.
+    '''
+
+    __slots__ = ()
+
+    @property
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def dump(self, field: int, first: int, last: int) -> List[int]:
+        raise NotImplementedError
+
+    def aligned_regions(
+        self,
+        alignment_attribute: 'AlignmentAttribute',
+        target_attribute: 'PositionalAttribute',
+        field: int = FIELD_MATCH,
+        first: int = 0,
+        last: Optional[int] = None
+    ) -> List[Optional[List[str]]]:
+        '''
+        the aligned regions of the matches <first> .. <last> in a parallel
+        corpus, e.g. the translations of the sentences containing them
+
+        returns, for each match, the <target_attribute> values of all tokens
+        in the target region of the alignment containing the corpus position
+        at <field>, None for matches outside an alignment
+
+        NB: uses the alignment table (see AlignmentAttribute.alignment_table)
+            and a constant number of round trips.
+        '''
+        if self.size == 0:
+            return []
+        if last is None:
+            last = self.size - 1
+        target_spans: List[Optional[Tuple[int, int]]] = (
+            alignment_attribute.alignment_table().target_cpos_by_cpos(
+                self.dump(field, first, last)
+            )
+        )
+        values: List[str] = target_attribute.values_by_cpos(
+            [
+                cpos for x in target_spans if x is not None
+                for cpos in range(x[0], x[1] + 1)
+            ]
+        )
+        regions: List[Optional[List[str]]] = []
+        offset: int = 0
+        for x in target_spans:
+            if x is None:
+                regions.append(None)
+                continue
+            length: int = x[1] - x[0] + 1
+            regions.append(values[offset:offset + length])
+            offset += length
+        return regions
+
+    def collocates(
+        self,
+        attribute: 'PositionalAttribute',
+        left: int = 5,
+        right: int = 5,
+        measure: str = 'log_likelihood',
+        structural_attribute: Optional['StructuralAttribute'] = None,
+        cutoff: int = 1,
+        limit: Optional[int] = None
+    ) -> List[Tuple[str, int, int, float]]:
+        '''
+        collocates of the matches within a window of <left> tokens before
+        match and <right> tokens after matchend; if <structural_attribute> is
+        given, windows do not cross the boundaries of its enclosing regions;
+        tokens in the overlapping windows of nearby matches are counted once
+
+        returns (value, frequency, corpus_frequency, score) tuples, where
+        score is computed by <measure>, one of
+        - 'log_likelihood'
+        - 'mi'
+        - 't_score'
+        - 'log_dice'
+
+        collocates co-occurring less than <cutoff> times are omitted and at
+        most <limit> tuples are returned
+
+        NB: tuples are sorted by score desc.
+        '''
+        score = association_measures[measure]
+        matches: List[int] = self._dump_all(FIELD_MATCH)
+        matchends: List[int] = self._dump_all(FIELD_MATCHEND)
+        if structural_attribute is None:
+            lbounds: List[int] = [0] * len(matches)
+            rbounds: List[int] = [attribute.size - 1] * len(matchends)
+        else:
+            lbounds = structural_attribute.lbound_by_cpos(matches)
+            rbounds = structural_attribute.rbound_by_cpos(matchends)
+        # Windows of nearby matches overlap, count each token only once
+        cpos_set: Set[int] = set()
+        for match, matchend, lbound, rbound in zip(
+            matches, matchends, lbounds, rbounds
+        ):
+            if lbound == -1 or rbound == -1:
+                continue
+            cpos_set.update(range(max(lbound, match - left), match))
+            cpos_set.update(
+                range(matchend + 1, min(rbound, matchend + right) + 1)
+            )
+        cpos_list: List[int] = sorted(cpos_set)
+        freqs: Counter = Counter(attribute.ids_by_cpos(cpos_list))
+        freqs.pop(-1, None)
+        lexicon_ids: List[int] = [
+            id for id, freq in freqs.items() if freq >= cutoff
+        ]
+        corpus_freqs: List[int] = attribute.freqs_by_ids(lexicon_ids)
+        r1: int = len(cpos_list)
+        n: int = attribute.size
+        rows: List[Tuple[int, int, int, float]] = sorted(
+            (
+                (id, freqs[id], c1, score(freqs[id], r1, c1, n))
+                for id, c1 in zip(lexicon_ids, corpus_freqs)
+            ),
+            key=lambda x: x[3],
+            reverse=True
+        )[:limit]
+        values: List[str] = attribute.values_by_ids([x[0] for x in rows])
+        return [(value, *x[1:]) for value, x in zip(values, rows)]
+
+    def dispersion(
+        self,
+        structural_attribute: 'StructuralAttribute',
+        field: int = FIELD_MATCH
+    ) -> Dict[str, Any]:
+        '''
+        dispersion of the matches across the regions of
+        <structural_attribute>, e.g. texts, based on the corpus positions at
+        <field>
+
+        returns a dict with
+        - 'frequency': number of matches inside a region
+        - 'range': number of regions containing at least one match
+        - 'juilland_d': Juilland's D
+        - 'dp': Gries' deviation of proportions
+        - 'regions': {id: (frequency, relative_frequency)} for all regions
+          containing at least one match, where relative_frequency is the
+          frequency divided by the size of the region in tokens
+        '''
+        region_freqs: Counter = Counter(
+            structural_attribute.ids_by_cpos(self._dump_all(field))
+        )
+        region_freqs.pop(-1, None)
+        sizes: List[int] = structural_attribute.region_table().sizes()
+        freqs: List[int] = [0] * len(sizes)
+        for id, freq in region_freqs.items():
+            freqs[id] = freq
+        return {
+            'frequency': sum(freqs),
+            'range': len(region_freqs),
+            'juilland_d': juilland_d(freqs, sizes),
+            'dp': dp(freqs, sizes),
+            'regions': {
+                id: (freq, freq / sizes[id])
+                for id, freq in sorted(region_freqs.items())
+            }
+        }
+
+    def facet_counts(
+        self,
+        structural_attribute: 'StructuralAttribute',
+        field: int = FIELD_MATCH
+    ) -> Dict[str, int]:
+        '''
+        number of matches per value of the value-bearing
+        <structural_attribute>, e.g. text_genre, based on the corpus
+        positions at <field>; matches not inside a region are not counted
+
+        NB: counted locally on the facet index (see
+            StructuralAttribute.facet_index), sorted by count desc.
+        '''
+        return structural_attribute.facet_index().counts(self._dump_all(field))
+
+    def fdist_span(
+        self,
+        attribute: 'PositionalAttribute',
+        cutoff: int = 0,
+        limit: Optional[int] = None
+    ) -> List[Tuple[Tuple[str, ...], int]]:
+        '''
+        frequency distribution of whole matches (match .. matchend)
+
+        returns (values, frequency) pairs, where values holds the <attribute>
+        values of all tokens in the matched span; spans occurring less than
+        <cutoff> times are omitted and at most <limit> pairs are returned
+
+        NB: pairs are sorted by frequency desc.
+        '''
+        if self.size == 0:
+            return []
+        matches: List[int] = self._dump_all(FIELD_MATCH)
+        matchends: List[int] = self._dump_all(FIELD_MATCHEND)
+        id_list: List[int] = attribute.ids_by_cpos(
+            [
+                cpos for match, matchend in zip(matches, matchends)
+                for cpos in range(match, matchend + 1)
+            ]
+        )
+        # Count spans by their ID sequence, strings are not needed until
+        # the top spans are known.
+        spans: Counter = Counter()
+        offset: int = 0
+        for match, matchend in zip(matches, matchends):
+            length: int = matchend - match + 1
+            spans[tuple(id_list[offset:offset + length])] += 1
+            offset += length
+        top_spans: List[Tuple[Tuple[int, ...], int]] = [
+            x for x in spans.most_common(limit) if x[1] >= cutoff
+        ]
+        lexicon_ids: List[int] = sorted({
+            id for span, _ in top_spans for id in span
+        })
+        values: Dict[int, str] = dict(
+            zip(lexicon_ids, attribute.values_by_ids(lexicon_ids))
+        )
+        return [
+            (tuple(values[id] for id in span), freq)
+            for span, freq in top_spans
+        ]
+
+    def keyness(
+        self,
+        attribute: 'PositionalAttribute',
+        reference: Union['MatchAnalyticsMixin', 'Corpus'],
+        field: int = FIELD_MATCH,
+        measure: str = 'log_likelihood',
+        limit: Optional[int] = None
+    ) -> List[Tuple[str, int, int, float]]:
+        '''
+        keyness of the <attribute> values at <field> compared to <reference>,
+        which is either another subcorpus or match set (compared at the same
+        field) or a corpus; a corpus reference is the rest of the corpus,
+        i.e. the corpus frequencies minus the target frequencies, and only
+        values occurring in the target are scored
+
+        returns (value, frequency, reference_frequency, score) tuples, where
+        score is computed by <measure>, one of
+        - 'log_likelihood'
+        - 'percent_diff'
+        - 'log_ratio'
+
+        at most <limit> tuples are returned, none if the target or the
+        reference is empty
+
+        raises ValueError if the target, <reference> and <attribute> are not
+        all of the same corpus, as their lexicon IDs could not be compared;
+        match sets are assumed to be of the corpus of <attribute>
+
+        NB: tuples are sorted by score desc.
+        '''
+        score = keyness_measures[measure]
+        corpus_names: Set[str] = {
+            attribute.collection.corpus.api_name,
+            (
+                reference._corpus_name()
+                if isinstance(reference, MatchAnalyticsMixin)
+                else reference.api_name
+            ),
+            self._corpus_name()
+        } - {None}
+        if len(corpus_names) > 1:
+            raise ValueError(
+                'The target, reference and attribute must be of the same '
+                f'corpus, got {", ".join(sorted(corpus_names))}'
+            )
+        freqs: Dict[int, int] = self._fdist_1_dict(field, attribute)
+        # Subcorpora and match sets are compared at the same field
+        if isinstance(reference, MatchAnalyticsMixin):
+            reference_freqs: Dict[int, int] = reference._fdist_1_dict(
+                field,
+                attribute
+            )
+            n2: int = sum(reference_freqs.values())
+            lexicon_ids: List[int] = list(
+                freqs.keys() | reference_freqs.keys()
+            )
+        else:
+            # The target's tokens are part of the corpus, so they are
+            # subtracted from the corpus frequencies
+            lexicon_ids = list(freqs)
+            reference_freqs = {
+                id: corpus_freq - freqs[id]
+                for id, corpus_freq in zip(
+                    lexicon_ids,
+                    attribute.freqs_by_ids(lexicon_ids)
+                )
+            }
+            n2 = reference.size - sum(freqs.values())
+        n1: int = sum(freqs.values())
+        if n1 == 0 or n2 == 0:
+            return []
+        rows: List[Tuple[int, int, int, float]] = sorted(
+            (
+                (
+                    id,
+                    freqs.get(id, 0),
+                    reference_freqs.get(id, 0),
+                    score(
+                        freqs.get(id, 0),
+                        n1,
+                        reference_freqs.get(id, 0),
+                        n2
+                    )
+                )
+                for id in lexicon_ids
+            ),
+            key=lambda x: x[3],
+            reverse=True
+        )[:limit]
+        values: List[str] = attribute.values_by_ids([x[0] for x in rows])
+        return [(value, *x[1:]) for value, x in zip(values, rows)]
+
+    def metadata(
+        self,
+        structural_attributes: List['StructuralAttribute'],
+        field: int = FIELD_MATCH
+    ) -> Dict[str, List[str]]:
+        '''
+        values of the value-bearing <structural_attributes> for the regions
+        enclosing the corpus position at <field> of each match, e.g.
+        corpus.structural_attributes.list(
+            filters={'has_values': True, 'part_of': text}
+        )
+
+        returns {attribute_name: values} where values are aligned with the
+        matches; "" for every match not inside a structure region
+
+        NB: each attribute is mapped with its own cl_cpos2struc call, as
+            attributes of one element do not necessarily share their
+            regions; the calls, and the cl_struc2str calls for the values,
+            are pipelined, and the corpus positions are encoded only once
+        '''
+        if len(structural_attributes) == 0:
+            return {}
+        api: 'APIClient' = structural_attributes[0].client.api
+        cpos_list: List[int] = self._dump_all(field)
+        # Attributes with a region table (see
+        # StructuralAttribute.region_table) are mapped locally
+        remote_attributes: List['StructuralAttribute'] = [
+            x for x in structural_attributes if 'regions' not in x.tables
+        ]
+        responses: List[List[int]] = api.pipeline(
+            [
+                ('cl_cpos2struc', (x.api_name, cpos_list))
+                for x in remote_attributes
+            ]
+        )
+        strucs_by_name: Dict[str, List[int]] = {
+            x.name: strucs for x, strucs in zip(remote_attributes, responses)
+        }
+        for structural_attribute in structural_attributes:
+            if structural_attribute.name not in strucs_by_name:
+                strucs_by_name[structural_attribute.name] = (
+                    structural_attribute.ids_by_cpos(cpos_list)
+                )
+        unique_strucs: List[List[int]] = [
+            sorted(set(strucs_by_name[x.name]) - {-1})
+            for x in structural_attributes
+        ]
+        values: List[List[str]] = api.pipeline(
+            [
+                ('cl_struc2str', (x.api_name, strucs))
+                for x, strucs in zip(structural_attributes, unique_strucs)
+            ]
+        )
+        columns: Dict[str, List[str]] = {}
+        for structural_attribute, strucs, x in zip(
+            structural_attributes,
+            unique_strucs,
+            values
+        ):
+            values_by_struc: Dict[int, str] = dict(zip(strucs, x))
+            values_by_struc[-1] = ''
+            columns[structural_attribute.name] = [
+                values_by_struc[struc]
+                for struc in strucs_by_name[structural_attribute.name]
+            ]
+        return columns
+
+    def _corpus_name(self) -> Optional[str]:
+        ''' the API name of the corpus of the matches, None if unknown '''
+        return None
+
+    def _dump_all(self, field: int) -> List[int]:
+        ''' Dump the values of <field> for all matches in subcorpus. '''
+        if self.size == 0:
+            return []
+        return self.dump(field, 0, self.size - 1)
+
+    def _fdist_1_dict(
+        self,
+        field: int,
+        attribute: 'PositionalAttribute'
+    ) -> Dict[int, int]:
+        '''
+        frequency distribution of single tokens as {id: frequency}, sorted
+        by frequency desc.
+        '''
+        freqs: Counter = Counter(attribute.ids_by_cpos(self._dump_all(field)))
+        freqs.pop(-1, None)
+        return dict(freqs.most_common())
@@ -1,2 +1,7 @@
 # flake8: noqa
+from .balancer import LoadBalancedAPIClient
+from .chunking import ChunkingPolicy
 from .client import APIClient
+from .coalescing import CoalescingAPIClient
+from .memory import MemoryPressurePolicy
+from .regexes import RegexCache
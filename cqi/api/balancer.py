@@ -0,0 +1,413 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import threading
+import time
+from .chunking import ChunkingPolicy
+from .client import APIClient
+from .memory import MemoryPressurePolicy
+from .regexes import RegexCache
+from .. import errors
+from .. import status
+
+
+class Replica:
+    '''
+    A session with one of several identical CQi servers, together with the
+    statistics the load balancer needs to choose between them.
+    '''
+
+    def __init__(self, host: str, port: int):
+        self.host: str = host
+        self.port: int = port
+        #: The session, None if not connected
+        self.api: Optional[APIClient] = None
+        #: Serializes the commands sent over the session
+        self.lock: threading.Lock = threading.Lock()
+        #: Smoothed duration of recent commands, in seconds
+        self.latency: Optional[float] = None
+        #: Number of commands sent or waiting for the session, guarded by
+        #: the lock of the load balancer
+        self.num_pending: int = 0
+        #: Point in time until which the replica is considered unhealthy
+        self.unhealthy_until: float = 0.0
+
+    def __repr__(self) -> str:
+        return f'<Replica: {self.host}:{self.port}>'
+
+    @property
+    def healthy(self) -> bool:
+        return time.time() >= self.unhealthy_until
+
+    @property
+    def cost(self) -> float:
+        ''' expected time until a new command would be completed '''
+        return (self.latency or 0.0) * (self.num_pending + 1)
+
+
+class LoadBalancedAPIClient:
+    '''
+    A low-level client for several replicated CQi servers serving the same
+    corpora. It keeps one session per replica and sends each command to the
+    replica with the lowest expected completion time, estimated from the
+    smoothed command and ping timings and the number of pending commands.
+
+    Replicas raising connection errors are marked unhealthy for <cooldown>
+    seconds; idempotent lookups (ASK_*, CORPUS_* and CL_* commands) are then
+    retried on the next replica. Subcorpora stay on the replica that created
+    them, all CQP_* commands concerning them are sent there.
+
+    The chunking policy and the regex cache are shared by the sessions of
+    all replicas. Subcorpora and loaded corpora differ between replicas, so
+    each session gets a memory pressure policy of its own, with the
+    settings of <memory_pressure_policy>; see the ``memory_pressure_policy``
+    of each replica's ``api``.
+
+    NB: a closed connection is only detected after the APIClient timeout,
+        so consider passing a shorter ``timeout``.
+
+    Example:
+    >>> import cqi
+    >>> client = cqi.CQiClient([('10.0.0.1', 4877), ('10.0.0.2', 4877)])
+    >>> client.connect('username', 'password')
+    <class 'cqi.status.StatusConnectOk'>
+
+    Args:
+    endpoints (list): The replicas, either as host or (host, port).
+    port (int): Port of replicas given without one.
+        Default: ``4877``
+    cooldown (float): Time in seconds an unhealthy replica is avoided.
+        Default: ``30.0``
+    smoothing (float): Weight of the latest timing in the latency estimates.
+        Default: ``0.2``
+    memory_pressure_policy (MemoryPressurePolicy): Template of the memory
+        pressure policy of each replica's session, ``None`` to raise
+        CQI_CL_ERROR_OUT_OF_MEMORY.
+        Default: ``None``
+    chunking_policy (ChunkingPolicy): Policy for splitting the list arguments
+        of list-valued commands into chunks.
+        Default: a new ``ChunkingPolicy``
+    regex_cache (RegexCache): Cache for the results of CL_REGEX2ID, ``None``
+        to evaluate every regex on the server.
+        Default: ``None``
+    **kwargs: Further arguments for the APIClient of each replica.
+    '''
+
+    def __init__(
+        self,
+        endpoints: List[Union[str, Tuple[str, int]]],
+        port: int = 4877,
+        cooldown: float = 30.0,
+        smoothing: float = 0.2,
+        memory_pressure_policy: Optional[MemoryPressurePolicy] = None,
+        chunking_policy: Optional[ChunkingPolicy] = None,
+        regex_cache: Optional[RegexCache] = None,
+        **kwargs
+    ):
+        self.replicas: List[Replica] = [
+            Replica(x, port) if isinstance(x, str) else Replica(*x)
+            for x in endpoints
+        ]
+        self.cooldown: float = cooldown
+        self.smoothing: float = smoothing
+        self.memory_pressure_policy: Optional[MemoryPressurePolicy] = (
+            memory_pressure_policy
+        )
+        self.chunking_policy: ChunkingPolicy = (
+            chunking_policy or ChunkingPolicy()
+        )
+        self.regex_cache: Optional[RegexCache] = regex_cache
+        self.kwargs: Dict = kwargs
+        self.__credentials: Optional[Tuple[str, str]] = None
+        # Maps subcorpus api names to the replica that holds them
+        self.__subcorpora: Dict[str, Replica] = {}
+        # Guards __subcorpora and the num_pending counters of the replicas
+        self.__lock: threading.Lock = threading.Lock()
+        self.__local: threading.local = threading.local()
+
+    def __getattr__(self, name: str):
+        if name.startswith(('ask_', 'corpus_', 'cl_')):
+            def command(*args):
+                return self.__execute_idempotent(name, args)
+        elif name.startswith('cqp_'):
+            def command(subcorpus: str, *args):
+                return self.__execute(
+                    self.__owner(subcorpus),
+                    name,
+                    (subcorpus, *args)
+                )
+        else:
+            raise AttributeError(name)
+        command.__name__ = name
+        return command
+
+    def ctrl_connect(
+        self,
+        username: str,
+        password: str
+    ) -> status.StatusConnectOk:
+        ''' connect to all replicas; fails only if no replica is reachable '''
+        self.__credentials = (username, password)
+        error: Optional[Exception] = None
+        for replica in self.replicas:
+            try:
+                with replica.lock:
+                    self.__connect(replica)
+            except (OSError, errors.CQiException) as e:
+                self.__mark_unhealthy(replica)
+                error = e
+        if not any(x.api is not None for x in self.replicas):
+            raise error
+        return status.StatusConnectOk()
+
+    def ctrl_bye(self) -> status.StatusByeOk:
+        for replica in self.replicas:
+            with replica.lock:
+                if replica.api is None:
+                    continue
+                try:
+                    replica.api.ctrl_bye()
+                except (OSError, errors.CQiException):
+                    pass
+                replica.api = None
+        return status.StatusByeOk()
+
+    def ctrl_ping(self) -> status.StatusPingOk:
+        ''' ping all healthy replicas, which updates their latency '''
+        error: Optional[Exception] = None
+        num_pongs: int = 0
+        for replica in self.replicas:
+            if not replica.healthy:
+                continue
+            try:
+                self.__execute(replica, 'ctrl_ping', ())
+                num_pongs += 1
+            except OSError as e:
+                error = e
+        if num_pongs == 0:
+            raise error or ConnectionError('No healthy replica')
+        return status.StatusPingOk()
+
+    def ctrl_last_general_error(self) -> str:
+        ''' the last general error of the replica last used by this thread '''
+        return self.__execute(
+            self.__last_replica(),
+            'ctrl_last_general_error',
+            ()
+        )
+
+    def ctrl_user_abort(self):
+        ''' abort on the replica last used by this thread '''
+        api: Optional[APIClient] = self.__last_replica().api
+        if api is None:
+            raise errors.CQiException('Not connected')
+        api.ctrl_user_abort()
+
+    def corpus_drop_corpus(self, corpus: str) -> status.StatusOk:
+        ''' try to unload a corpus from all connected replicas '''
+        response: status.StatusOk = status.StatusOk()
+        for replica in self.replicas:
+            if replica.api is None or not replica.healthy:
+                continue
+            try:
+                response = self.__execute(
+                    replica,
+                    'corpus_drop_corpus',
+                    (corpus,)
+                )
+            except OSError:
+                pass
+        return response
+
+    def cqp_query(
+        self,
+        mother_corpus: str,
+        subcorpus_name: str,
+        query: str
+    ) -> status.StatusOk:
+        ''' the result stays on the replica the query was executed on '''
+        subcorpus: str = f'{mother_corpus}:{subcorpus_name}'
+        with self.__lock:
+            replica: Optional[Replica] = self.__subcorpora.get(subcorpus)
+        if replica is None:
+            replica = self.__select()
+        response: status.StatusOk = self.__execute(
+            replica,
+            'cqp_query',
+            (mother_corpus, subcorpus_name, query)
+        )
+        with self.__lock:
+            self.__subcorpora[subcorpus] = replica
+        return response
+
+    def cqp_list_subcorpora(self, corpus: str) -> List[str]:
+        ''' the subcorpora of <corpus> created on any replica '''
+        with self.__lock:
+            replicas: List[Replica] = list(set(self.__subcorpora.values()))
+        subcorpus_names: List[str] = []
+        for replica in replicas:
+            for x in self.__execute(replica, 'cqp_list_subcorpora', (corpus,)):
+                if x not in subcorpus_names:
+                    subcorpus_names.append(x)
+        return subcorpus_names
+
+    def cqp_drop_subcorpus(self, subcorpus: str) -> status.StatusOk:
+        response: status.StatusOk = self.__execute(
+            self.__owner(subcorpus),
+            'cqp_drop_subcorpus',
+            (subcorpus,)
+        )
+        with self.__lock:
+            self.__subcorpora.pop(subcorpus, None)
+        return response
+
+    def pipeline(self, commands: List[Tuple[str, Tuple]]) -> List:
+        '''
+        pipeline <commands> (see APIClient.pipeline) on a single replica: the
+        one holding the subcorpora concerned, if any
+        '''
+        for method_name, args in commands:
+            if method_name.startswith('cqp_') and method_name not in (
+                'cqp_query',
+                'cqp_list_subcorpora'
+            ):
+                return self.__execute(
+                    self.__owner(args[0]),
+                    'pipeline',
+                    (commands,)
+                )
+        if all(
+            x[0].startswith(('ask_', 'corpus_', 'cl_'))
+            and x[0] != 'corpus_drop_corpus'
+            for x in commands
+        ):
+            return self.__execute_idempotent('pipeline', (commands,))
+        return self.__execute(self.__select(), 'pipeline', (commands,))
+
+    def iter_chunks(
+        self,
+        method_name: str,
+        attribute: str,
+        values: List
+    ) -> Iterator[List]:
+        '''
+        see APIClient.iter_chunks; all chunks are sent to one replica, whose
+        session is reserved until the iteration ends
+        '''
+        replica: Replica = self.__select()
+        with self.__lock:
+            replica.num_pending += 1
+        try:
+            with replica.lock:
+                try:
+                    if replica.api is None:
+                        self.__connect(replica)
+                    yield from replica.api.iter_chunks(
+                        method_name,
+                        attribute,
+                        values
+                    )
+                except OSError:
+                    self.__mark_unhealthy(replica)
+                    raise
+        finally:
+            with self.__lock:
+                replica.num_pending -= 1
+        self.__local.replica = replica
+
+    def __connect(self, replica: Replica):
+        if self.__credentials is None:
+            raise errors.CQiException('Not connected')
+        memory_pressure_policy: Optional[MemoryPressurePolicy] = None
+        if self.memory_pressure_policy is not None:
+            memory_pressure_policy = MemoryPressurePolicy(
+                max_attempts=self.memory_pressure_policy.max_attempts,
+                drop_corpora=self.memory_pressure_policy.drop_corpora
+            )
+            memory_pressure_policy.listeners = (
+                self.memory_pressure_policy.listeners
+            )
+        api: APIClient = APIClient(
+            replica.host,
+            replica.port,
+            memory_pressure_policy=memory_pressure_policy,
+            chunking_policy=self.chunking_policy,
+            regex_cache=self.regex_cache,
+            **self.kwargs
+        )
+        api.ctrl_connect(*self.__credentials)
+        replica.api = api
+
+    def __last_replica(self) -> Replica:
+        replica: Optional[Replica] = getattr(self.__local, 'replica', None)
+        if replica is None:
+            raise errors.CQiException(
+                'No command has been sent by this thread yet'
+            )
+        return replica
+
+    def __mark_unhealthy(self, replica: Replica):
+        replica.unhealthy_until = time.time() + self.cooldown
+        if replica.api is not None:
+            try:
+                replica.api.socket.close()
+            except OSError:
+                pass
+            replica.api = None
+        # Subcorpora live in the server process of a session
+        with self.__lock:
+            self.__subcorpora = {
+                k: v for k, v in self.__subcorpora.items() if v is not replica
+            }
+
+    def __owner(self, subcorpus: str) -> Replica:
+        with self.__lock:
+            replica: Optional[Replica] = self.__subcorpora.get(subcorpus)
+        if replica is None:
+            raise errors.CQPErrorNoSuchCorpus(subcorpus)
+        return replica
+
+    def __select(self, exclude: Optional[List[Replica]] = None) -> Replica:
+        ''' the healthy replica with the lowest expected completion time '''
+        replicas: List[Replica] = [
+            x for x in self.replicas
+            if x.healthy and (exclude is None or x not in exclude)
+        ]
+        if len(replicas) == 0:
+            raise ConnectionError('No healthy replica')
+        with self.__lock:
+            return min(replicas, key=lambda x: x.cost)
+
+    def __execute(self, replica: Replica, method_name: str, args: Tuple):
+        with self.__lock:
+            replica.num_pending += 1
+        try:
+            with replica.lock:
+                try:
+                    if replica.api is None:
+                        self.__connect(replica)
+                    t: float = time.time()
+                    response: Any = getattr(replica.api, method_name)(*args)
+                except errors.CQiException:
+                    raise
+                except OSError:
+                    self.__mark_unhealthy(replica)
+                    raise
+                t = time.time() - t
+                replica.latency = (
+                    t if replica.latency is None else
+                    self.smoothing * t + (1 - self.smoothing) * replica.latency
+                )
+        finally:
+            with self.__lock:
+                replica.num_pending -= 1
+        self.__local.replica = replica
+        return response
+
+    def __execute_idempotent(self, method_name: str, args: Tuple):
+        ''' execute on the best replica, retrying on the others '''
+        failed_replicas: List[Replica] = []
+        while True:
+            replica: Replica = self.__select(exclude=failed_replicas)
+            try:
+                return self.__execute(replica, method_name, args)
+            except OSError:
+                failed_replicas.append(replica)
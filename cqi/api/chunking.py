@@ -0,0 +1,86 @@
+from typing import Callable, Dict, List, Optional
+import heapq
+
+
+#: The commands with a list argument that can be split into chunks, mapped to
+#: the function reassembling the responses to the chunks
+CHUNKED_COMMANDS: Dict[str, Callable[[List[List]], List]] = {
+    'cl_str2id': lambda x: [y for chunk in x for y in chunk],
+    'cl_id2str': lambda x: [y for chunk in x for y in chunk],
+    'cl_id2freq': lambda x: [y for chunk in x for y in chunk],
+    'cl_cpos2id': lambda x: [y for chunk in x for y in chunk],
+    'cl_cpos2str': lambda x: [y for chunk in x for y in chunk],
+    'cl_cpos2struc': lambda x: [y for chunk in x for y in chunk],
+    'cl_cpos2lbound': lambda x: [y for chunk in x for y in chunk],
+    'cl_cpos2rbound': lambda x: [y for chunk in x for y in chunk],
+    'cl_cpos2alg': lambda x: [y for chunk in x for y in chunk],
+    'cl_struc2str': lambda x: [y for chunk in x for y in chunk],
+    # The corpus positions of each chunk are sorted on their own
+    'cl_idlist2cpos': lambda x: list(heapq.merge(*x))
+}
+
+
+class ChunkingPolicy:
+    '''
+    A policy for splitting the list arguments of list-valued commands
+    (CL_CPOS2STR, CL_IDLIST2CPOS, ...) into chunks, which keeps the server
+    from allocating huge buffers and the session responsive. The chunks of a
+    command are pipelined back to back. Their size adapts to the observed
+    throughput, so that each chunk takes about <target_duration> seconds.
+
+    Example:
+    >>> import cqi
+    >>> client = cqi.APIClient(
+    ...     '127.0.0.1',
+    ...     chunking_policy=cqi.api.ChunkingPolicy(target_duration=0.05)
+    ... )
+
+    Args:
+    chunk_size (int): Initial number of values per chunk.
+        Default: ``100000``
+    min_chunk_size (int): Minimum number of values per chunk.
+        Default: ``1000``
+    max_chunk_size (int): Maximum number of values per chunk.
+        Default: ``1000000``
+    target_duration (float): Desired time per chunk, in seconds.
+        Default: ``0.1``
+    window (int): Number of chunks sent ahead of the received responses.
+        Default: ``2``
+    smoothing (float): Weight of the latest chunk in the throughput estimate.
+        Default: ``0.5``
+    '''
+
+    def __init__(
+        self,
+        chunk_size: int = 100000,
+        min_chunk_size: int = 1000,
+        max_chunk_size: int = 1000000,
+        target_duration: float = 0.1,
+        window: int = 2,
+        smoothing: float = 0.5
+    ):
+        #: Current number of values per chunk
+        self.chunk_size: int = chunk_size
+        self.min_chunk_size: int = min_chunk_size
+        self.max_chunk_size: int = max_chunk_size
+        self.target_duration: float = target_duration
+        self.window: int = window
+        self.smoothing: float = smoothing
+        #: Smoothed number of values processed per second
+        self.throughput: Optional[float] = None
+        #: Number of chunks sent
+        self.num_chunks: int = 0
+
+    def update(self, num_values: int, duration: float):
+        ''' adapt the chunk size to a chunk that took <duration> seconds '''
+        self.num_chunks += 1
+        throughput: float = num_values / max(duration, 1e-6)
+        self.throughput = (
+            throughput if self.throughput is None else
+            self.smoothing * throughput
+            + (1 - self.smoothing) * self.throughput
+        )
+        chunk_size: float = self.throughput * self.target_duration
+        self.chunk_size = int(
+            min(max(chunk_size, self.min_chunk_size), self.max_chunk_size)
+        )
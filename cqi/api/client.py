@@ -1,8 +1,12 @@
-from typing import List, Tuple
+from collections import deque
+from typing import Deque, Iterator, List, Optional, Tuple
 import socket
 import struct
 import time
 from . import specification
+from .chunking import CHUNKED_COMMANDS, ChunkingPolicy
+from .memory import MemoryPressurePolicy
+from .regexes import RegexCache
 from .. import errors
 from .. import status
 
@@ -31,6 +35,18 @@ class APIClient:
         Default: ``4096``
     timeout (float): Default timeout for API calls, in seconds.
         Default: ``60.0``
+    pipeline_bufsize (int): Maximum number of bytes to send at once when
+        pipelining commands.
+        Default: ``65536``
+    memory_pressure_policy (MemoryPressurePolicy): Policy for recovering
+        from CQI_CL_ERROR_OUT_OF_MEMORY, ``None`` to raise the error.
+        Default: ``None``
+    chunking_policy (ChunkingPolicy): Policy for splitting the list arguments
+        of list-valued commands into chunks.
+        Default: a new ``ChunkingPolicy``
+    regex_cache (RegexCache): Cache for the results of CL_REGEX2ID, ``None``
+        to evaluate every regex on the server.
+        Default: ``None``
     '''
 
     def __init__(
@@ -39,7 +55,11 @@ class APIClient:
         port: int = 4877,
         version: str = '0.1',
         max_bufsize: int = 4096,
-        timeout: float = 60.0
+        timeout: float = 60.0,
+        pipeline_bufsize: int = 65536,
+        memory_pressure_policy: Optional[MemoryPressurePolicy] = None,
+        chunking_policy: Optional[ChunkingPolicy] = None,
+        regex_cache: Optional[RegexCache] = None
     ):
         self.host: str = host
         self.port: int = port
@@ -47,6 +67,24 @@ class APIClient:
         self.socket: socket.socket = socket.socket()
         self.max_bufsize: int = max_bufsize
         self.timeout: float = timeout
+        self.pipeline_bufsize: int = pipeline_bufsize
+        self.memory_pressure_policy: Optional[MemoryPressurePolicy] = (
+            memory_pressure_policy
+        )
+        self.chunking_policy: ChunkingPolicy = (
+            chunking_policy or ChunkingPolicy()
+        )
+        self.regex_cache: Optional[RegexCache] = regex_cache
+        # Whether the client is currently freeing memory on the server
+        self.__freeing_memory: bool = False
+        # Encoded request data that has not been sent yet
+        self.__send_buffer: bytearray = bytearray()
+        # While pipelining, responses are received after sending a frame
+        self.__pipelining: bool = False
+        self.__num_pending_responses: int = 0
+        # The last encoded int list of the request data that has not been
+        # sent yet, e.g. a cpos list sent to several attributes
+        self.__encoded_int_list: Optional[Tuple[List[int], bytes]] = None
 
     def ctrl_connect(
         self,
@@ -67,6 +105,7 @@ class APIClient:
 
     def ctrl_user_abort(self):
         self.__send_WORD(specification.CTRL_USER_ABORT)
+        self.__flush()
 
     def ctrl_ping(self) -> status.StatusPingOk:
         self.__send_WORD(specification.CTRL_PING)
@@ -144,7 +183,12 @@ class APIClient:
         ''' try to unload a corpus and all its attributes from memory '''
         self.__send_WORD(specification.CORPUS_DROP_CORPUS)
         self.__send_STRING(corpus)
-        return self.__recv_response()
+        response: status.StatusOk = self.__recv_response()
+        if self.memory_pressure_policy is not None:
+            self.memory_pressure_policy.forget_corpus(corpus)
+        if self.regex_cache is not None:
+            self.regex_cache.forget_corpus(corpus)
+        return response
 
     def cl_attribute_size(self, attribute: str) -> int:
         ''' 
@@ -153,6 +197,7 @@ class APIClient:
         - number of regions       (structural)
         - number of alignments    (alignment)
         '''
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_ATTRIBUTE_SIZE)
         self.__send_STRING(attribute)
         return self.__recv_response()
@@ -164,9 +209,13 @@ class APIClient:
 
         valid lexicon IDs range from 0 .. (lexicon_size - 1)
         '''
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_LEXICON_SIZE)
         self.__send_STRING(attribute)
-        return self.__recv_response()
+        lexicon_size: int = self.__recv_response()
+        if self.regex_cache is not None and not self.__pipelining:
+            self.regex_cache.observe_lexicon_size(attribute, lexicon_size)
+        return lexicon_size
 
     def cl_drop_attribute(self, attribute: str) -> status.StatusOk:
         '''
@@ -190,6 +239,9 @@ class APIClient:
         returns -1 for every string in <strings> that is not found in the
         lexicon
         '''
+        if self.__chunk(strings):
+            return self.__execute_chunked('cl_str2id', attribute, strings)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_STR2ID)
         self.__send_STRING(attribute)
         self.__send_STRING_LIST(strings)
@@ -197,6 +249,9 @@ class APIClient:
 
     def cl_id2str(self, attribute: str, id: List[int]) -> List[str]:
         ''' returns "" for every ID in <id> that is out of range '''
+        if self.__chunk(id):
+            return self.__execute_chunked('cl_id2str', attribute, id)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_ID2STR)
         self.__send_STRING(attribute)
         self.__send_INT_LIST(id)
@@ -204,6 +259,9 @@ class APIClient:
 
     def cl_id2freq(self, attribute: str, id: List[int]) -> List[int]:
         ''' returns 0 for every ID in <id> that is out of range '''
+        if self.__chunk(id):
+            return self.__execute_chunked('cl_id2freq', attribute, id)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_ID2FREQ)
         self.__send_STRING(attribute)
         self.__send_INT_LIST(id)
@@ -213,6 +271,9 @@ class APIClient:
         ''' 
         returns -1 for every corpus position in <cpos> that is out of range
         '''
+        if self.__chunk(cpos):
+            return self.__execute_chunked('cl_cpos2id', attribute, cpos)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_CPOS2ID)
         self.__send_STRING(attribute)
         self.__send_INT_LIST(cpos)
@@ -222,6 +283,9 @@ class APIClient:
         '''
         returns "" for every corpus position in <cpos> that is out of range
         '''
+        if self.__chunk(cpos):
+            return self.__execute_chunked('cl_cpos2str', attribute, cpos)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_CPOS2STR)
         self.__send_STRING(attribute)
         self.__send_INT_LIST(cpos)
@@ -231,6 +295,9 @@ class APIClient:
         '''
         returns -1 for every corpus position not inside a structure region
         '''
+        if self.__chunk(cpos):
+            return self.__execute_chunked('cl_cpos2struc', attribute, cpos)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_CPOS2STRUC)
         self.__send_STRING(attribute)
         self.__send_INT_LIST(cpos)
@@ -246,6 +313,9 @@ class APIClient:
         returns left boundary of s-attribute region enclosing cpos, -1 if not
         in region
         '''
+        if self.__chunk(cpos):
+            return self.__execute_chunked('cl_cpos2lbound', attribute, cpos)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_CPOS2LBOUND)
         self.__send_STRING(attribute)
         self.__send_INT_LIST(cpos)
@@ -256,6 +326,9 @@ class APIClient:
         returns right boundary of s-attribute region enclosing cpos, -1 if not
         in region
         '''
+        if self.__chunk(cpos):
+            return self.__execute_chunked('cl_cpos2rbound', attribute, cpos)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_CPOS2RBOUND)
         self.__send_STRING(attribute)
         self.__send_INT_LIST(cpos)
@@ -263,6 +336,9 @@ class APIClient:
 
     def cl_cpos2alg(self, attribute: str, cpos: List[int]) -> List[int]:
         ''' returns -1 for every corpus position not inside an alignment '''
+        if self.__chunk(cpos):
+            return self.__execute_chunked('cl_cpos2alg', attribute, cpos)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_CPOS2ALG)
         self.__send_STRING(attribute)
         self.__send_INT_LIST(cpos)
@@ -275,6 +351,9 @@ class APIClient:
 
         check corpus_structural_attribute_has_values(<attribute>) first
         '''
+        if self.__chunk(strucs):
+            return self.__execute_chunked('cl_struc2str', attribute, strucs)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_STRUC2STR)
         self.__send_STRING(attribute)
         self.__send_INT_LIST(strucs)
@@ -287,6 +366,7 @@ class APIClient:
 
     def cl_id2cpos(self, attribute: str, id: int) -> List[int]:
         ''' returns all corpus positions where the given token occurs '''
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_ID2CPOS)
         self.__send_STRING(attribute)
         self.__send_INT(id)
@@ -297,6 +377,9 @@ class APIClient:
         returns all corpus positions where one of the tokens in <id_list>
         occurs; the returned list is sorted as a whole, not per token id
         '''
+        if self.__chunk(id_list):
+            return self.__execute_chunked('cl_idlist2cpos', attribute, id_list)
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_IDLIST2CPOS)
         self.__send_STRING(attribute)
         self.__send_INT_LIST(id_list)
@@ -307,15 +390,27 @@ class APIClient:
         returns lexicon IDs of all tokens that match <regex>; the returned
         list may be empty (size 0);
         '''
+        cached: bool = self.regex_cache is not None and not self.__pipelining
+        if cached:
+            if not self.regex_cache.validated(attribute):
+                self.cl_lexicon_size(attribute)
+            ids: Optional[List[int]] = self.regex_cache.get(attribute, regex)
+            if ids is not None:
+                return ids
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_REGEX2ID)
         self.__send_STRING(attribute)
         self.__send_STRING(regex)
-        return self.__recv_response()
+        ids = self.__recv_response()
+        if cached:
+            self.regex_cache.put(attribute, regex, ids)
+        return ids
 
     def cl_struc2cpos(self, attribute: str, struc: int) -> Tuple[int, int]:
         '''
         returns start and end corpus positions of structure region <struc>
         '''
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_STRUC2CPOS)
         self.__send_STRING(attribute)
         self.__send_INT(struc)
@@ -328,6 +423,7 @@ class APIClient:
         alg: int
     ) -> Tuple[int, int, int, int]:
         ''' returns (src_start, src_end, target_start, target_end) '''
+        self.__touch_attribute(attribute)
         self.__send_WORD(specification.CL_ALG2CPOS)
         self.__send_STRING(attribute)
         self.__send_INT(alg)
@@ -339,6 +435,7 @@ class APIClient:
         query: str
     ) -> status.StatusOk:
         ''' <query> must include the ';' character terminating the query. '''
+        self.__touch_subcorpus(f'{mother_corpus}:{subcorpus_name}')
         self.__send_WORD(specification.CQP_QUERY)
         self.__send_STRING(mother_corpus)
         self.__send_STRING(subcorpus_name)
@@ -351,11 +448,13 @@ class APIClient:
         return self.__recv_response()
 
     def cqp_subcorpus_size(self, subcorpus: str) -> int:
+        self.__touch_subcorpus(subcorpus)
         self.__send_WORD(specification.CQP_SUBCORPUS_SIZE)
         self.__send_STRING(subcorpus)
         return self.__recv_response()
 
     def cqp_subcorpus_has_field(self, subcorpus: str, field: int) -> bool:
+        self.__touch_subcorpus(subcorpus)
         self.__send_WORD(specification.CQP_SUBCORPUS_HAS_FIELD)
         self.__send_STRING(subcorpus)
         self.__send_BYTE(field)
@@ -372,6 +471,7 @@ class APIClient:
         Dump the values of <field> for match ranges <first> .. <last> in
         <subcorpus>. <field> is one of the CQI_CONST_FIELD_* constants.
         '''
+        self.__touch_subcorpus(subcorpus)
         self.__send_WORD(specification.CQP_DUMP_SUBCORPUS)
         self.__send_STRING(subcorpus)
         self.__send_BYTE(field)
@@ -383,7 +483,10 @@ class APIClient:
         ''' delete a subcorpus from memory '''
         self.__send_WORD(specification.CQP_DROP_SUBCORPUS)
         self.__send_STRING(subcorpus)
-        return self.__recv_response()
+        response: status.StatusOk = self.__recv_response()
+        if self.memory_pressure_policy is not None:
+            self.memory_pressure_policy.forget_subcorpus(subcorpus)
+        return response
 
     '''
     ' NOTE: The following two functions are temporarily included for the
@@ -409,6 +512,7 @@ class APIClient:
 
         NB: pairs are sorted by frequency desc.
         '''
+        self.__touch_subcorpus(subcorpus)
         self.__send_WORD(specification.CQP_FDIST_1)
         self.__send_STRING(subcorpus)
         self.__send_INT(cutoff)
@@ -433,6 +537,7 @@ class APIClient:
 
         NB: triples are sorted by frequency desc.
         '''
+        self.__touch_subcorpus(subcorpus)
         self.__send_WORD(specification.CQP_FDIST_2)
         self.__send_STRING(subcorpus)
         self.__send_INT(cutoff)
@@ -442,7 +547,242 @@ class APIClient:
         self.__send_STRING(attribute2)
         return self.__recv_response()
 
+    def pipeline(self, commands: List[Tuple[str, Tuple]]) -> List:
+        '''
+        Send <commands> back to back and receive their responses afterwards.
+        Each command is a (method_name, args) tuple, e.g.
+        ('cl_struc2cpos', ('CORPUS.s', 0)). Commands are sent in frames of
+        up to <pipeline_bufsize> bytes, which costs one round trip per frame
+        instead of one per command.
+
+        returns the responses in the order of <commands>; if commands fail,
+        the first error is raised after all responses have been received
+
+        NB: pipelined commands are not retried by the memory pressure policy.
+        '''
+        # Split large list arguments into chunks of separate commands
+        chunk_size: int = self.chunking_policy.chunk_size
+        num_chunks: List[int] = []
+        chunked_commands: List[Tuple[str, Tuple]] = []
+        for method_name, args in commands:
+            if method_name in CHUNKED_COMMANDS and len(args[1]) > chunk_size:
+                attribute, values = args
+                chunked_commands.extend(
+                    (method_name, (attribute, values[i:i + chunk_size]))
+                    for i in range(0, len(values), chunk_size)
+                )
+                num_chunks.append(-(-len(values) // chunk_size))
+            else:
+                chunked_commands.append((method_name, args))
+                num_chunks.append(0)
+        responses: List = []
+        error: Optional[errors.CQiException] = None
+        commands_iter = iter(chunked_commands)
+        exhausted: bool = False
+        while not exhausted:
+            self.__pipelining = True
+            try:
+                for method_name, args in commands_iter:
+                    getattr(self, method_name)(*args)
+                    if len(self.__send_buffer) >= self.pipeline_bufsize:
+                        break
+                else:
+                    exhausted = True
+            except BaseException:
+                # Nothing of this frame has been sent yet
+                self.__send_buffer.clear()
+                self.__encoded_int_list = None
+                self.__num_pending_responses = 0
+                raise
+            finally:
+                self.__pipelining = False
+            self.__flush()
+            while self.__num_pending_responses > 0:
+                self.__num_pending_responses -= 1
+                try:
+                    responses.append(self.__recv_next_response())
+                except errors.CQiException as e:
+                    responses.append(None)
+                    if error is None:
+                        error = e
+        if error is not None:
+            raise error
+        if len(chunked_commands) == len(commands):
+            return responses
+        merged_responses: List = []
+        offset: int = 0
+        for (method_name, args), n in zip(commands, num_chunks):
+            if n == 0:
+                merged_responses.append(responses[offset])
+                offset += 1
+            else:
+                merged_responses.append(
+                    CHUNKED_COMMANDS[method_name](responses[offset:offset + n])
+                )
+                offset += n
+        return merged_responses
+
+    def iter_chunks(
+        self,
+        method_name: str,
+        attribute: str,
+        values: List
+    ) -> Iterator[List]:
+        '''
+        Execute the list-valued command <method_name> (e.g. 'cl_cpos2str')
+        for <values> in chunks, which are pipelined back to back.
+
+        yields the responses to the chunks in order; for CL_IDLIST2CPOS,
+        the corpus positions are sorted per chunk only
+        '''
+        policy: ChunkingPolicy = self.chunking_policy
+        # Sizes of the chunks whose responses have not been received yet
+        pending: Deque[int] = deque()
+        offset: int = 0
+        error: Optional[errors.CQiException] = None
+        t: float = time.time()
+        try:
+            while offset < len(values) or len(pending) > 0:
+                while (
+                    error is None
+                    and offset < len(values)
+                    and len(pending) < policy.window
+                ):
+                    chunk_size: int = policy.chunk_size
+                    self.__pipelining = True
+                    try:
+                        getattr(self, method_name)(
+                            attribute,
+                            values[offset:offset + chunk_size]
+                        )
+                    finally:
+                        self.__pipelining = False
+                    self.__flush()
+                    self.__num_pending_responses = 0
+                    pending.append(min(chunk_size, len(values) - offset))
+                    offset += chunk_size
+                if len(pending) == 0:
+                    break
+                num_values: int = pending.popleft()
+                try:
+                    response: List = self.__recv_next_response()
+                except errors.CQiException as e:
+                    # Receive the pending responses before raising
+                    if error is None:
+                        error = e
+                    continue
+                policy.update(num_values, time.time() - t)
+                t = time.time()
+                if error is None:
+                    yield response
+        finally:
+            # Keep the session usable if the iteration is stopped early
+            while len(pending) > 0:
+                pending.popleft()
+                try:
+                    self.__recv_next_response()
+                except errors.CQiException:
+                    pass
+        if error is not None:
+            raise error
+
+    def __chunk(self, values: List) -> bool:
+        ''' whether to split <values> into chunks '''
+        return (
+            not self.__pipelining
+            and len(values) > self.chunking_policy.chunk_size
+        )
+
+    def __execute_chunked(
+        self,
+        method_name: str,
+        attribute: str,
+        values: List
+    ) -> List:
+        return CHUNKED_COMMANDS[method_name](
+            list(self.iter_chunks(method_name, attribute, values))
+        )
+
+    def __flush(self) -> bytearray:
+        ''' send the buffered request data and return it '''
+        data: bytearray = self.__send_buffer
+        self.__send_buffer = bytearray()
+        self.__encoded_int_list = None
+        if len(data) > 0:
+            self.socket.sendall(data)
+        return data
+
+    def __free_memory(self) -> bool:
+        '''
+        drop the least recently used subcorpus or corpus according to the
+        memory pressure policy; returns False if there is nothing to drop
+        '''
+        policy: MemoryPressurePolicy = self.memory_pressure_policy
+        self.__freeing_memory = True
+        try:
+            subcorpus: Optional[str] = policy.next_subcorpus()
+            if subcorpus is not None:
+                policy.forget_subcorpus(subcorpus)
+                try:
+                    self.cqp_drop_subcorpus(subcorpus)
+                except errors.CQPError:
+                    # The subcorpus is already gone
+                    pass
+                policy.num_dropped_subcorpora += 1
+                policy.notify_dropped(subcorpus)
+                return True
+            corpus: Optional[str] = policy.next_corpus()
+            if corpus is not None:
+                policy.forget_corpus(corpus)
+                self.corpus_drop_corpus(corpus)
+                policy.num_dropped_corpora += 1
+                policy.notify_dropped(corpus)
+                return True
+            return False
+        finally:
+            self.__freeing_memory = False
+
     def __recv_response(self):
+        if self.__pipelining:
+            self.__num_pending_responses += 1
+            return None
+        request: bytearray = self.__flush()
+        num_attempts: int = 0
+        while True:
+            try:
+                response = self.__recv_next_response()
+            except errors.CLErrorOutOfMemory:
+                policy: Optional[MemoryPressurePolicy] = (
+                    self.memory_pressure_policy
+                )
+                if policy is None or self.__freeing_memory:
+                    raise
+                policy.num_errors += 1
+                if num_attempts >= policy.max_attempts:
+                    raise
+                if not self.__free_memory():
+                    raise
+                # Send the failed request again
+                num_attempts += 1
+                policy.num_retries += 1
+                self.__send_buffer = request
+                self.__flush()
+                continue
+            if num_attempts > 0:
+                self.memory_pressure_policy.num_recoveries += 1
+            return response
+
+    def __touch_attribute(self, attribute: str):
+        if self.memory_pressure_policy is not None:
+            self.memory_pressure_policy.touch_corpus(
+                attribute.split('.', 1)[0]
+            )
+
+    def __touch_subcorpus(self, subcorpus: str):
+        if self.memory_pressure_policy is not None:
+            self.memory_pressure_policy.touch_subcorpus(subcorpus)
+
+    def __recv_next_response(self):
         byte_data: int = self.__recv_WORD()
         response_type: int = byte_data >> 8
 
@@ -603,28 +943,31 @@ class APIClient:
         return struct.unpack('!H', byte_data)[0]
 
     def __send_BYTE(self, byte_data: int):
-        data: bytes = struct.pack('!B', byte_data)
-        self.socket.sendall(data)
+        self.__send_buffer += struct.pack('!B', byte_data)
 
     def __send_BOOL(self, bool_data: bool):
-        data: bytes = struct.pack('!?', bool_data)
-        self.socket.sendall(data)
+        self.__send_buffer += struct.pack('!?', bool_data)
 
     def __send_INT(self, int_data: int):
-        data: bytes = struct.pack('!i', int_data)
-        self.socket.sendall(data)
+        self.__send_buffer += struct.pack('!i', int_data)
 
     def __send_STRING(self, string_data: str):
         data: bytes = string_data.encode()
         n: int = len(data)
         self.__send_WORD(n)
-        self.socket.sendall(data)
+        self.__send_buffer += data
 
     def __send_INT_LIST(self, int_list_data: List[int]):
+        if (
+            self.__encoded_int_list is not None
+            and self.__encoded_int_list[0] is int_list_data
+        ):
+            self.__send_buffer += self.__encoded_int_list[1]
+            return
         n: int = len(int_list_data)
-        self.__send_INT(n)
-        for int_data in int_list_data:
-            self.__send_INT(int_data)
+        data: bytes = struct.pack(f'!i{n}i', n, *int_list_data)
+        self.__encoded_int_list = (int_list_data, data)
+        self.__send_buffer += data
 
     def __send_STRING_LIST(self, string_list_data: List[str]):
         n: int = len(string_list_data)
@@ -633,5 +976,4 @@ class APIClient:
             self.__send_STRING(string_data)
 
     def __send_WORD(self, word_data: int):
-        data: bytes = struct.pack('!H', word_data)
-        self.socket.sendall(data)
+        self.__send_buffer += struct.pack('!H', word_data)
@@ -0,0 +1,191 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import threading
+from .balancer import LoadBalancedAPIClient
+from .client import APIClient
+
+
+#: The simple (scalar) mappings, which map each value of their list argument
+#: to exactly one value
+SCALAR_MAPPINGS: Tuple[str, ...] = (
+    'cl_str2id',
+    'cl_id2str',
+    'cl_id2freq',
+    'cl_cpos2id',
+    'cl_cpos2str',
+    'cl_cpos2struc',
+    'cl_cpos2lbound',
+    'cl_cpos2rbound',
+    'cl_cpos2alg',
+    'cl_struc2str'
+)
+
+
+class Flight:
+    ''' A scalar mapping request that is being executed '''
+
+    def __init__(self):
+        self.done: threading.Event = threading.Event()
+        self.result: Optional[List] = None
+        self.error: Optional[BaseException] = None
+
+
+class CoalescingAPIClient:
+    '''
+    A thread-safe layer around a low-level client, which saves server work
+    for the scalar mappings (CL_STR2ID, CL_CPOS2STR, ...): duplicate values
+    are sent only once and the response is expanded to the original length
+    again, and identical requests of concurrent threads are merged into one
+    server call whose response all of them receive. All other commands are
+    passed through, other attributes (e.g. memory_pressure_policy) are
+    those of the wrapped client.
+
+    Example:
+    >>> import cqi
+    >>> client = cqi.CQiClient('127.0.0.1', coalesce=True)
+
+    Args:
+    api (APIClient, LoadBalancedAPIClient): The client to send commands with.
+    serialize (bool): Whether to send one command at a time, which is needed
+        unless <api> is thread-safe.
+        Default: ``True``
+    '''
+
+    def __init__(
+        self,
+        api: Union[APIClient, LoadBalancedAPIClient],
+        serialize: bool = True
+    ):
+        self.api: Union[APIClient, LoadBalancedAPIClient] = api
+        self.serialize: bool = serialize
+        #: Number of requests that received the response of another one
+        self.num_coalesced: int = 0
+        #: Number of duplicate values that have not been sent
+        self.num_deduplicated: int = 0
+        # Maps (method name, attribute, values) to requests in flight
+        self.__flights: Dict[Tuple[str, str, Tuple], Flight] = {}
+        self.__lock: threading.Lock = threading.Lock()
+        self.__api_lock: threading.Lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        value: Any = getattr(self.api, name)
+        if not callable(value):
+            # A plain attribute, e.g. the chunking policy
+            return value
+        if name in SCALAR_MAPPINGS:
+            def command(attribute: str, values: List) -> List:
+                return self.__execute_scalar_mapping(name, attribute, values)
+        elif name == 'ctrl_user_abort':
+            # Must not wait for the command it is supposed to abort
+            return value
+        else:
+            def command(*args):
+                return self.__execute(name, args)
+        command.__name__ = name
+        return command
+
+    def iter_chunks(
+        self,
+        method_name: str,
+        attribute: str,
+        values: List
+    ) -> Iterator[List]:
+        '''
+        see APIClient.iter_chunks; the session is reserved until the
+        iteration ends, i.e. until all chunks are received or the iterator
+        is closed
+        '''
+        if not self.serialize:
+            yield from self.api.iter_chunks(method_name, attribute, values)
+            return
+        with self.__api_lock:
+            yield from self.api.iter_chunks(method_name, attribute, values)
+
+    def pipeline(self, commands: List[Tuple[str, Tuple]]) -> List:
+        ''' pipeline <commands>, deduplicating the scalar mappings' values '''
+        unique_commands: List[Tuple[str, Tuple]] = []
+        expansions: List[Optional[List]] = []
+        for method_name, args in commands:
+            if method_name in SCALAR_MAPPINGS:
+                attribute, values = args
+                unique_values: List = self.__unique(values)
+                unique_commands.append(
+                    (method_name, (attribute, unique_values))
+                )
+                expansions.append(
+                    None if len(unique_values) == len(values)
+                    else [values, unique_values]
+                )
+            else:
+                unique_commands.append((method_name, args))
+                expansions.append(None)
+        responses: List = self.__execute('pipeline', (unique_commands,))
+        return [
+            response if expansion is None
+            else self.__expand(*expansion, response)
+            for response, expansion in zip(responses, expansions)
+        ]
+
+    def __unique(self, values: List) -> List:
+        unique_values: List = list(dict.fromkeys(values))
+        if len(unique_values) < len(values):
+            with self.__lock:
+                self.num_deduplicated += len(values) - len(unique_values)
+        return unique_values
+
+    def __expand(
+        self,
+        values: List,
+        unique_values: List,
+        response: List
+    ) -> List:
+        lookup: Dict = dict(zip(unique_values, response))
+        return [lookup[x] for x in values]
+
+    def __execute(self, method_name: str, args: Tuple) -> Any:
+        if not self.serialize:
+            return getattr(self.api, method_name)(*args)
+        with self.__api_lock:
+            return getattr(self.api, method_name)(*args)
+
+    def __execute_scalar_mapping(
+        self,
+        method_name: str,
+        attribute: str,
+        values: List
+    ) -> List:
+        unique_values: List = self.__unique(values)
+        key: Tuple[str, str, Tuple] = (
+            method_name,
+            attribute,
+            tuple(unique_values)
+        )
+        with self.__lock:
+            flight: Optional[Flight] = self.__flights.get(key)
+            leader: bool = flight is None
+            if leader:
+                flight = Flight()
+                self.__flights[key] = flight
+            else:
+                self.num_coalesced += 1
+        if leader:
+            try:
+                flight.result = self.__execute(
+                    method_name,
+                    (attribute, unique_values)
+                )
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with self.__lock:
+                    del self.__flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+        if len(unique_values) == len(values) and leader:
+            return flight.result
+        return self.__expand(values, unique_values, flight.result)
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+
+class MemoryPressurePolicy:
+    '''
+    An opt-in policy for recovering from CQI_CL_ERROR_OUT_OF_MEMORY. It keeps
+    track of the corpora and subcorpora a session has created or touched, in
+    least recently used order. When the server runs out of memory, the
+    client drops the least recently used subcorpus (or, if there is none,
+    corpus) and retries the failed command.
+
+    Example:
+    >>> import cqi
+    >>> client = cqi.APIClient(
+    ...     '127.0.0.1',
+    ...     memory_pressure_policy=cqi.api.MemoryPressurePolicy()
+    ... )
+
+    Args:
+    max_attempts (int): Maximum number of retries per failed command.
+        Default: ``3``
+    drop_corpora (bool): Whether corpora may be dropped when there are no
+        subcorpora left to drop.
+        Default: ``True``
+    '''
+
+    def __init__(self, max_attempts: int = 3, drop_corpora: bool = True):
+        self.max_attempts: int = max_attempts
+        self.drop_corpora: bool = drop_corpora
+        # Values are unused, the keys are kept in least recently used order
+        self.corpora: OrderedDict = OrderedDict()
+        self.subcorpora: OrderedDict = OrderedDict()
+        #: Number of CQI_CL_ERROR_OUT_OF_MEMORY errors received
+        self.num_errors: int = 0
+        #: Number of retried commands
+        self.num_retries: int = 0
+        #: Number of commands that succeeded after a retry
+        self.num_recoveries: int = 0
+        #: Number of subcorpora dropped to free memory
+        self.num_dropped_subcorpora: int = 0
+        #: Number of corpora dropped to free memory
+        self.num_dropped_corpora: int = 0
+        #: Functions called with the api name of every subcorpus or corpus
+        #: dropped to free memory, e.g. to forget its models (see CQiClient)
+        self.listeners: List[Callable[[str], None]] = []
+
+    def touch_corpus(self, corpus: str):
+        self.corpora[corpus] = None
+        self.corpora.move_to_end(corpus)
+
+    def touch_subcorpus(self, subcorpus: str):
+        self.touch_corpus(subcorpus.split(':', 1)[0])
+        self.subcorpora[subcorpus] = None
+        self.subcorpora.move_to_end(subcorpus)
+
+    def forget_corpus(self, corpus: str):
+        self.corpora.pop(corpus, None)
+
+    def forget_subcorpus(self, subcorpus: str):
+        self.subcorpora.pop(subcorpus, None)
+
+    def notify_dropped(self, name: str):
+        ''' call the listeners with the dropped subcorpus or corpus <name> '''
+        for listener in self.listeners:
+            listener(name)
+
+    def next_subcorpus(self) -> Optional[str]:
+        '''
+        returns the least recently used subcorpus; the most recently used one
+        is never returned, as it is most likely involved in the failed command
+        '''
+        if len(self.subcorpora) < 2:
+            return None
+        return next(iter(self.subcorpora))
+
+    def next_corpus(self) -> Optional[str]:
+        '''
+        returns the least recently used corpus; the most recently used one is
+        never returned, as it is most likely involved in the failed command
+        '''
+        if not self.drop_corpora or len(self.corpora) < 2:
+            return None
+        return next(iter(self.corpora))
@@ -0,0 +1,112 @@
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import threading
+import time
+
+
+class RegexCache:
+    '''
+    An opt-in least recently used cache for the results of CL_REGEX2ID, keyed
+    by attribute and regex. The lexicon IDs are stored as compact int arrays.
+
+    The cached results of an attribute are invalidated when its corpus is
+    dropped with CORPUS_DROP_CORPUS or when its lexicon size changes. The
+    lexicon size is checked before the first lookup and then at most every
+    <max_age> seconds, and whenever CL_LEXICON_SIZE is called directly.
+
+    Example:
+    >>> import cqi
+    >>> client = cqi.APIClient(
+    ...     '127.0.0.1',
+    ...     regex_cache=cqi.api.RegexCache()
+    ... )
+
+    Args:
+    max_entries (int): Maximum number of lexicon IDs in all cached results.
+        Default: ``1000000``
+    max_age (float): Time in seconds after which the lexicon size of an
+        attribute is checked again.
+        Default: ``60.0``
+    '''
+
+    def __init__(self, max_entries: int = 1000000, max_age: float = 60.0):
+        self.max_entries: int = max_entries
+        self.max_age: float = max_age
+        #: Number of lexicon IDs in all cached results
+        self.num_entries: int = 0
+        #: Number of lookups answered from the cache
+        self.num_hits: int = 0
+        #: Number of lookups sent to the server
+        self.num_misses: int = 0
+        self.results: 'OrderedDict[Tuple[str, str], array]' = OrderedDict()
+        # Maps attributes to their (lexicon size, time of the last check)
+        self.__lexicon_sizes: Dict[str, Tuple[int, float]] = {}
+        self.__lock: threading.Lock = threading.Lock()
+
+    def validated(self, attribute: str) -> bool:
+        ''' whether the lexicon size of <attribute> has been checked lately '''
+        with self.__lock:
+            lexicon_size: Optional[Tuple[int, float]] = (
+                self.__lexicon_sizes.get(attribute)
+            )
+        return (
+            lexicon_size is not None
+            and time.time() - lexicon_size[1] <= self.max_age
+        )
+
+    def observe_lexicon_size(self, attribute: str, lexicon_size: int):
+        ''' invalidate the results of <attribute> if its lexicon changed '''
+        with self.__lock:
+            previous: Optional[Tuple[int, float]] = (
+                self.__lexicon_sizes.get(attribute)
+            )
+            if previous is not None and previous[0] != lexicon_size:
+                self.__forget(lambda x: x == attribute)
+            self.__lexicon_sizes[attribute] = (lexicon_size, time.time())
+
+    def get(self, attribute: str, regex: str) -> Optional[List[int]]:
+        with self.__lock:
+            ids: Optional[array] = self.results.get((attribute, regex))
+            if ids is None:
+                self.num_misses += 1
+                return None
+            self.num_hits += 1
+            self.results.move_to_end((attribute, regex))
+            return ids.tolist()
+
+    def put(self, attribute: str, regex: str, ids: List[int]):
+        with self.__lock:
+            previous: Optional[array] = self.results.pop(
+                (attribute, regex),
+                None
+            )
+            if previous is not None:
+                self.num_entries -= len(previous)
+            self.results[(attribute, regex)] = array('i', ids)
+            self.num_entries += len(ids)
+            while (
+                self.num_entries > self.max_entries
+                and len(self.results) > 1
+            ):
+                _, evicted = self.results.popitem(last=False)
+                self.num_entries -= len(evicted)
+
+    def forget_corpus(self, corpus: str):
+        ''' invalidate the results of all attributes of <corpus> '''
+        with self.__lock:
+            self.__forget(lambda x: x.split('.', 1)[0] == corpus)
+            self.__lexicon_sizes = {
+                k: v for k, v in self.__lexicon_sizes.items()
+                if k.split('.', 1)[0] != corpus
+            }
+
+    def clear(self):
+        with self.__lock:
+            self.results.clear()
+            self.__lexicon_sizes.clear()
+            self.num_entries = 0
+
+    def __forget(self, match):
+        for key in [x for x in self.results if match(x[0])]:
+            self.num_entries -= len(self.results.pop(key))
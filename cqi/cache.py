@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import Optional, Tuple, TYPE_CHECKING
+import hashlib
+import re
+if TYPE_CHECKING:
+    from .models.corpora import Corpus
+    from .models.subcorpora import Subcorpus
+from . import errors
+
+
+def normalize_query(query: str) -> str:
+    '''
+    Collapse whitespace outside of quoted strings and make sure the query is
+    terminated by a single ';' character.
+    '''
+    parts = re.split(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')', query)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r'\s+', ' ', parts[i])
+    normalized_query: str = ''.join(parts).strip()
+    return normalized_query.rstrip(';').rstrip() + ';'
+
+
+class QueryCache:
+    '''
+    A least recently used cache for query results. Each distinct
+    (normalized) query is executed once and its result is kept on the server
+    as a subcorpus with a deterministic name.
+
+    Args:
+    max_size (int): Maximum number of cached subcorpora.
+        Default: ``32``
+    max_hits (int): Maximum number of matches in all cached subcorpora,
+        ``None`` for no limit.
+        Default: ``None``
+    '''
+
+    #: Prefix of the names of subcorpora created by the cache
+    subcorpus_name_prefix: str = 'QueryCache_'
+
+    def __init__(self, max_size: int = 32, max_hits: Optional[int] = None):
+        self.max_size: int = max_size
+        self.max_hits: Optional[int] = max_hits
+        #: Number of matches in all cached subcorpora
+        self.num_hits: int = 0
+        self.subcorpora: 'OrderedDict[Tuple[str, str], Subcorpus]' = (
+            OrderedDict()
+        )
+
+    def query(self, corpus: 'Corpus', query: str) -> 'Subcorpus':
+        '''
+        returns the subcorpus holding the result of <query>, executing it
+        only if it is not cached or has been dropped on the server
+        '''
+        normalized_query: str = normalize_query(query)
+        key: Tuple[str, str] = (corpus.api_name, normalized_query)
+        subcorpus: Optional['Subcorpus'] = self.subcorpora.get(key)
+        if subcorpus is not None:
+            if subcorpus.name in corpus.client.api.cqp_list_subcorpora(
+                corpus.api_name
+            ):
+                self.subcorpora.move_to_end(key)
+                return subcorpus
+            self.__remove(key)
+        subcorpus_name: str = (
+            self.subcorpus_name_prefix
+            + hashlib.sha1(normalized_query.encode()).hexdigest()
+        )
+        corpus.query(subcorpus_name, normalized_query)
+        subcorpus = corpus.subcorpora.get(subcorpus_name)
+        self.subcorpora[key] = subcorpus
+        self.num_hits += subcorpus.size
+        self.__evict()
+        return subcorpus
+
+    def clear(self):
+        ''' drop all cached subcorpora '''
+        while len(self.subcorpora) > 0:
+            self.__drop(next(iter(self.subcorpora)))
+
+    def __evict(self):
+        # The most recently used subcorpus is never evicted
+        while len(self.subcorpora) > 1 and (
+            len(self.subcorpora) > self.max_size
+            or (self.max_hits is not None and self.num_hits > self.max_hits)
+        ):
+            self.__drop(next(iter(self.subcorpora)))
+
+    def __drop(self, key: Tuple[str, str]):
+        subcorpus: 'Subcorpus' = self.__remove(key)
+        try:
+            subcorpus.drop()
+        except errors.CQPError:
+            # The subcorpus is already gone
+            pass
+
+    def __remove(self, key: Tuple[str, str]) -> 'Subcorpus':
+        subcorpus: 'Subcorpus' = self.subcorpora.pop(key)
+        self.num_hits -= subcorpus.size
+        return subcorpus
@@ -1,8 +1,21 @@
-from typing import TYPE_CHECKING
+from typing import (
+    Dict,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    TYPE_CHECKING
+)
 if TYPE_CHECKING:
+    from .api import MemoryPressurePolicy
+    from .models.resource import Model
+    from .sharedtables import SharedTableCache
     from .status import StatusByeOk, StatusConnectOk, StatusPingOk
-from .api import APIClient
+from .api import APIClient, CoalescingAPIClient, LoadBalancedAPIClient
+from .cache import QueryCache
 from .models.corpora import CorpusCollection
+from .models.subcorpora import Subcorpus, SubcorpusCollection
 
 
 
@@ -21,6 +34,9 @@ class CQiClient:
     Args:
     host (str): URL to the CQP server.
         For example ``cqpserver.localhost`` or ``127.0.0.1``.
+        A list (or another non-string sequence) of hosts or (host, port)
+        tuples connects to several replicated servers through a
+        LoadBalancedAPIClient.
     port (int): Port the CQP server listens on.
         Default: ``4877``
     version (str): The version of the CQi protocol to use.
@@ -29,14 +45,71 @@ class CQiClient:
         Default: ``4096``
     timeout (float): Default timeout for API calls, in seconds.
         Default: ``60.0``
+    pipeline_bufsize (int): Maximum number of bytes to send at once when
+        pipelining commands.
+        Default: ``65536``
+    memory_pressure_policy (MemoryPressurePolicy): Policy for recovering
+        from CQI_CL_ERROR_OUT_OF_MEMORY, ``None`` to raise the error.
+        Default: ``None``
+    chunking_policy (ChunkingPolicy): Policy for splitting the list arguments
+        of list-valued commands into chunks.
+        Default: a new ``ChunkingPolicy``
+    regex_cache (RegexCache): Cache for the results of CL_REGEX2ID, ``None``
+        to evaluate every regex on the server.
+        Default: ``None``
+    coalesce (bool): Whether to send commands through a CoalescingAPIClient,
+        which deduplicates the values of scalar mappings and merges identical
+        requests of concurrent threads.
+        Default: ``False``
+    query_cache (QueryCache): Cache for the results of Corpus.cached_query,
+        e.g. one with other limits.
+        Default: a new ``QueryCache``
+    table_cache (SharedTableCache): Cache for the tables of attributes
+        (lexicon indexes, frequency vectors, region and alignment tables),
+        shared with other processes through memory mapped files, ``None`` to
+        download them in every process.
+        Default: ``None``
     '''
 
-    def __init__(self, *args, **kwargs):
-        self.api: APIClient = APIClient(*args, **kwargs)
+    def __init__(
+        self,
+        host,
+        *args,
+        coalesce: bool = False,
+        query_cache: Optional[QueryCache] = None,
+        table_cache: Optional['SharedTableCache'] = None,
+        **kwargs
+    ):
+        self.api: Union[APIClient, CoalescingAPIClient, LoadBalancedAPIClient]
+        if isinstance(host, Sequence) and not isinstance(host, (str, bytes)):
+            self.api = LoadBalancedAPIClient(host, *args, **kwargs)
+        else:
+            self.api = APIClient(host, *args, **kwargs)
+        if coalesce:
+            self.api = CoalescingAPIClient(
+                self.api,
+                serialize=not isinstance(self.api, LoadBalancedAPIClient)
+            )
+        #: Cache for results of Corpus.cached_query
+        self.query_cache: QueryCache = (
+            QueryCache() if query_cache is None else query_cache
+        )
+        #: Cache for the tables of attributes, shared between processes
+        self.table_cache: Optional['SharedTableCache'] = table_cache
+        #: Shared model instances by (model class, api name)
+        self.identity_map: Dict[Tuple[Type['Model'], str], 'Model'] = {}
+        self.__corpora: CorpusCollection = CorpusCollection(client=self)
+        memory_pressure_policy: Optional['MemoryPressurePolicy'] = getattr(
+            self.api,
+            'memory_pressure_policy',
+            None
+        )
+        if memory_pressure_policy is not None:
+            memory_pressure_policy.listeners.append(self.__forget_dropped)
 
     @property
     def corpora(self) -> CorpusCollection:
-        return CorpusCollection(client=self)
+        return self.__corpora
 
     def bye(self) -> 'StatusByeOk':
         return self.api.ctrl_bye()
@@ -50,5 +123,24 @@ class CQiClient:
     def user_abort(self):
         self.api.ctrl_user_abort()
 
+    def __forget_dropped(self, name: str):
+        '''
+        forget the models of a subcorpus or of all subcorpora of a corpus
+        that the memory pressure policy dropped on the server
+        '''
+        corpus_name, _, subcorpus_name = name.partition(':')
+        subcorpora: SubcorpusCollection = (
+            self.corpora._lazy_model(corpus_name).subcorpora
+        )
+        if subcorpus_name != '':
+            subcorpora._forget(subcorpus_name)
+            return
+        for model_type, api_name in list(self.identity_map):
+            if (
+                model_type is Subcorpus
+                and api_name.split(':', 1)[0] == corpus_name
+            ):
+                subcorpora._forget(api_name.split(':', 1)[1])
+
     # Method aliases
     disconnect = bye
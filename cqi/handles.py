@@ -0,0 +1,155 @@
+from typing import Any, Dict, Optional, Tuple, Type, TYPE_CHECKING
+if TYPE_CHECKING:
+    from .models.resource import Model
+from .client import CQiClient
+from .models.attributes import (
+    AlignmentAttribute,
+    PositionalAttribute,
+    StructuralAttribute
+)
+from .models.corpora import Corpus
+from .models.resource import Attrs
+import os
+import threading
+
+
+'''
+' NOTE: Handles are picklable references to models, e.g. for passing them to
+'       the workers of a ProcessPoolExecutor. Each process connects its own
+'       client on first use of a handle, using the connection settings given
+'       to configure(). A forked process never reuses the client (and thus
+'       the socket) of its parent.
+'       Subcorpora have no handles, as they exist only in the server session
+'       of the client that created them (see Subcorpus.handle).
+'''
+
+_connection_settings: Optional[Tuple[Tuple, Dict, str, str]] = None
+_client: Optional[CQiClient] = None
+_client_pid: Optional[int] = None
+_lock: threading.Lock = threading.Lock()
+
+# The Corpus property holding the collection of each model type
+_collection_names: Dict[Type['Model'], str] = {
+    AlignmentAttribute: 'alignment_attributes',
+    PositionalAttribute: 'positional_attributes',
+    StructuralAttribute: 'structural_attributes'
+}
+
+
+def configure(username: str, password: str, *args, **kwargs):
+    '''
+    Set the connection settings of the per-process client that handles are
+    bound to. <args> and <kwargs> are passed to CQiClient. Call this in the
+    parent process before forking, or pass it as initializer to the process
+    pool, e.g.
+
+    >>> ProcessPoolExecutor(
+    ...     initializer=cqi.handles.configure,
+    ...     initargs=('username', 'password', '127.0.0.1')
+    ... )
+    '''
+    global _connection_settings, _client
+    with _lock:
+        _connection_settings = (args, kwargs, username, password)
+        _client = None
+
+
+def get_client() -> CQiClient:
+    ''' returns the client of this process, connecting it on first use '''
+    global _client, _client_pid
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            if _connection_settings is None:
+                raise RuntimeError(
+                    'No connection settings, call cqi.handles.configure first'
+                )
+            args, kwargs, username, password = _connection_settings
+            client: CQiClient = CQiClient(*args, **kwargs)
+            client.connect(username, password)
+            _client = client
+            _client_pid = os.getpid()
+        return _client
+
+
+def _forget_client():
+    global _client, _lock
+    # Closing the inherited socket in the child does not affect the parent's
+    # connection, as the parent still holds its file descriptor
+    _client = None
+    # Another thread of the parent may have held the lock while forking, it
+    # would never be released in the child
+    _lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_client)
+
+
+class Handle:
+    '''
+    A picklable reference to a model, which carries only the model type, the
+    names identifying the model and its loaded attributes. On first use it is
+    bound to the equivalent model of the process' client, to which all
+    attribute access is delegated.
+
+    Example:
+    >>> handle = corpus.positional_attributes.get('word').handle()
+    >>> handle.lexicon_size  # connects the client of this process
+    >>> handle.values_by_ids([0, 1])  # uses the client of this process
+
+    Binding a handle connects the process' client if it is not connected
+    yet, but the model is not loaded again: its cached attributes, e.g.
+    lexicon_size, are answered without further round trips.
+    '''
+
+    __slots__ = ('model_type', 'corpus_name', 'name', 'attrs', '_model')
+
+    def __init__(
+        self,
+        model_type: Type['Model'],
+        corpus_name: str,
+        name: str,
+        attrs: Dict
+    ):
+        self.model_type: Type['Model'] = model_type
+        self.corpus_name: str = corpus_name
+        self.name: str = name
+        self.attrs: Dict = attrs
+        self._model: Optional['Model'] = None
+
+    def __reduce__(self):
+        return (
+            Handle,
+            (self.model_type, self.corpus_name, self.name, self.attrs)
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f'<Handle: {self.model_type.__name__}: {self.attrs["api_name"]}>'
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def resolve(self) -> 'Model':
+        ''' returns the model bound to the client of this process '''
+        client: CQiClient = get_client()
+        if self._model is None or self._model.client is not client:
+            # The corpus is not checked to exist, the handle was created
+            # from a loaded model
+            corpus: Corpus = client.corpora._lazy_model(self.corpus_name)
+            model: 'Model'
+            if self.model_type is Corpus:
+                model = corpus
+            else:
+                model = getattr(
+                    corpus,
+                    _collection_names[self.model_type]
+                )._lazy_model(self.name)
+            if isinstance(model.attrs, Attrs) and model.attrs.load is not None:
+                # The cached attributes spare the round trips to load them
+                model.attrs.update(self.attrs)
+            self._model = model
+        return self._model
@@ -0,0 +1,430 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import heapq
+import math
+import sys
+from itertools import accumulate, chain
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+if TYPE_CHECKING:
+    from .models.attributes import PositionalAttribute
+
+
+class StringArray(Sequence[str]):
+    '''
+    A read-only sequence of strings, stored as the concatenation of their
+    UTF-8 encodings and the offsets of each string in it. Unlike a list of
+    str objects, both arrays can be shared between processes (see
+    cqi.sharedtables.SharedTableCache); strings are decoded on access.
+
+    Args:
+    blob (bytes): The concatenated UTF-8 encoded strings.
+    offsets (array): The start offset of each string in <blob>, followed by
+        the length of <blob>.
+    '''
+
+    def __init__(self, blob: Sequence[int], offsets: Sequence[int]):
+        self.blob: Sequence[int] = blob
+        self.offsets: Sequence[int] = offsets
+
+    @classmethod
+    def from_strings(cls, strings: List[str]) -> 'StringArray':
+        encoded_strings: List[bytes] = [x.encode() for x in strings]
+        return cls(
+            b''.join(encoded_strings),
+            array('q', chain((0,), accumulate(map(len, encoded_strings))))
+        )
+
+    def __repr__(self) -> str:
+        return f'<StringArray: {len(self)} strings>'
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('StringArray index out of range')
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode()
+
+
+class _SortedKeys(Sequence[str]):
+    ''' The (reversed) strings of a StringArray in the order of <ids> '''
+
+    def __init__(
+        self,
+        values: Sequence[str],
+        ids: Sequence[int],
+        reverse: bool = False
+    ):
+        self.values: Sequence[str] = values
+        self.ids: Sequence[int] = ids
+        self.reverse: bool = reverse
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> str:
+        value: str = self.values[self.ids[i]]
+        return value[::-1] if self.reverse else value
+
+
+class _RangeMaxTree:
+    '''
+    A segment tree over the frequencies of <ids>, for finding the most
+    frequent IDs in a range of <ids> without visiting all of them. Each
+    inner node holds the position (in <ids>) of the most frequent ID below
+    it, the leaves are the positions themselves.
+    '''
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        freqs: Sequence[int],
+        nodes: Optional[Sequence[int]] = None
+    ):
+        self.ids: Sequence[int] = ids
+        self.freqs: Sequence[int] = freqs
+        n: int = len(ids)
+        if nodes is None:
+            nodes = array('l', [0]) * n
+            nodes.extend(range(n))
+            for i in range(n - 1, 0, -1):
+                nodes[i] = self.__max(nodes[2 * i], nodes[2 * i + 1])
+        self.nodes: Sequence[int] = nodes
+
+    def __max(self, a: int, b: int) -> int:
+        ''' the more frequent position, the first one of equal ones '''
+        if a < 0:
+            return b
+        freq_a: int = self.freqs[self.ids[a]]
+        freq_b: int = self.freqs[self.ids[b]]
+        return a if freq_a > freq_b or (freq_a == freq_b and a < b) else b
+
+    def argmax(self, start: int, end: int) -> int:
+        '''
+        returns the position of the most frequent ID in <start> .. <end> - 1,
+        -1 if the range is empty
+        '''
+        result: int = -1
+        start += len(self.ids)
+        end += len(self.ids)
+        while start < end:
+            if start & 1:
+                result = self.__max(result, self.nodes[start])
+                start += 1
+            if end & 1:
+                end -= 1
+                result = self.__max(result, self.nodes[end])
+            start >>= 1
+            end >>= 1
+        return result
+
+    def top_k(self, start: int, end: int, k: int) -> List[int]:
+        '''
+        returns the positions of the <k> most frequent IDs in <start> ..
+        <end> - 1, in O(k log n): the most frequent position splits its range
+        into two, whose maxima are the next candidates
+        '''
+        candidates: List[Tuple[int, int, int, int]] = []
+
+        def push(start: int, end: int):
+            if start < end:
+                i: int = self.argmax(start, end)
+                heapq.heappush(
+                    candidates,
+                    (-self.freqs[self.ids[i]], i, start, end)
+                )
+
+        positions: List[int] = []
+        push(start, end)
+        while len(candidates) > 0 and len(positions) < k:
+            _, i, start, end = heapq.heappop(candidates)
+            positions.append(i)
+            push(start, i)
+            push(i + 1, end)
+        return positions
+
+
+class LexiconIndex:
+    '''
+    A local index over the complete lexicon of a positional attribute, for
+    prefix and suffix lookups without a round trip, e.g. for autocompletion.
+    It is built once, from CL_ID2STR over all lexicon IDs and the
+    attribute's frequency vector (see
+    PositionalAttribute.frequency_vector), and kept in flat arrays (see
+    to_arrays).
+
+    Example:
+    >>> from cqi.lexicon import LexiconIndex
+    >>> index = LexiconIndex(corpus.positional_attributes.get('word'))
+    >>> index.complete('ca', k=2)
+    [('cat', 4), ('car', 1)]
+
+    Args:
+    attribute (PositionalAttribute): The attribute to index.
+    '''
+
+    def __init__(self, attribute: 'PositionalAttribute'):
+        self.attribute: 'PositionalAttribute' = attribute
+        ids: List[int] = list(range(attribute.lexicon_size))
+        values: List[str] = attribute.values_by_ids(ids)
+        #: The lexicon, indexed by ID
+        self.values: Sequence[str] = StringArray.from_strings(values)
+        #: The corpus frequencies, indexed by ID
+        self.freqs: Sequence[int] = attribute.frequency_vector().freqs
+        # IDs sorted by their value, and by their reversed value
+        self.__prefix_ids: Sequence[int] = array(
+            'l',
+            sorted(ids, key=values.__getitem__)
+        )
+        self.__suffix_ids: Sequence[int] = array(
+            'l',
+            sorted(ids, key=lambda x: values[x][::-1])
+        )
+        # For the most frequent IDs of a prefix or suffix
+        self.__prefix_tree: _RangeMaxTree = _RangeMaxTree(
+            self.__prefix_ids,
+            self.freqs
+        )
+        self.__suffix_tree: _RangeMaxTree = _RangeMaxTree(
+            self.__suffix_ids,
+            self.freqs
+        )
+        # The position of each ID in __prefix_ids, computed on first use
+        self.__ranks: Optional[array] = None
+
+    @classmethod
+    def from_arrays(
+        cls,
+        attribute: 'PositionalAttribute',
+        arrays: Dict[str, Sequence]
+    ) -> 'LexiconIndex':
+        '''
+        Build an index from the arrays of another index (see to_arrays),
+        without copying them.
+        '''
+        lexicon_index: LexiconIndex = cls.__new__(cls)
+        lexicon_index.attribute = attribute
+        lexicon_index.values = StringArray(arrays['blob'], arrays['offsets'])
+        lexicon_index.freqs = arrays['freqs']
+        lexicon_index.__prefix_ids = arrays['prefix_ids']
+        lexicon_index.__suffix_ids = arrays['suffix_ids']
+        lexicon_index.__prefix_tree = _RangeMaxTree(
+            arrays['prefix_ids'],
+            arrays['freqs'],
+            arrays['prefix_tree']
+        )
+        lexicon_index.__suffix_tree = _RangeMaxTree(
+            arrays['suffix_ids'],
+            arrays['freqs'],
+            arrays['suffix_tree']
+        )
+        lexicon_index.__ranks = None
+        return lexicon_index
+
+    def to_arrays(self) -> Dict[str, Sequence]:
+        return {
+            'blob': self.values.blob,
+            'offsets': self.values.offsets,
+            'freqs': self.freqs,
+            'prefix_ids': self.__prefix_ids,
+            'suffix_ids': self.__suffix_ids,
+            'prefix_tree': self.__prefix_tree.nodes,
+            'suffix_tree': self.__suffix_tree.nodes
+        }
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def ranks(self) -> Sequence[int]:
+        '''
+        returns the rank of each ID when the lexicon is sorted by value,
+        indexed by ID, e.g. for sorting tokens by value without resolving
+        their strings
+        '''
+        if self.__ranks is None:
+            ranks: array = array('l', [0]) * len(self.__prefix_ids)
+            for rank, id in enumerate(self.__prefix_ids):
+                ranks[id] = rank
+            self.__ranks = ranks
+        return self.__ranks
+
+    def ids_by_prefix(self, prefix: str) -> List[int]:
+        ''' returns the IDs of all values starting with <prefix> '''
+        start, end = self.__prefix_range(prefix)
+        return self.__prefix_ids[start:end].tolist()
+
+    def ids_by_suffix(self, suffix: str) -> List[int]:
+        ''' returns the IDs of all values ending with <suffix> '''
+        start, end = self.__suffix_range(suffix)
+        return self.__suffix_ids[start:end].tolist()
+
+    def complete(self, prefix: str, k: int = 10) -> List[Tuple[str, int]]:
+        '''
+        returns the (value, frequency) pairs of the <k> most frequent values
+        starting with <prefix>
+        '''
+        return self.__top_k(self.__prefix_tree, self.__prefix_range(prefix), k)
+
+    def complete_suffix(
+        self,
+        suffix: str,
+        k: int = 10
+    ) -> List[Tuple[str, int]]:
+        '''
+        returns the (value, frequency) pairs of the <k> most frequent values
+        ending with <suffix>
+        '''
+        return self.__top_k(self.__suffix_tree, self.__suffix_range(suffix), k)
+
+    def __prefix_range(self, prefix: str) -> Tuple[int, int]:
+        return self.__range(
+            _SortedKeys(self.values, self.__prefix_ids),
+            prefix
+        )
+
+    def __suffix_range(self, suffix: str) -> Tuple[int, int]:
+        return self.__range(
+            _SortedKeys(self.values, self.__suffix_ids, reverse=True),
+            suffix[::-1]
+        )
+
+    def __range(self, keys: Sequence[str], prefix: str) -> Tuple[int, int]:
+        ''' returns the start and end index of <prefix> in <keys> '''
+        start: int = bisect_left(keys, prefix)
+        # The smallest string greater than all strings with the prefix, the
+        # last code point cannot be incremented
+        bound: str = prefix.rstrip(chr(sys.maxunicode))
+        if bound == '':
+            return (start, len(keys))
+        end: int = bisect_left(
+            keys,
+            bound[:-1] + chr(ord(bound[-1]) + 1),
+            lo=start
+        )
+        return (start, end)
+
+    def __top_k(
+        self,
+        tree: _RangeMaxTree,
+        bounds: Tuple[int, int],
+        k: int
+    ) -> List[Tuple[str, int]]:
+        ids: List[int] = [tree.ids[x] for x in tree.top_k(*bounds, k)]
+        return [(self.values[x], self.freqs[x]) for x in ids]
+
+
+class FrequencyVector:
+    '''
+    The corpus frequencies of all lexicon IDs of a positional attribute
+    (see PositionalAttribute.frequency_vector), indexed by ID.
+
+    Example:
+    >>> freqs = corpus.positional_attributes.get('word').frequency_vector()
+    >>> freqs[42]
+    17
+    >>> freqs.top_k(2)
+    [(4, 6), (6, 5)]
+    '''
+
+    def __init__(self, freqs: List[int]):
+        self.freqs: Sequence[int] = array('q', freqs)
+        # The frequencies in ascending order, sorted on first use
+        self.__sorted_freqs: Optional[array] = None
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, Sequence]) -> 'FrequencyVector':
+        '''
+        Build a vector from the arrays of another vector (see to_arrays),
+        without copying them.
+        '''
+        frequency_vector: FrequencyVector = cls.__new__(cls)
+        frequency_vector.freqs = arrays['freqs']
+        frequency_vector.__sorted_freqs = None
+        return frequency_vector
+
+    def to_arrays(self) -> Dict[str, Sequence]:
+        return {'freqs': self.freqs}
+
+    def __len__(self) -> int:
+        return len(self.freqs)
+
+    def __getitem__(self, id: int) -> int:
+        return self.freqs[id]
+
+    @property
+    def num_tokens(self) -> int:
+        return sum(self.freqs)
+
+    @property
+    def num_types(self) -> int:
+        ''' number of lexicon IDs that occur in the corpus '''
+        return len(self.freqs) - self.freqs.tolist().count(0)
+
+    def freqs_by_ids(self, id_list: List[int]) -> List[int]:
+        ''' returns 0 for every ID in <id_list> that is out of range '''
+        n: int = len(self.freqs)
+        return [self.freqs[x] if 0 <= x < n else 0 for x in id_list]
+
+    def top_k(self, k: int) -> List[Tuple[int, int]]:
+        ''' returns the (id, frequency) pairs of the <k> most frequent IDs '''
+        return [
+            (x, self.freqs[x]) for x in heapq.nlargest(
+                k,
+                range(len(self.freqs)),
+                key=self.freqs.__getitem__
+            )
+        ]
+
+    def band(
+        self,
+        min_freq: int,
+        max_freq: Optional[int] = None
+    ) -> List[int]:
+        '''
+        returns the IDs with a frequency of at least <min_freq> and at most
+        <max_freq>
+        '''
+        return [
+            i for i, x in enumerate(self.freqs)
+            if x >= min_freq and (max_freq is None or x <= max_freq)
+        ]
+
+    def rank(self, id: int) -> int:
+        '''
+        returns the frequency rank of <id>, starting at 1; IDs with equal
+        frequencies share the best rank
+        '''
+        sorted_freqs: array = self.__sorted()
+        return (
+            len(sorted_freqs)
+            - bisect_right(sorted_freqs, self.freqs[id])
+            + 1
+        )
+
+    def ranked_freqs(self) -> List[int]:
+        ''' returns the frequencies in descending order '''
+        return self.__sorted()[::-1].tolist()
+
+    def zipf_exponent(self) -> float:
+        '''
+        returns the exponent s of Zipf's law f(r) ~ r^-s, fitted by least
+        squares to the log frequencies and log ranks of all occurring IDs
+        '''
+        points: List[Tuple[float, float]] = [
+            (math.log(r), math.log(f))
+            for r, f in enumerate(self.ranked_freqs(), 1) if f > 0
+        ]
+        if len(points) < 2:
+            raise ValueError('At least two occurring IDs are needed')
+        mean_x: float = sum(x for x, _ in points) / len(points)
+        mean_y: float = sum(y for _, y in points) / len(points)
+        return -sum(
+            (x - mean_x) * (y - mean_y) for x, y in points
+        ) / sum((x - mean_x) ** 2 for x, _ in points)
+
+    def __sorted(self) -> array:
+        if self.__sorted_freqs is None:
+            self.__sorted_freqs = array('q', sorted(self.freqs))
+        return self.__sorted_freqs
@@ -0,0 +1,276 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import (
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING
+)
+if TYPE_CHECKING:
+    from .models.attributes import PositionalAttribute
+from .analytics import MatchAnalyticsMixin
+from .constants import FIELD_MATCH, FIELD_MATCHEND
+from .models.subcorpora import Subcorpus
+from . import errors
+
+
+class MatchSet(MatchAnalyticsMixin):
+    '''
+    A set of matches held on the client, as (match, matchend) corpus
+    positions in two int arrays sorted by match and matchend. Match sets
+    are combined with set operations that CQi lacks, e.g.
+
+    >>> from cqi.matchsets import MatchSet
+    >>> a = MatchSet.from_subcorpus(corpus.subcorpora.get('A'))
+    >>> b = MatchSet.from_subcorpus(corpus.subcorpora.get('B'))
+    >>> both = a & b
+    >>> both.fdist_span(corpus.positional_attributes.get('word'))
+
+    and analyzed like subcorpora with the MATCH and MATCHEND fields, see
+    fdist_1 and cqi.analytics.MatchAnalyticsMixin.
+
+    Args:
+    matches (list): The match corpus positions.
+    matchends (list): The matchend corpus positions.
+    '''
+
+    def __init__(self, matches: List[int], matchends: List[int]):
+        pairs: List[Tuple[int, int]] = list(zip(matches, matchends))
+        if any(pairs[i] >= pairs[i + 1] for i in range(len(pairs) - 1)):
+            pairs = sorted(set(pairs))
+        self.matches: array = array('l', (x[0] for x in pairs))
+        self.matchends: array = array('l', (x[1] for x in pairs))
+
+    @classmethod
+    def from_subcorpus(
+        cls,
+        subcorpus: Subcorpus,
+        page_size: int = 100000
+    ) -> 'MatchSet':
+        '''
+        Dump the matches of <subcorpus> page by page, <page_size> matches
+        per pipelined exchange.
+        '''
+        match_set: MatchSet = cls([], [])
+        for first in range(0, subcorpus.size, page_size):
+            last: int = min(first + page_size, subcorpus.size) - 1
+            matches, matchends = subcorpus.client.api.pipeline(
+                [
+                    (
+                        'cqp_dump_subcorpus',
+                        (subcorpus.api_name, field, first, last)
+                    )
+                    for field in (FIELD_MATCH, FIELD_MATCHEND)
+                ]
+            )
+            match_set.matches.extend(matches)
+            match_set.matchends.extend(matchends)
+        if any(
+            (match_set.matches[i], match_set.matchends[i])
+            >= (match_set.matches[i + 1], match_set.matchends[i + 1])
+            for i in range(len(match_set) - 1)
+        ):
+            # The subcorpus has been sorted by other criteria
+            return cls(match_set.matches, match_set.matchends)
+        return match_set
+
+    def __repr__(self) -> str:
+        return f'<MatchSet: {len(self)} matches>'
+
+    def __len__(self) -> int:
+        return len(self.matches)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.matches, self.matchends)
+
+    def __contains__(self, match: Tuple[int, int]) -> bool:
+        i: int = bisect_left(self.matches, match[0])
+        while i < len(self.matches) and self.matches[i] == match[0]:
+            if self.matchends[i] == match[1]:
+                return True
+            i += 1
+        return False
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, MatchSet)
+            and self.matches == other.matches
+            and self.matchends == other.matchends
+        )
+
+    def __and__(self, other: 'MatchSet') -> 'MatchSet':
+        return self.intersection(other)
+
+    def __or__(self, other: 'MatchSet') -> 'MatchSet':
+        return self.union(other)
+
+    def __sub__(self, other: 'MatchSet') -> 'MatchSet':
+        return self.difference(other)
+
+    @property
+    def size(self) -> int:
+        return len(self.matches)
+
+    def intersection(self, other: 'MatchSet') -> 'MatchSet':
+        ''' returns the matches that are in both sets '''
+        return self.__merge(other, True, False, False)
+
+    def union(self, other: 'MatchSet') -> 'MatchSet':
+        ''' returns the matches that are in either set '''
+        return self.__merge(other, True, True, True)
+
+    def difference(self, other: 'MatchSet') -> 'MatchSet':
+        ''' returns the matches that are not in <other> '''
+        return self.__merge(other, False, True, False)
+
+    def within(self, other: 'MatchSet') -> 'MatchSet':
+        ''' returns the matches that lie inside a match of <other> '''
+        # The largest matchend of the matches of other up to each index
+        max_matchends: List[int] = list(accumulate(other.matchends, max))
+
+        def predicate(match: int, matchend: int) -> bool:
+            # Matches of other starting at or before match
+            i: int = bisect_right(other.matches, match)
+            return i > 0 and max_matchends[i - 1] >= matchend
+
+        return self.__select(predicate)
+
+    def containing(self, other: 'MatchSet') -> 'MatchSet':
+        ''' returns the matches that contain a match of <other> '''
+        # The smallest matchend of the matches of other from each index on
+        min_matchends: List[int] = list(
+            accumulate(reversed(other.matchends), min)
+        )[::-1]
+
+        def predicate(match: int, matchend: int) -> bool:
+            # Matches of other starting at or after match
+            i: int = bisect_left(other.matches, match)
+            return i < len(other) and min_matchends[i] <= matchend
+
+        return self.__select(predicate)
+
+    def overlapping(self, other: 'MatchSet') -> 'MatchSet':
+        ''' returns the matches that share a corpus position with <other> '''
+        max_matchends: List[int] = list(accumulate(other.matchends, max))
+
+        def predicate(match: int, matchend: int) -> bool:
+            # Matches of other starting at or before matchend
+            i: int = bisect_right(other.matches, matchend)
+            return i > 0 and max_matchends[i - 1] >= match
+
+        return self.__select(predicate)
+
+    def dump(self, field: int, first: int, last: int) -> List[int]:
+        '''
+        Dump the values of <field> for match ranges <first> .. <last>.
+        <field> is cqi.constants.FIELD_MATCH or cqi.constants.FIELD_MATCHEND.
+        '''
+        if field == FIELD_MATCH:
+            values: array = self.matches
+        elif field == FIELD_MATCHEND:
+            values = self.matchends
+        else:
+            raise errors.CQPErrorInvalidField()
+        if not 0 <= first <= last < len(values):
+            raise errors.CQPErrorOutOfRange()
+        return values[first:last + 1].tolist()
+
+    def fdist_1(
+        self,
+        cutoff: int,
+        field: int,
+        attribute: 'PositionalAttribute'
+    ) -> List[int]:
+        '''
+        frequency distribution of single tokens
+
+        returns <n> (id, frequency) pairs flattened into a list of size 2*<n>
+
+        NB: pairs are sorted by frequency desc.
+        '''
+        return [
+            x for id, freq in self._fdist_1_dict(field, attribute).items()
+            if freq >= cutoff for x in (id, freq)
+        ]
+
+    def __merge(
+        self,
+        other: 'MatchSet',
+        keep_both: bool,
+        keep_self: bool,
+        keep_other: bool
+    ) -> 'MatchSet':
+        result: MatchSet = MatchSet([], [])
+        i: int = 0
+        j: int = 0
+        while i < len(self) or j < len(other):
+            x: Optional[Tuple[int, int]] = (
+                (self.matches[i], self.matchends[i]) if i < len(self)
+                else None
+            )
+            y: Optional[Tuple[int, int]] = (
+                (other.matches[j], other.matchends[j]) if j < len(other)
+                else None
+            )
+            if y is None or (x is not None and x < y):
+                keep: bool = keep_self
+                i += 1
+            elif x is None or y < x:
+                keep = keep_other
+                x = y
+                j += 1
+            else:
+                keep = keep_both
+                i += 1
+                j += 1
+            if keep:
+                result.matches.append(x[0])
+                result.matchends.append(x[1])
+        return result
+
+    def __select(self, predicate: Callable[[int, int], bool]) -> 'MatchSet':
+        result: MatchSet = MatchSet([], [])
+        for match, matchend in self:
+            if predicate(match, matchend):
+                result.matches.append(match)
+                result.matchends.append(matchend)
+        return result
+
+
+class SortedMatches:
+    '''
+    The matches of a subcorpus in a client-side order (see
+    Subcorpus.sort_by), which are dumped page by page on request.
+
+    Args:
+    subcorpus (Subcorpus): The subcorpus the matches belong to.
+    order (list): The subcorpus indices of the matches in sort order.
+    '''
+
+    def __init__(self, subcorpus: Subcorpus, order: List[int]):
+        self.subcorpus: Subcorpus = subcorpus
+        self.order: array = array('l', order)
+
+    def __repr__(self) -> str:
+        return f'<SortedMatches: {self.subcorpus.api_name}>'
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def page(
+        self,
+        number: int,
+        page_size: int = 25,
+        max_gap: int = 64
+    ) -> List[Tuple[int, int]]:
+        '''
+        returns the (match, matchend) pairs of page <number>, starting at 0;
+        see Subcorpus.sample for <max_gap>
+        '''
+        return self.subcorpus._dump_indices(
+            self.order[number * page_size:(number + 1) * page_size].tolist(),
+            max_gap
+        )
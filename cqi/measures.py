@@ -0,0 +1,144 @@
+from typing import Callable, Dict, List
+import math
+
+
+'''
+' NOTE: association measures are computed from the contingency table of a
+'       collocate, following the notation of Evert (2004):
+'       - o11: co-occurrence frequency of node and collocate
+'       - r1: number of tokens in the windows around the node
+'       - c1: frequency of the collocate in the corpus
+'       - n: number of tokens in the corpus
+'''
+
+
+def _expected(r1: int, c1: int, n: int) -> float:
+    return r1 * c1 / n
+
+
+def log_likelihood(o11: int, r1: int, c1: int, n: int) -> float:
+    ''' log-likelihood (G2) '''
+    o12: int = r1 - o11
+    o21: int = c1 - o11
+    o22: int = n - r1 - c1 + o11
+    r2: int = n - r1
+    c2: int = n - c1
+    g2: float = 0.0
+    for o, e in (
+        (o11, r1 * c1 / n),
+        (o12, r1 * c2 / n),
+        (o21, r2 * c1 / n),
+        (o22, r2 * c2 / n)
+    ):
+        if o > 0:
+            g2 += o * math.log(o / e)
+    return 2 * g2
+
+
+def mi(o11: int, r1: int, c1: int, n: int) -> float:
+    ''' (pointwise) mutual information '''
+    return math.log2(o11 / _expected(r1, c1, n))
+
+
+def t_score(o11: int, r1: int, c1: int, n: int) -> float:
+    return (o11 - _expected(r1, c1, n)) / math.sqrt(o11)
+
+
+def log_dice(o11: int, r1: int, c1: int, n: int) -> float:
+    return 14 + math.log2(2 * o11 / (r1 + c1))
+
+
+'''
+' NOTE: keyness measures compare the frequency <f1> of an item in a target of
+'       <n1> tokens with its frequency <f2> in a reference of <n2> tokens;
+'       all of them are 0.0 if the target or the reference is empty
+'''
+
+
+def _relative(f: int, n: int) -> float:
+    return f / n if n > 0 else 0.0
+
+
+def signed_log_likelihood(f1: int, n1: int, f2: int, n2: int) -> float:
+    '''
+    log-likelihood (G2) keyness; negative if the item is relatively less
+    frequent in the target than in the reference
+    '''
+    if n1 == 0 or n2 == 0:
+        return 0.0
+    g2: float = log_likelihood(f1, n1, f1 + f2, n1 + n2)
+    return g2 if _relative(f1, n1) >= _relative(f2, n2) else -g2
+
+
+def percent_diff(f1: int, n1: int, f2: int, n2: int) -> float:
+    '''
+    %DIFF (Gabrielatos & Marchi 2012); inf if the item is unseen in the
+    reference
+    '''
+    if n1 == 0 or n2 == 0:
+        return 0.0
+    if f2 == 0:
+        return math.inf
+    return (_relative(f1, n1) - _relative(f2, n2)) * 100 / _relative(f2, n2)
+
+
+def log_ratio(f1: int, n1: int, f2: int, n2: int) -> float:
+    '''
+    binary log of the ratio of relative frequencies (Hardie 2014); zero
+    frequencies are replaced by 0.5
+    '''
+    if n1 == 0 or n2 == 0:
+        return 0.0
+    return math.log2(
+        _relative(f1 or 0.5, n1) / _relative(f2 or 0.5, n2)
+    )
+
+
+'''
+' NOTE: dispersion measures take the frequencies <freqs> of an item in all n
+'       corpus parts and the sizes <sizes> of these parts (in tokens)
+'''
+
+
+def juilland_d(freqs: List[int], sizes: List[int]) -> float:
+    '''
+    Juilland's D computed on the relative frequencies of the parts; 1 means
+    perfectly even, 0 extremely uneven dispersion
+    '''
+    n: int = len(freqs)
+    if n < 2:
+        return 1.0
+    relative_freqs: List[float] = [
+        _relative(f, s) if s > 0 else 0.0 for f, s in zip(freqs, sizes)
+    ]
+    mean: float = sum(relative_freqs) / n
+    if mean == 0:
+        return 0.0
+    sd: float = math.sqrt(sum((x - mean) ** 2 for x in relative_freqs) / n)
+    return 1 - sd / mean / math.sqrt(n - 1)
+
+
+def dp(freqs: List[int], sizes: List[int]) -> float:
+    '''
+    Gries' deviation of proportions; 0 means perfectly even, 1 extremely
+    uneven dispersion
+    '''
+    f: int = sum(freqs)
+    s: int = sum(sizes)
+    if f == 0 or s == 0:
+        return 1.0
+    return sum(abs(fi / f - si / s) for fi, si in zip(freqs, sizes)) / 2
+
+
+association_measures: Dict[str, Callable[[int, int, int, int], float]] = {
+    'log_likelihood': log_likelihood,
+    'mi': mi,
+    't_score': t_score,
+    'log_dice': log_dice
+}
+
+keyness_measures: Dict[str, Callable[[int, int, int, int], float]] = {
+    'log_likelihood': signed_log_likelihood,
+    'percent_diff': percent_diff,
+    'log_ratio': log_ratio
+}
@@ -1,12 +1,38 @@
-from typing import Dict, List, Tuple, Type, TYPE_CHECKING
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TYPE_CHECKING
+)
 if TYPE_CHECKING:
     from ..client import CQiClient
+    from ..sharedtables import SharedTableCache
     from ..status import StatusOk
     from .corpora import Corpus
+from ..lexicon import FrequencyVector, LexiconIndex
+from ..tables import AlignmentTable, FacetIndex, RegionTable
 from .resource import Collection, Model
 
 
 class Attribute(Model):
+    __slots__ = ('tables',)
+
+    def __init__(
+        self,
+        attrs: Dict = None,
+        client: 'CQiClient' = None,
+        collection: 'Collection' = None
+    ):
+        super().__init__(attrs=attrs, client=client, collection=collection)
+
+        #: Tables downloaded from the server by name, e.g. 'freqs'
+        self.tables: Dict[str, Any] = {}
+
     @property
     def api_name(self) -> str:
         return self.attrs['api_name']
@@ -23,54 +49,130 @@ class Attribute(Model):
         ''' unload attribute from memory '''
         return self.client.api.cl_drop_attribute(self.api_name)
 
+    def reload(self):
+        '''
+        Load this attribute from the server again and forget its tables, as
+        the corpus may have changed.
+        '''
+        super().reload()
+        self.tables.clear()
+
+    def _table_sizes(self) -> List[int]:
+        ''' the sizes that identify the version of the attribute's tables '''
+        return [self.size]
+
+    def _build_table(
+        self,
+        name: str,
+        build: Callable[[], Any],
+        from_arrays: Callable[[Dict[str, Sequence]], Any]
+    ) -> Any:
+        '''
+        Build the table <name> with <build>, or attach it with <from_arrays>
+        if the client has a table cache (see cqi.sharedtables) that holds it
+        '''
+        table_cache: Optional['SharedTableCache'] = self.client.table_cache
+        if table_cache is None:
+            return build()
+        key: str = '.'.join(
+            [self.api_name, name, *map(str, self._table_sizes())]
+        )
+        return from_arrays(
+            table_cache.get_or_build(key, lambda: build().to_arrays())
+        )
+
 
 class AttributeCollection(Collection):
+    __slots__ = ('corpus',)
+
     model: Type[Attribute] = Attribute
 
     def __init__(self, client: 'CQiClient' = None, corpus: 'Corpus' = None):
         super().__init__(client=client)
         self.corpus: 'Corpus' = corpus
 
-    def _get(self, attribute_name: str) -> Dict:
-        api_name: str = f'{self.corpus.api_name}.{attribute_name}'
+    def _api_name(self, attribute_name: str) -> str:
+        return f'{self.corpus.api_name}.{attribute_name}'
+
+    def _commands(self, attribute_name: str) -> List[Tuple[str, Tuple]]:
+        return [('cl_attribute_size', (self._api_name(attribute_name),))]
+
+    def _attrs(self, attribute_name: str, responses: List) -> Dict:
         return {
-            'api_name': api_name,
+            'api_name': self._api_name(attribute_name),
             'name': attribute_name,
-            'size': self.client.api.cl_attribute_size(api_name)
+            'size': responses[0]
         }
 
     def get(self, attribute_name: str) -> Attribute:
-        return self.prepare_model(self._get(attribute_name))
+        return self._lazy_model(attribute_name)
 
     def list(self) -> List[Attribute]:
         raise NotImplementedError
 
 
 class AlignmentAttribute(Attribute):
+    __slots__ = ()
+
+    def alignment_table(self) -> AlignmentTable:
+        '''
+        returns the complete alignment table, which is downloaded with
+        pipelined lookups on the first call; afterwards, ids_by_cpos is
+        answered from the table
+        '''
+        alignment_table: AlignmentTable = self.tables.get('alignments')
+        if alignment_table is None or len(alignment_table) != self.size:
+            alignment_table = self._build_table(
+                'alignments',
+                lambda: AlignmentTable(
+                    self.client.api.pipeline(
+                        [
+                            ('cl_alg2cpos', (self.api_name, id))
+                            for id in range(self.size)
+                        ]
+                    )
+                ),
+                AlignmentTable.from_arrays
+            )
+            self.tables['alignments'] = alignment_table
+        return alignment_table
+
     def cpos_by_id(self, id: int) -> Tuple[int, int, int, int]:
         ''' returns (src_start, src_end, target_start, target_end) '''
         return self.client.api.cl_alg2cpos(self.api_name, id)
 
     def ids_by_cpos(self, cpos_list: List[int]) -> List[int]:
         ''' returns -1 for every corpus position not inside an alignment '''
+        if 'alignments' in self.tables:
+            return self.tables['alignments'].ids_by_cpos(cpos_list)
         return self.client.api.cl_cpos2alg(self.api_name, cpos_list)
 
 
 class AlignmentAttributeCollection(AttributeCollection):
+    __slots__ = ()
+
     model: Type[AlignmentAttribute] = AlignmentAttribute
 
     def list(self) -> List[AlignmentAttribute]:
         return [
-            self.get(x) for x in
-            self.client.api.corpus_alignment_attributes(self.corpus.api_name)
+            self.prepare_model(x) for x in self._list(
+                self.client.api.corpus_alignment_attributes(
+                    self.corpus.api_name
+                )
+            )
         ]
 
 
 class PositionalAttribute(Attribute):
+    __slots__ = ()
+
     @property
     def lexicon_size(self) -> int:
         return self.attrs['lexicon_size']
 
+    def _table_sizes(self) -> List[int]:
+        return [self.size, self.lexicon_size]
+
     def cpos_by_id(self, id: int) -> List[int]:
         ''' returns all corpus positions where the given token occurs '''
         return self.client.api.cl_id2cpos(self.api_name, id)
@@ -86,6 +188,24 @@ class PositionalAttribute(Attribute):
         ''' returns 0 for every ID in <id_list> that is out of range '''
         return self.client.api.cl_id2freq(self.api_name, id_list)
 
+    def frequency_vector(self) -> FrequencyVector:
+        '''
+        returns the frequencies of all lexicon IDs, which are downloaded in
+        chunked, pipelined requests on the first call and kept until the
+        attribute is reloaded
+        '''
+        frequency_vector: FrequencyVector = self.tables.get('freqs')
+        if frequency_vector is None:
+            frequency_vector = self._build_table(
+                'freqs',
+                lambda: FrequencyVector(
+                    self.freqs_by_ids(list(range(self.lexicon_size)))
+                ),
+                FrequencyVector.from_arrays
+            )
+            self.tables['freqs'] = frequency_vector
+        return frequency_vector
+
     def ids_by_cpos(self, cpos_list: List[int]) -> List[int]:
         '''
         returns -1 for every corpus position in <cpos_list> that is out of
@@ -107,6 +227,22 @@ class PositionalAttribute(Attribute):
         '''
         return self.client.api.cl_str2id(self.api_name, value_list)
 
+    def lexicon_index(self) -> LexiconIndex:
+        '''
+        returns an index over the complete lexicon for prefix and suffix
+        lookups, which is downloaded on the first call and kept until the
+        attribute is reloaded
+        '''
+        lexicon_index: LexiconIndex = self.tables.get('lexicon')
+        if lexicon_index is None:
+            lexicon_index = self._build_table(
+                'lexicon',
+                lambda: LexiconIndex(self),
+                lambda x: LexiconIndex.from_arrays(self, x)
+            )
+            self.tables['lexicon'] = lexicon_index
+        return lexicon_index
+
     def values_by_cpos(self, cpos_list: List[int]) -> List[str]:
         '''
         returns "" for every corpus position in <cpos_list> that is out of
@@ -120,21 +256,36 @@ class PositionalAttribute(Attribute):
 
 
 class PositionalAttributeCollection(AttributeCollection):
+    __slots__ = ()
+
     model: Type[PositionalAttribute] = PositionalAttribute
 
-    def _get(self, positional_attribute_name: str) -> Dict:
-        attrs = super()._get(positional_attribute_name)
-        attrs['lexicon_size'] = self.client.api.cl_lexicon_size(attrs['api_name'])
+    def _commands(
+        self,
+        positional_attribute_name: str
+    ) -> List[Tuple[str, Tuple]]:
+        return super()._commands(positional_attribute_name) + [
+            ('cl_lexicon_size', (self._api_name(positional_attribute_name),))
+        ]
+
+    def _attrs(self, positional_attribute_name: str, responses: List) -> Dict:
+        attrs = super()._attrs(positional_attribute_name, responses)
+        attrs['lexicon_size'] = responses[1]
         return attrs
 
     def list(self) -> List[PositionalAttribute]:
         return [
-            self.get(x) for x in
-            self.client.api.corpus_positional_attributes(self.corpus.api_name)
+            self.prepare_model(x) for x in self._list(
+                self.client.api.corpus_positional_attributes(
+                    self.corpus.api_name
+                )
+            )
         ]
 
 
 class StructuralAttribute(Attribute):
+    __slots__ = ()
+
     @property
     def has_values(self) -> bool:
         return self.attrs['has_values']
@@ -146,10 +297,37 @@ class StructuralAttribute(Attribute):
         '''
         return self.client.api.cl_struc2cpos(self.api_name, id)
 
+    def cpos_by_ids(self, id_list: List[int]) -> List[Tuple[int, int]]:
+        '''
+        returns start and end corpus positions of all structure regions with
+        an id in <id_list>; the lookups are pipelined
+        '''
+        return self.client.api.pipeline(
+            [('cl_struc2cpos', (self.api_name, id)) for id in id_list]
+        )
+
+    def facet_index(self) -> FacetIndex:
+        '''
+        returns the dictionary encoded values of all regions, which are
+        downloaded with a single cl_struc2str call on the first call
+
+        check has_values property first
+        '''
+        facet_index: FacetIndex = self.tables.get('facets')
+        if facet_index is None or len(facet_index) != self.size:
+            facet_index = FacetIndex(
+                self.region_table(),
+                self.values_by_ids(list(range(self.size)))
+            )
+            self.tables['facets'] = facet_index
+        return facet_index
+
     def ids_by_cpos(self, cpos_list: List[int]) -> List[int]:
         '''
         returns -1 for every corpus position not inside a structure region
         '''
+        if 'regions' in self.tables:
+            return self.tables['regions'].ids_by_cpos(cpos_list)
         return self.client.api.cl_cpos2struc(self.api_name, cpos_list)
 
     def lbound_by_cpos(self, cpos_list: List[int]) -> List[int]:
@@ -166,6 +344,22 @@ class StructuralAttribute(Attribute):
         '''
         return self.client.api.cl_cpos2rbound(self.api_name, cpos_list)
 
+    def region_table(self) -> RegionTable:
+        '''
+        returns the start and end corpus positions of all regions, which are
+        downloaded with pipelined lookups on the first call; afterwards,
+        ids_by_cpos is answered from the table
+        '''
+        region_table: RegionTable = self.tables.get('regions')
+        if region_table is None or len(region_table) != self.size:
+            region_table = self._build_table(
+                'regions',
+                lambda: RegionTable(self.cpos_by_ids(range(self.size))),
+                RegionTable.from_arrays
+            )
+            self.tables['regions'] = region_table
+        return region_table
+
     def values_by_ids(self, id_list: List[int]) -> List[str]:
         '''
         returns annotated string values of structure regions in <id_list>; ""
@@ -177,17 +371,33 @@ class StructuralAttribute(Attribute):
 
 
 class StructuralAttributeCollection(AttributeCollection):
+    __slots__ = ()
+
     model: Type[StructuralAttribute] = StructuralAttribute
 
-    def _get(self, structural_attribute_name: str) -> Dict:
-        attrs = super()._get(structural_attribute_name)
-        attrs['has_values'] = self.client.api.corpus_structural_attribute_has_values(attrs['api_name'])
+    def _commands(
+        self,
+        structural_attribute_name: str
+    ) -> List[Tuple[str, Tuple]]:
+        return super()._commands(structural_attribute_name) + [
+            (
+                'corpus_structural_attribute_has_values',
+                (self._api_name(structural_attribute_name),)
+            )
+        ]
+
+    def _attrs(self, structural_attribute_name: str, responses: List) -> Dict:
+        attrs = super()._attrs(structural_attribute_name, responses)
+        attrs['has_values'] = responses[1]
         return attrs
 
     def list(self, filters: Dict = {}) -> List[StructuralAttribute]:
         structural_attributes = [
-            self.get(x) for x in
-            self.client.api.corpus_structural_attributes(self.corpus.api_name)
+            self.prepare_model(x) for x in self._list(
+                self.client.api.corpus_structural_attributes(
+                    self.corpus.api_name
+                )
+            )
         ]
         for k, v in filters.items():
             if k == 'has_values':
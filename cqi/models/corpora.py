@@ -1,9 +1,15 @@
-from typing import Dict, List, Type, TYPE_CHECKING
+from typing import Dict, Iterator, List, Optional, Type, TYPE_CHECKING
 if TYPE_CHECKING:
+    from ..pool import QueryResult, SessionPool
     from ..status import StatusOk
+    from .subcorpora import Subcorpus
+from .. import errors
+from ..tables import TokenTable
 from .attributes import (
     AlignmentAttributeCollection,
+    PositionalAttribute,
     PositionalAttributeCollection,
+    StructuralAttribute,
     StructuralAttributeCollection
 )
 from .resource import Collection, Model
@@ -11,6 +17,29 @@ from .subcorpora import SubcorpusCollection
 
 
 class Corpus(Model):
+    __slots__ = (
+        '_alignment_attributes',
+        '_positional_attributes',
+        '_structural_attributes',
+        '_subcorpora'
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._alignment_attributes: AlignmentAttributeCollection = (
+            AlignmentAttributeCollection(client=self.client, corpus=self)
+        )
+        self._positional_attributes: PositionalAttributeCollection = (
+            PositionalAttributeCollection(client=self.client, corpus=self)
+        )
+        self._structural_attributes: StructuralAttributeCollection = (
+            StructuralAttributeCollection(client=self.client, corpus=self)
+        )
+        self._subcorpora: SubcorpusCollection = SubcorpusCollection(
+            client=self.client,
+            corpus=self
+        )
+
     @property
     def api_name(self) -> str:
         return self.attrs['api_name']
@@ -33,19 +62,19 @@ class Corpus(Model):
 
     @property
     def alignment_attributes(self) -> AlignmentAttributeCollection:
-        return AlignmentAttributeCollection(client=self.client, corpus=self)
+        return self._alignment_attributes
 
     @property
     def positional_attributes(self) -> PositionalAttributeCollection:
-        return PositionalAttributeCollection(client=self.client, corpus=self)
+        return self._positional_attributes
 
     @property
     def structural_attributes(self) -> StructuralAttributeCollection:
-        return StructuralAttributeCollection(client=self.client, corpus=self)
+        return self._structural_attributes
 
     @property
     def subcorpora(self) -> SubcorpusCollection:
-        return SubcorpusCollection(client=self.client, corpus=self)
+        return self._subcorpora
 
     def drop(self) -> 'StatusOk':
         ''' try to unload a corpus and all its attributes from memory '''
@@ -53,31 +82,146 @@ class Corpus(Model):
 
     def query(self, subcorpus_name: str, query: str) -> 'StatusOk':
         ''' <query> must include the ';' character terminating the query. '''
-        return self.client.api.cqp_query(self.api_name, subcorpus_name, query)
+        response: 'StatusOk' = self.client.api.cqp_query(
+            self.api_name,
+            subcorpus_name,
+            query
+        )
+        # A previous subcorpus of the same name has been replaced
+        self.subcorpora._forget(subcorpus_name)
+        return response
+
+    def cached_query(self, query: str) -> 'Subcorpus':
+        '''
+        Like query, but the result is looked up in the client's query cache
+        first and the subcorpus name is chosen by the cache.
+        '''
+        return self.client.query_cache.query(self, query)
+
+    def tokens(
+        self,
+        start: int,
+        end: int,
+        p_attrs: List[PositionalAttribute],
+        s_attrs: Optional[List[StructuralAttribute]] = None
+    ) -> TokenTable:
+        '''
+        the tokens of the corpus positions <start> .. <end> as a columnar
+        table of the lexicon IDs of <p_attrs> and the region IDs of
+        <s_attrs>, fetched in a single pipelined exchange; values are
+        resolved on first access (see TokenTable.values)
+        '''
+        if s_attrs is None:
+            s_attrs = []
+        cpos_list: List[int] = list(range(start, end + 1))
+        commands: List = [
+            ('cl_cpos2id', (x.api_name, cpos_list)) for x in p_attrs
+        ] + [
+            ('cl_cpos2struc', (x.api_name, cpos_list)) for x in s_attrs
+        ]
+        responses: List[List[int]] = self.client.api.pipeline(commands)
+        attributes: List = p_attrs + s_attrs
+        return TokenTable(
+            start,
+            end,
+            {x.name: x for x in attributes},
+            {x.name: ids for x, ids in zip(attributes, responses)}
+        )
 
 
 class CorpusCollection(Collection):
+    __slots__ = ()
+
     model: Type[Corpus] = Corpus
 
-    def _get(self, corpus_name: str) -> Dict:
-        api_name: str = corpus_name
-        p_attr_names: List[str] = self.client.api.corpus_positional_attributes(api_name)
-        corpus_size: int = (
-            0 if len(p_attr_names) == 0 else
-            self.client.api.cl_attribute_size(f'{api_name}.{p_attr_names[0]}')
+    def _api_name(self, corpus_name: str) -> str:
+        return corpus_name
+
+    def _list(self, corpus_names: List[str]) -> List[Dict]:
+        # The corpus size depends on the positional attributes, so loading
+        # takes two pipelined exchanges
+        responses: List = self.client.api.pipeline(
+            [
+                (command, (corpus_name,)) for corpus_name in corpus_names
+                for command in (
+                    'corpus_positional_attributes',
+                    'corpus_charset',
+                    'corpus_properties'
+                )
+            ]
         )
-        return {
-            'api_name': api_name,
-            'charset': self.client.api.corpus_charset(api_name),
-            # 'full_name': self.client.api.corpus_full_name(api_name),
-            # 'info': self.client.api.corpus_info(api_name),
-            'name': corpus_name,
-            'properties': self.client.api.corpus_properties(api_name),
-            'size': corpus_size
-        }
+        p_attr_names: List[List[str]] = responses[0::3]
+        corpus_sizes: List[int] = self.client.api.pipeline(
+            [
+                ('cl_attribute_size', (f'{corpus_name}.{x[0]}',))
+                for corpus_name, x in zip(corpus_names, p_attr_names)
+                if len(x) > 0
+            ]
+        )
+        corpus_sizes.reverse()
+        return [
+            {
+                'api_name': self._api_name(corpus_name),
+                'charset': charset,
+                # 'full_name': self.client.api.corpus_full_name(api_name),
+                # 'info': self.client.api.corpus_info(api_name),
+                'name': corpus_name,
+                'properties': properties,
+                'size': 0 if len(x) == 0 else corpus_sizes.pop()
+            }
+            for corpus_name, x, charset, properties in zip(
+                corpus_names,
+                p_attr_names,
+                responses[1::3],
+                responses[2::3]
+            )
+        ]
 
     def get(self, corpus_name: str) -> Corpus:
-        return self.prepare_model(self._get(corpus_name))
+        '''
+        returns the shared instance of the corpus called <corpus_name>; its
+        attributes are loaded on first access, but it is checked to exist
+        unless it has been used before
+        '''
+        if (
+            (self.model, self._api_name(corpus_name))
+            not in self.client.identity_map
+            and corpus_name not in self.client.api.corpus_list_corpora()
+        ):
+            raise errors.CQPErrorNoSuchCorpus(corpus_name)
+        return self._lazy_model(corpus_name)
 
     def list(self) -> List[Corpus]:
-        return [self.get(x) for x in self.client.api.corpus_list_corpora()]
+        return [
+            self.prepare_model(x) for x in
+            self._list(self.client.api.corpus_list_corpora())
+        ]
+
+    def search(
+        self,
+        query: str,
+        pool: 'SessionPool',
+        corpus_names: Optional[List[str]] = None,
+        page_size: int = 10,
+        timeout: Optional[float] = None
+    ) -> Iterator['QueryResult']:
+        '''
+        Execute <query> on many corpora (default: all) concurrently over the
+        sessions of <pool>.
+
+        yields a cqi.pool.QueryResult per corpus as soon as it is completed,
+        where the job is (corpus_name, query, ...), size is the number of
+        matches and result holds the (match, matchend) pairs of the first
+        <page_size> matches; corpora that are not completed within <timeout>
+        seconds after their query was sent are aborted and yielded with a
+        TimeoutError (see cqi.pool.BatchExecutor.execute)
+        '''
+        # Imported here, as cqi.pool is not needed by the model layer itself
+        from ..pool import BatchExecutor, first_page
+        if corpus_names is None:
+            corpus_names = self.client.api.corpus_list_corpora()
+        post_processing = first_page(page_size)
+        return BatchExecutor(pool).execute(
+            [(x, query, post_processing) for x in corpus_names],
+            timeout=timeout
+        )
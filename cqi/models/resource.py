@@ -1,13 +1,37 @@
-from typing import Dict, List, Type, TYPE_CHECKING
+from typing import Callable, Dict, List, Optional, Tuple, Type, TYPE_CHECKING
 if TYPE_CHECKING:
     from ..client import CQiClient
+    from ..handles import Handle
+
+
+class Attrs(dict):
+    '''
+    The raw representation of an object, which is completed by loading it
+    from the server on the first access of a missing key.
+    '''
+
+    def __init__(self, attrs: Dict, load: Callable[[], Dict]):
+        super().__init__(attrs)
+        self.load: Optional[Callable[[], Dict]] = load
+
+    def __missing__(self, key):
+        if self.load is None:
+            raise KeyError(key)
+        # The loader is kept until it has succeeded, so that a failed load,
+        # e.g. because of a connection error, is retried on the next access
+        self.update(self.load())
+        self.load = None
+        return self[key]
 
 
 class Model:
     '''
-    A base class for representing a single object on the server.
+    A base class for representing a single object on the server. Each object
+    is represented by one shared instance per client.
     '''
 
+    __slots__ = ('attrs', 'client', 'collection')
+
     def __init__(
         self,
         attrs: Dict = None,
@@ -35,16 +59,40 @@ class Model:
     def __hash__(self) -> int:
         return hash(f'{self.__class__.__name__}:{self.api_name}')
 
+    def __reduce__(self):
+        # Models are pickled as handles, their client can't be pickled
+        return self.handle().__reduce__()
+
+    def __copy__(self) -> 'Model':
+        # Models are shared instances (see CQiClient.identity_map), copies
+        # would not be updated with them
+        return self
+
+    def __deepcopy__(self, memo: Dict) -> 'Model':
+        return self
+
     @property
     def api_name(self) -> str:
         raise NotImplementedError
 
+    def handle(self) -> 'Handle':
+        '''
+        Create a picklable handle for this object, carrying its loaded
+        attributes (see cqi.handles).
+        '''
+        from ..handles import Handle
+        corpus_name: str = (
+            self.api_name if getattr(self.collection, 'corpus', None) is None
+            else self.collection.corpus.api_name
+        )
+        return Handle(self.__class__, corpus_name, self.name, dict(self.attrs))
+
     def reload(self):
         '''
         Load this object from the server again and update ``attrs`` with the
         new data.
         '''
-        self.attrs = self.collection.get(self.api_name).attrs
+        self.attrs = self.collection._get(self.name)
 
 
 class Collection:
@@ -53,6 +101,8 @@ class Collection:
     server.
     '''
 
+    __slots__ = ('client',)
+
     #: The type of object this collection represents, set by subclasses
     model: Type[Model] = Model
 
@@ -67,19 +117,95 @@ class Collection:
     def get(self) -> Model:
         raise NotImplementedError
 
+    def _api_name(self, name: str) -> str:
+        ''' the api name of the object called <name> '''
+        raise NotImplementedError
+
+    def _commands(self, name: str) -> List[Tuple[str, Tuple]]:
+        ''' the API commands loading the object called <name> '''
+        raise NotImplementedError
+
+    def _attrs(self, name: str, responses: List) -> Dict:
+        '''
+        the raw representation of the object called <name>, created from the
+        responses to its commands
+        '''
+        raise NotImplementedError
+
+    def _get(self, name: str) -> Dict:
+        return self._list([name])[0]
+
+    def _lazy_attrs(self, name: str) -> Attrs:
+        '''
+        the raw representation of the object called <name>, which is loaded
+        on first access
+        '''
+        return Attrs(
+            {'api_name': self._api_name(name), 'name': name},
+            lambda: self._get(name)
+        )
+
+    def _lazy_model(self, name: str) -> Model:
+        '''
+        the shared instance of the object called <name>, created with lazily
+        loaded attributes if there is none yet
+        '''
+        model: Optional[Model] = self.client.identity_map.get(
+            (self.model, self._api_name(name))
+        )
+        if model is not None:
+            return model
+        return self.prepare_model(self._lazy_attrs(name))
+
+    def _forget(self, name: str):
+        '''
+        remove the object called <name> from the client's identity map, e.g.
+        because it has been deleted or replaced on the server
+        '''
+        self.client.identity_map.pop((self.model, self._api_name(name)), None)
+
+    def _list(self, names: List[str]) -> List[Dict]:
+        '''
+        the raw representations of the objects called <names>, loaded with
+        one pipelined exchange
+        '''
+        commands: List[List[Tuple[str, Tuple]]] = [
+            self._commands(x) for x in names
+        ]
+        responses: List = self.client.api.pipeline(
+            [command for x in commands for command in x]
+        )
+        attrs: List[Dict] = []
+        offset: int = 0
+        for name, x in zip(names, commands):
+            attrs.append(
+                self._attrs(name, responses[offset:offset + len(x)])
+            )
+            offset += len(x)
+        return attrs
+
     def prepare_model(self, attrs) -> Model:
         '''
-        Create a model from a set of attributes.
+        Create a model from a set of attributes, or return the shared instance
+        of the client's identity map. A shared instance keeps its loaded
+        attributes, unless <attrs> is completely loaded.
         '''
         if isinstance(attrs, Model):
             attrs.client = self.client
             attrs.collection = self
             return attrs
         elif isinstance(attrs, dict):
-            return self.model(
-                attrs=attrs,
-                client=self.client,
-                collection=self
-            )
+            key: Tuple[Type[Model], str] = (self.model, attrs['api_name'])
+            model: Optional[Model] = self.client.identity_map.get(key)
+            if model is None:
+                model = self.model(
+                    attrs=attrs,
+                    client=self.client,
+                    collection=self
+                )
+                self.client.identity_map[key] = model
+            elif not (isinstance(attrs, Attrs) and attrs.load is not None):
+                model.attrs = attrs
+            return model
         else:
             raise Exception(f"Can't create {self.model.__name__} from {attrs}")
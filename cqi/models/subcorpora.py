@@ -1,9 +1,21 @@
-from typing import Dict, List, Type, TYPE_CHECKING
+import random
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TYPE_CHECKING
+)
 if TYPE_CHECKING:
     from ..client import CQiClient
     from ..status import StatusOk
     from .attributes import PositionalAttribute
     from .corpora import Corpus
+    from ..handles import Handle
+    from ..matchsets import MatchSet, SortedMatches
+from ..analytics import MatchAnalyticsMixin
 from ..constants import (
     FIELD_KEYWORD,
     FIELD_MATCH,
@@ -13,7 +25,9 @@ from ..constants import (
 from .resource import Collection, Model
 
 
-class Subcorpus(Model):
+class Subcorpus(MatchAnalyticsMixin, Model):
+    __slots__ = ()
+
     @property
     def api_name(self) -> str:
         return self.attrs['api_name']
@@ -32,7 +46,25 @@ class Subcorpus(Model):
 
     def drop(self) -> 'StatusOk':
         ''' delete a subcorpus from memory '''
-        return self.client.api.cqp_drop_subcorpus(self.api_name)
+        response: 'StatusOk' = self.client.api.cqp_drop_subcorpus(
+            self.api_name
+        )
+        self.collection._forget(self.name)
+        return response
+
+    def handle(self) -> 'Handle':
+        '''
+        Subcorpora have no handles and can't be pickled: a subcorpus exists
+        only in the server session of the client that created it, another
+        process' client would not find it. Pass the query and run it in the
+        other process, or pass the matches as a MatchSet (see
+        cqi.matchsets.MatchSet.from_subcorpus).
+        '''
+        raise TypeError(
+            f'Subcorpus {self.api_name} exists only in the session of its '
+            'client and can\'t be pickled, pass its query or a MatchSet '
+            'instead'
+        )
 
     def dump(self, field: int, first: int, last: int) -> List[int]:
         '''
@@ -96,37 +128,145 @@ class Subcorpus(Model):
             attribute_2.api_name
         )
 
+    def sample(
+        self,
+        n: int,
+        seed: Optional[int] = None,
+        max_gap: int = 64
+    ) -> 'MatchSet':
+        '''
+        a random sample of <n> matches, reproducible with <seed>
+
+        only the sampled index ranges are dumped, indices less than
+        <max_gap> apart are dumped together in a single pipelined exchange
+        '''
+        from ..matchsets import MatchSet
+        indices: List[int] = random.Random(seed).sample(
+            range(self.size),
+            min(n, self.size)
+        )
+        pairs: List[Tuple[int, int]] = self._dump_indices(indices, max_gap)
+        return MatchSet([x[0] for x in pairs], [x[1] for x in pairs])
+
+    def sort_by(
+        self,
+        attribute: 'PositionalAttribute',
+        offset: int = 1,
+        field: int = FIELD_MATCHEND,
+        reverse: bool = False
+    ) -> 'SortedMatches':
+        '''
+        the matches sorted by the <attribute> value of the token <offset>
+        positions after the corpus position at <field>, e.g. the token to the
+        right of the match; ties keep the subcorpus order
+
+        only <field> and the lexicon IDs of the sort keys are fetched, the
+        matches of a page are dumped when it is requested; the IDs are
+        ranked with the attribute's lexicon index (see
+        PositionalAttribute.lexicon_index), which is downloaded on first use
+        '''
+        from ..matchsets import SortedMatches
+        id_list: List[int] = attribute.ids_by_cpos(
+            [cpos + offset for cpos in self._dump_all(field)]
+        )
+        # Lexicon IDs are not ordered by value, rank them by value instead;
+        # keys outside the corpus come first
+        ranks: Sequence[int] = attribute.lexicon_index().ranks()
+        keys: List[int] = [-1 if id == -1 else ranks[id] for id in id_list]
+        return SortedMatches(
+            self,
+            sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+        )
+
+    def _corpus_name(self) -> str:
+        return self.collection.corpus.api_name
+
+    def _dump_indices(
+        self,
+        indices: List[int],
+        max_gap: int = 64
+    ) -> List[Tuple[int, int]]:
+        '''
+        the (match, matchend) pairs of the matches at <indices>, in the order
+        of <indices>; indices less than <max_gap> apart are dumped as one
+        range and all ranges are dumped in a single pipelined exchange
+        '''
+        ranges: List[List[int]] = []
+        for index in sorted(set(indices)):
+            if len(ranges) > 0 and index - ranges[-1][1] < max_gap:
+                ranges[-1][1] = index
+            else:
+                ranges.append([index, index])
+        responses: List[List[int]] = self.client.api.pipeline(
+            [
+                ('cqp_dump_subcorpus', (self.api_name, field, first, last))
+                for first, last in ranges
+                for field in (FIELD_MATCH, FIELD_MATCHEND)
+            ]
+        )
+        pairs: Dict[int, Tuple[int, int]] = {}
+        for (first, _), matches, matchends in zip(
+            ranges, responses[0::2], responses[1::2]
+        ):
+            for i, pair in enumerate(zip(matches, matchends)):
+                pairs[first + i] = pair
+        return [pairs[index] for index in indices]
+
+    def _fdist_1_dict(
+        self,
+        field: int,
+        attribute: 'PositionalAttribute'
+    ) -> Dict[int, int]:
+        ''' frequency distribution of single tokens as {id: frequency} '''
+        fdist: List[int] = self.fdist_1(0, field, attribute)
+        return dict(zip(fdist[0::2], fdist[1::2]))
+
 
 class SubcorpusCollection(Collection):
+    __slots__ = ('corpus',)
+
     model: Type[Subcorpus] = Subcorpus
 
     def __init__(self, client: 'CQiClient' = None, corpus: 'Corpus' = None):
         super().__init__(client=client)
         self.corpus: 'Corpus' = corpus
 
-    def _get(self, subcorpus_name: str) -> Dict:
-        api_name: str = f'{self.corpus.api_name}:{subcorpus_name}'
+    def _api_name(self, subcorpus_name: str) -> str:
+        return f'{self.corpus.api_name}:{subcorpus_name}'
+
+    def _commands(self, subcorpus_name: str) -> List[Tuple[str, Tuple]]:
+        api_name: str = self._api_name(subcorpus_name)
+        return [
+            ('cqp_subcorpus_has_field', (api_name, FIELD_MATCH)),
+            ('cqp_subcorpus_has_field', (api_name, FIELD_MATCHEND)),
+            ('cqp_subcorpus_has_field', (api_name, FIELD_TARGET)),
+            ('cqp_subcorpus_has_field', (api_name, FIELD_KEYWORD)),
+            ('cqp_subcorpus_size', (api_name,))
+        ]
+
+    def _attrs(self, subcorpus_name: str, responses: List) -> Dict:
         fields: Dict[str, int] = {}
-        if self.client.api.cqp_subcorpus_has_field(api_name, FIELD_MATCH):
+        if responses[0]:
             fields['match'] = FIELD_MATCH
-        if self.client.api.cqp_subcorpus_has_field(api_name, FIELD_MATCHEND):
+        if responses[1]:
             fields['matchend'] = FIELD_MATCHEND
-        if self.client.api.cqp_subcorpus_has_field(api_name, FIELD_TARGET):
+        if responses[2]:
             fields['target'] = FIELD_TARGET
-        if self.client.api.cqp_subcorpus_has_field(api_name, FIELD_KEYWORD):
+        if responses[3]:
             fields['keyword'] = FIELD_KEYWORD
         return {
-            'api_name': api_name,
+            'api_name': self._api_name(subcorpus_name),
             'fields': fields,
             'name': subcorpus_name,
-            'size': self.client.api.cqp_subcorpus_size(api_name)
+            'size': responses[4]
         }
 
     def get(self, subcorpus_name: str) -> Subcorpus:
-        return self.prepare_model(self._get(subcorpus_name))
+        return self._lazy_model(subcorpus_name)
 
     def list(self) -> List[Subcorpus]:
         return [
-            self.get(x) for x in
-            self.client.api.cqp_list_subcorpora(self.corpus.api_name)
+            self.prepare_model(x) for x in self._list(
+                self.client.api.cqp_list_subcorpora(self.corpus.api_name)
+            )
         ]
@@ -0,0 +1,238 @@
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import accumulate, chain
+from operator import sub
+from typing import Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+if TYPE_CHECKING:
+    from .models.attributes import PositionalAttribute
+
+
+#: A term is a word, a Regex or a list of alternative words and regexes
+Term = Union[str, 'Regex', List[Union[str, 'Regex']]]
+
+
+class Regex(str):
+    ''' A term matching all words of the lexicon that match a regex '''
+
+    def __repr__(self) -> str:
+        return f'Regex({str.__repr__(self)})'
+
+
+def encode_positions(positions: List[int]) -> array:
+    '''
+    Delta encode the sorted corpus positions <positions> into an array of
+    the smallest item size that fits the largest gap.
+    '''
+    deltas: List[int] = list(map(sub, positions, chain((0,), positions)))
+    max_delta: int = max(deltas, default=0)
+    for typecode in ('B', 'H', 'I'):
+        if max_delta < 256 ** array(typecode).itemsize:
+            return array(typecode, deltas)
+    return array('L', deltas)
+
+
+def decode_positions(encoded_positions: array) -> List[int]:
+    return list(accumulate(encoded_positions))
+
+
+class PostingCache:
+    '''
+    A least recently used cache for the delta encoded corpus positions of
+    words and regexes, keyed by (attribute api name, 'word' or 'regex',
+    term), so that engines on different attributes can share it.
+
+    Args:
+    max_entries (int): Maximum number of corpus positions in all cached
+        posting lists.
+        Default: ``10000000``
+    '''
+
+    def __init__(self, max_entries: int = 10000000):
+        self.max_entries: int = max_entries
+        #: Number of corpus positions in all cached posting lists
+        self.num_entries: int = 0
+        self.postings: 'OrderedDict[Tuple[str, str, str], array]' = (
+            OrderedDict()
+        )
+
+    def __contains__(self, key: Tuple[str, str, str]) -> bool:
+        return key in self.postings
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[List[int]]:
+        encoded_positions: Optional[array] = self.postings.get(key)
+        if encoded_positions is None:
+            return None
+        self.postings.move_to_end(key)
+        return decode_positions(encoded_positions)
+
+    def put(self, key: Tuple[str, str, str], positions: List[int]):
+        self.forget(key)
+        self.postings[key] = encode_positions(positions)
+        self.num_entries += len(positions)
+        while self.num_entries > self.max_entries and len(self.postings) > 1:
+            self.forget(next(iter(self.postings)))
+
+    def forget(self, key: Tuple[str, str, str]):
+        encoded_positions: Optional[array] = self.postings.pop(key, None)
+        if encoded_positions is not None:
+            self.num_entries -= len(encoded_positions)
+
+    def clear(self):
+        self.postings.clear()
+        self.num_entries = 0
+
+
+class PhraseEngine:
+    '''
+    Evaluates word sequences and proximity queries on the client, using the
+    posting lists (corpus positions) of the words of a positional
+    attribute. No subcorpus is created on the server; posting lists are
+    fetched with two pipelined exchanges at most and cached.
+
+    Example:
+    >>> from cqi.phrases import PhraseEngine, Regex
+    >>> engine = PhraseEngine(corpus.positional_attributes.get('word'))
+    >>> engine.phrase(['the', ['cat', 'dog'], Regex('sa.*')])
+    [(1, 3)]
+    >>> engine.near('cat', 'mat', 5)
+    [(1, 5)]
+
+    Args:
+    attribute (PositionalAttribute): The attribute to match the terms on.
+    cache (PostingCache): The cache for posting lists.
+        Default: a new ``PostingCache``
+    '''
+
+    def __init__(
+        self,
+        attribute: 'PositionalAttribute',
+        cache: Optional[PostingCache] = None
+    ):
+        self.attribute: 'PositionalAttribute' = attribute
+        self.cache: PostingCache = cache or PostingCache()
+
+    def postings(self, term: Term) -> List[int]:
+        ''' returns the sorted corpus positions matching <term> '''
+        return self.__postings([term])[0]
+
+    def phrase(self, terms: List[Term]) -> List[Tuple[int, int]]:
+        '''
+        returns the (match, matchend) corpus positions of all occurrences of
+        <terms> as a sequence of adjacent tokens
+        '''
+        if len(terms) == 0:
+            return []
+        postings: List[List[int]] = self.__postings(terms)
+        # Start with the rarest term, shifted to the start of the phrase
+        order: List[int] = sorted(
+            range(len(terms)),
+            key=lambda i: len(postings[i])
+        )
+        matches: set = set(map((-order[0]).__add__, postings[order[0]]))
+        for i in order[1:]:
+            if len(matches) == 0:
+                break
+            matches.intersection_update(map((-i).__add__, postings[i]))
+        return [(x, x + len(terms) - 1) for x in sorted(matches)]
+
+    def near(
+        self,
+        term1: Term,
+        term2: Term,
+        distance: int,
+        ordered: bool = False
+    ) -> List[Tuple[int, int]]:
+        '''
+        returns the (match, matchend) corpus positions spanning each
+        occurrence of <term1> and the nearest occurrence of <term2> within
+        <distance> tokens; with <ordered>, <term2> must follow <term1>
+        '''
+        positions1, positions2 = self.__postings([term1, term2])
+        matches: List[Tuple[int, int]] = []
+        for cpos in positions1:
+            i: int = bisect_left(positions2, cpos + 1)
+            candidates: List[int] = []
+            if i < len(positions2) and positions2[i] - cpos <= distance:
+                candidates.append(positions2[i])
+            if not ordered:
+                j: int = bisect_left(positions2, cpos) - 1
+                if j >= 0 and cpos - positions2[j] <= distance:
+                    candidates.append(positions2[j])
+            if len(candidates) == 0:
+                continue
+            other: int = min(candidates, key=lambda x: (abs(x - cpos), x))
+            matches.append((min(cpos, other), max(cpos, other)))
+        return matches
+
+    def __postings(self, terms: List[Term]) -> List[List[int]]:
+        keys: List[List[Tuple[str, str, str]]] = [
+            [self.__key(x) for x in term] if isinstance(term, list)
+            else [self.__key(term)]
+            for term in terms
+        ]
+        self.__fetch(
+            list(
+                dict.fromkeys(
+                    key for x in keys for key in x if key not in self.cache
+                )
+            )
+        )
+        postings: Dict[Tuple[str, str, str], List[int]] = {
+            key: self.cache.get(key) for x in keys for key in x
+        }
+        for key, positions in postings.items():
+            if positions is None:
+                # Evicted in the meantime, as the cache is too small
+                postings[key] = self.__fetch([key])[0]
+        return [
+            postings[x[0]] if len(x) == 1
+            else sorted(set(chain.from_iterable(postings[key] for key in x)))
+            for x in keys
+        ]
+
+    def __key(self, term: Union[str, Regex]) -> Tuple[str, str, str]:
+        return (
+            self.attribute.api_name,
+            'regex' if isinstance(term, Regex) else 'word',
+            str(term)
+        )
+
+    def __fetch(self, keys: List[Tuple[str, str, str]]) -> List[List[int]]:
+        ''' fetch and cache the posting lists of <keys> '''
+        if len(keys) == 0:
+            return []
+        api_name: str = self.attribute.api_name
+        words: List[str] = [x for _, kind, x in keys if kind == 'word']
+        commands: List[Tuple[str, Tuple]] = [
+            ('cl_regex2id', (api_name, x)) for _, kind, x in keys
+            if kind == 'regex'
+        ]
+        if len(words) > 0:
+            commands.append(('cl_str2id', (api_name, words)))
+        responses: List = self.attribute.client.api.pipeline(commands)
+        word_ids = iter(responses.pop() if len(words) > 0 else [])
+        regex_ids = iter(responses)
+        # The lexicon IDs matching each key, unknown words match none
+        ids: List[List[int]] = []
+        for _, kind, x in keys:
+            if kind == 'regex':
+                ids.append(next(regex_ids))
+                continue
+            id: int = next(word_ids)
+            ids.append([] if id < 0 else [id])
+        commands = [
+            ('cl_id2cpos', (api_name, x[0])) if len(x) == 1
+            else ('cl_idlist2cpos', (api_name, x))
+            for x in ids if len(x) > 0
+        ]
+        responses = iter(
+            self.attribute.client.api.pipeline(commands)
+            if len(commands) > 0 else []
+        )
+        postings: List[List[int]] = [
+            next(responses) if len(x) > 0 else [] for x in ids
+        ]
+        for key, positions in zip(keys, postings):
+            self.cache.put(key, positions)
+        return postings
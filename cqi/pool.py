@@ -0,0 +1,334 @@
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple
+)
+import queue
+import socket
+import threading
+from .api import APIClient
+from .constants import FIELD_MATCH, FIELD_MATCHEND
+from . import errors
+
+
+class SessionPool:
+    '''
+    A thread-safe pool of authenticated sessions with a CQi server. Sessions
+    are connected lazily, up to <size> at the same time.
+
+    Example:
+    >>> import cqi
+    >>> pool = cqi.SessionPool('127.0.0.1', 'username', 'password', size=4)
+    >>> with pool.session() as api:
+    ...     api.corpus_list_corpora()
+    ['CORPUS']
+    >>> pool.close()
+
+    Args:
+    host (str): URL to the CQP server.
+        For example ``cqpserver.localhost`` or ``127.0.0.1``.
+    username (str): Username used to connect the sessions.
+    password (str): Password used to connect the sessions.
+    size (int): Maximum number of sessions.
+        Default: ``4``
+    **kwargs: Further arguments for the APIClient of each session.
+    '''
+
+    def __init__(
+        self,
+        host: str,
+        username: str,
+        password: str,
+        size: int = 4,
+        **kwargs
+    ):
+        self.host: str = host
+        self.username: str = username
+        self.password: str = password
+        self.size: int = size
+        self.kwargs: dict = kwargs
+        self.__idle_sessions: queue.LifoQueue = queue.LifoQueue()
+        self.__num_sessions: int = 0
+        self.__lock: threading.Lock = threading.Lock()
+
+    def __enter__(self) -> 'SessionPool':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def acquire(self, timeout: Optional[float] = None) -> APIClient:
+        '''
+        returns an idle session, connecting a new one if the pool is not
+        full; blocks until a session is released otherwise and raises
+        queue.Empty if none is released within <timeout> seconds
+        '''
+        try:
+            return self.__idle_sessions.get_nowait()
+        except queue.Empty:
+            pass
+        with self.__lock:
+            connect: bool = self.__num_sessions < self.size
+            if connect:
+                self.__num_sessions += 1
+        if not connect:
+            return self.__idle_sessions.get(timeout=timeout)
+        try:
+            api: APIClient = APIClient(self.host, **self.kwargs)
+            api.ctrl_connect(self.username, self.password)
+        except BaseException:
+            with self.__lock:
+                self.__num_sessions -= 1
+            raise
+        return api
+
+    def release(self, api: APIClient):
+        ''' return a session acquired from this pool '''
+        self.__idle_sessions.put(api)
+
+    def discard(self, api: APIClient):
+        '''
+        close a session acquired from this pool instead of returning it,
+        e.g. after a connection error left it in an unknown state
+        '''
+        with self.__lock:
+            self.__num_sessions -= 1
+        try:
+            api.socket.close()
+        except OSError:
+            pass
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None) -> Iterator[APIClient]:
+        '''
+        Acquire a session for the duration of a with block. Sessions that
+        raised anything but a CQi error are discarded.
+        '''
+        api: APIClient = self.acquire(timeout=timeout)
+        try:
+            yield api
+        except errors.CQiException:
+            self.release(api)
+            raise
+        except BaseException:
+            self.discard(api)
+            raise
+        else:
+            self.release(api)
+
+    def close(self):
+        ''' disconnect all idle sessions '''
+        while True:
+            try:
+                api: APIClient = self.__idle_sessions.get_nowait()
+            except queue.Empty:
+                return
+            with self.__lock:
+                self.__num_sessions -= 1
+            try:
+                api.ctrl_bye()
+            except (OSError, errors.CQiException):
+                pass
+
+
+class QueryResult(NamedTuple):
+    #: The (corpus, query, post_processing) job
+    job: Tuple
+    #: Number of matches, None if the job failed
+    size: Optional[int]
+    #: Return value of the post processing function
+    result: Any
+    #: The exception raised by the job, None if it succeeded
+    error: Optional[BaseException]
+
+
+def fdist_1(
+    cutoff: int,
+    field: int,
+    attribute_name: str
+) -> Callable[[APIClient, str, int], List[int]]:
+    '''
+    returns a post processing function computing the frequency distribution
+    of single tokens (see Subcorpus.fdist_1) for a BatchExecutor job
+    '''
+    def post_processing(
+        api: APIClient,
+        subcorpus: str,
+        size: int
+    ) -> List[int]:
+        corpus: str = subcorpus.split(':', 1)[0]
+        return api.cqp_fdist_1(
+            subcorpus,
+            cutoff,
+            field,
+            f'{corpus}.{attribute_name}'
+        )
+    return post_processing
+
+
+def first_page(
+    page_size: int
+) -> Callable[[APIClient, str, int], List[Tuple]]:
+    '''
+    returns a post processing function dumping the (match, matchend) pairs
+    of the first <page_size> matches for a BatchExecutor job
+    '''
+    def post_processing(
+        api: APIClient,
+        subcorpus: str,
+        size: int
+    ) -> List[Tuple]:
+        if size == 0:
+            return []
+        last: int = min(size, page_size) - 1
+        matches, matchends = api.pipeline(
+            [
+                ('cqp_dump_subcorpus', (subcorpus, field, 0, last))
+                for field in (FIELD_MATCH, FIELD_MATCHEND)
+            ]
+        )
+        return list(zip(matches, matchends))
+    return post_processing
+
+
+class BatchExecutor:
+    '''
+    Executes many CQP queries concurrently over the sessions of a
+    SessionPool. Each job is a (corpus, query, post_processing) tuple, where
+    post_processing is None or a function that is called with the session,
+    the api name of the result subcorpus and its size, e.g.
+    cqi.pool.fdist_1(...). The result subcorpus is dropped after each job.
+
+    Example:
+    >>> import cqi
+    >>> pool = cqi.SessionPool('127.0.0.1', 'username', 'password', size=4)
+    >>> executor = cqi.BatchExecutor(pool)
+    >>> fdist = cqi.pool.fdist_1(0, cqi.constants.FIELD_MATCH, 'word')
+    >>> jobs = [
+    ...     ('CORPUS', f'[lemma="{x}"];', fdist) for x in ['go', 'walk']
+    ... ]
+    >>> for x in executor.execute(jobs):
+    ...     print(x.job[1], x.size, x.result)
+
+    Args:
+    pool (SessionPool): The sessions to execute the jobs on.
+    max_workers (int): Maximum number of concurrently executed jobs.
+        Default: the size of the pool
+    '''
+
+    def __init__(self, pool: SessionPool, max_workers: Optional[int] = None):
+        self.pool: SessionPool = pool
+        self.max_workers: int = max_workers or pool.size
+
+    def execute(
+        self,
+        jobs: Iterable[Tuple],
+        timeout: Optional[float] = None
+    ) -> Iterator[QueryResult]:
+        '''
+        yields the results of <jobs> as soon as they are completed; jobs that
+        are not completed <timeout> seconds after they got a session are
+        aborted and yielded with a TimeoutError, their sessions are closed
+        (see _deadline), so that the pool connects new ones
+        '''
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=self.max_workers
+        )
+        futures: Dict[Future, Tuple] = {
+            executor.submit(self._execute_job, job, i, timeout): job
+            for i, job in enumerate(jobs)
+        }
+        try:
+            for future in as_completed(futures):
+                del futures[future]
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            # Running jobs drop their subcorpus and release their session
+            # in the background
+            executor.shutdown(wait=False)
+
+    def _execute_job(
+        self,
+        job: Tuple,
+        job_id: int,
+        timeout: Optional[float] = None
+    ) -> QueryResult:
+        corpus, query, post_processing = (tuple(job) + (None,))[:3]
+        subcorpus_name: str = f'Batch{job_id}'
+        subcorpus: str = f'{corpus}:{subcorpus_name}'
+        expired: threading.Event = threading.Event()
+        try:
+            with self.pool.session() as api, _deadline(api, timeout, expired):
+                api.cqp_query(corpus, subcorpus_name, query)
+                try:
+                    size: int = api.cqp_subcorpus_size(subcorpus)
+                    result: Any = (
+                        None if post_processing is None
+                        else post_processing(api, subcorpus, size)
+                    )
+                finally:
+                    if not expired.is_set():
+                        api.cqp_drop_subcorpus(subcorpus)
+        except Exception as e:
+            if expired.is_set():
+                # The error was caused by closing the session
+                e = TimeoutError()
+            return QueryResult(job, None, None, e)
+        return QueryResult(job, size, result, None)
+
+
+@contextmanager
+def _deadline(
+    api: APIClient,
+    timeout: Optional[float],
+    expired: threading.Event
+) -> Iterator[None]:
+    '''
+    Abort the session <api> if the with block is not completed within
+    <timeout> seconds (None for no limit) and set <expired>: its connection
+    is shut down, so that pending calls raise TimeoutError and the session
+    is discarded (see SessionPool.session).
+
+    NB: CQPserver handles the commands of a session one after another, so a
+        running query cannot be aborted with CTRL_USER_ABORT.
+    '''
+    if timeout is None:
+        yield
+        return
+    lock: threading.Lock = threading.Lock()
+    completed: bool = False
+
+    def abort():
+        with lock:
+            if completed:
+                return
+            expired.set()
+            # Pending calls receive EOF, which raises TimeoutError at once
+            api.timeout = 0.0
+            try:
+                api.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    timer: threading.Timer = threading.Timer(timeout, abort)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    finally:
+        with lock:
+            completed = True
+        timer.cancel()
+        if expired.is_set():
+            # Replaces any error of the block, the session must be discarded
+            raise TimeoutError()
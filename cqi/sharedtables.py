@@ -0,0 +1,200 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def _align(size: int) -> int:
+    ''' round <size> up to a multiple of 8, the alignment of all arrays '''
+    return -(-size // 8) * 8
+
+
+class SharedTableCache:
+    '''
+    An opt-in cache for the read-only tables of attributes (lexicon indexes,
+    frequency vectors, region tables and alignment tables) in memory mapped
+    files, for processes on one machine that query the same corpora, e.g.
+    the workers of a web server. The first process that needs a table
+    downloads it and writes it to a file, while the others wait for it;
+    then every process maps the file and uses its arrays without copying
+    them, so the table is held in memory only once.
+
+    Tables are keyed by attribute, table name and the attribute's size and
+    lexicon size, so a changed corpus gets new files. Use a directory on a
+    memory backed file system (e.g. /dev/shm) for the fastest warm-up, and
+    a directory per CQP server if several servers have corpora of the same
+    name.
+
+    Example:
+    >>> import cqi
+    >>> from cqi.sharedtables import SharedTableCache
+    >>> client = cqi.CQiClient(
+    ...     '127.0.0.1',
+    ...     table_cache=SharedTableCache('/dev/shm/cqi-tables')
+    ... )
+    >>> word = client.corpora.get('CORPUS').positional_attributes.get('word')
+    >>> word.lexicon_index().complete('ca', k=2)
+    [('cat', 4), ('car', 1)]
+
+    Args:
+    directory (str): The directory of the table files, created if missing.
+        Default: ``cqi-tables`` in the directory for temporary files
+    '''
+
+    #: Version of the file format, part of every file name
+    format_version: int = 1
+    #: Magic bytes at the start of every file
+    magic: bytes = b'CQITABLE'
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory: str = (
+            directory or os.path.join(tempfile.gettempdir(), 'cqi-tables')
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        #: Number of tables attached from existing files
+        self.num_hits: int = 0
+        #: Number of tables built and written by this process
+        self.num_misses: int = 0
+        # The arrays of the files mapped by this process, by key
+        self.__arrays: Dict[str, Dict[str, memoryview]] = {}
+        self.__lock: threading.RLock = threading.RLock()
+
+    def path(self, key: str) -> str:
+        ''' returns the path of the file of the table <key> '''
+        file_name: str = re.sub(r'[^\w.-]', '_', key)
+        return os.path.join(
+            self.directory,
+            f'{file_name}.v{self.format_version}.tbl'
+        )
+
+    def get_or_build(
+        self,
+        key: str,
+        build: Callable[[], Dict[str, Sequence]]
+    ) -> Dict[str, memoryview]:
+        '''
+        returns the arrays of the table <key>, built by <build> and stored
+        if no process has stored them yet
+        '''
+        arrays: Optional[Dict[str, memoryview]] = self.load(key)
+        if arrays is not None:
+            return arrays
+        with self.__lock, self.__file_lock(key):
+            # Another process may have stored the table in the meantime
+            arrays = self.__attach(key)
+            if arrays is None:
+                self.store(key, build())
+                self.num_misses += 1
+                arrays = self.__attach(key)
+            else:
+                self.num_hits += 1
+        return arrays
+
+    def load(self, key: str) -> Optional[Dict[str, memoryview]]:
+        ''' returns the arrays of the table <key>, None if not stored '''
+        with self.__lock:
+            arrays: Optional[Dict[str, memoryview]] = self.__attach(key)
+            if arrays is not None:
+                self.num_hits += 1
+            return arrays
+
+    def store(self, key: str, arrays: Dict[str, Sequence]):
+        '''
+        Write <arrays> (arrays, bytes or memoryviews) to the file of the
+        table <key>. The file is replaced atomically, so readers never see a
+        partially written table.
+        '''
+        buffers: List[memoryview] = [memoryview(x) for x in arrays.values()]
+        header: List[List] = []
+        offset: int = 0
+        for name, buffer in zip(arrays, buffers):
+            header.append([name, buffer.format, offset, buffer.nbytes])
+            offset += _align(buffer.nbytes)
+        encoded_header: bytes = json.dumps(header).encode()
+        # The data starts after the magic bytes, the header size and the
+        # header, padded to 8 bytes
+        data_offset: int = _align(len(self.magic) + 8 + len(encoded_header))
+        tmp_path: str = f'{self.path(key)}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.magic)
+            f.write(struct.pack('<Q', len(encoded_header)))
+            f.write(encoded_header)
+            for (_, _, buffer_offset, _), buffer in zip(header, buffers):
+                f.seek(data_offset + buffer_offset)
+                f.write(buffer)
+            f.truncate(max(data_offset + offset, 1))
+        os.replace(tmp_path, self.path(key))
+
+    def forget(self, key: str):
+        '''
+        Delete the file of the table <key>; processes that have mapped it
+        keep their mapping
+        '''
+        with self.__lock:
+            self.__arrays.pop(key, None)
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        ''' delete the files of all tables '''
+        with self.__lock:
+            self.__arrays.clear()
+            for file_name in os.listdir(self.directory):
+                if file_name.endswith(('.tbl', '.lock')):
+                    os.remove(os.path.join(self.directory, file_name))
+
+    def __attach(self, key: str) -> Optional[Dict[str, memoryview]]:
+        arrays: Optional[Dict[str, memoryview]] = self.__arrays.get(key)
+        if arrays is not None:
+            return arrays
+        try:
+            with open(self.path(key), 'rb') as f:
+                # The mapping stays valid after the file is closed
+                buffer: memoryview = memoryview(
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                )
+        except FileNotFoundError:
+            return None
+        if bytes(buffer[:len(self.magic)]) != self.magic:
+            raise ValueError(f'Not a table file: {self.path(key)}')
+        header_size: int = struct.unpack(
+            '<Q',
+            buffer[len(self.magic):len(self.magic) + 8]
+        )[0]
+        header_end: int = len(self.magic) + 8 + header_size
+        header: List[List] = json.loads(
+            bytes(buffer[len(self.magic) + 8:header_end])
+        )
+        data_offset: int = _align(header_end)
+        arrays = {
+            name: buffer[
+                data_offset + offset:data_offset + offset + nbytes
+            ].cast(format)
+            for name, format, offset, nbytes in header
+        }
+        self.__arrays[key] = arrays
+        return arrays
+
+    @contextmanager
+    def __file_lock(self, key: str) -> Iterator[None]:
+        ''' an exclusive lock on the table <key> across processes '''
+        if fcntl is None:
+            yield
+            return
+        with open(f'{self.path(key)}.lock', 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,320 @@
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+    TYPE_CHECKING
+)
+if TYPE_CHECKING:
+    from .models.attributes import PositionalAttribute, StructuralAttribute
+
+
+#: An attribute that can be a column of a TokenTable
+ColumnAttribute = Union['PositionalAttribute', 'StructuralAttribute']
+
+
+class AlignmentTable:
+    '''
+    The complete alignment table of an alignment attribute (see
+    AlignmentAttribute.alignment_table), as four int arrays indexed by
+    alignment ID. The alignments are ordered by their source start, as in
+    the CWB alignment files.
+    '''
+
+    def __init__(self, alignments: List[Tuple[int, int, int, int]]):
+        self.src_starts: Sequence[int] = array(
+            'l',
+            (x[0] for x in alignments)
+        )
+        self.src_ends: Sequence[int] = array('l', (x[1] for x in alignments))
+        self.target_starts: Sequence[int] = array(
+            'l',
+            (x[2] for x in alignments)
+        )
+        self.target_ends: Sequence[int] = array(
+            'l',
+            (x[3] for x in alignments)
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, Sequence]) -> 'AlignmentTable':
+        '''
+        Build a table from the arrays of another table (see to_arrays),
+        without copying them.
+        '''
+        alignment_table: AlignmentTable = cls.__new__(cls)
+        alignment_table.src_starts = arrays['src_starts']
+        alignment_table.src_ends = arrays['src_ends']
+        alignment_table.target_starts = arrays['target_starts']
+        alignment_table.target_ends = arrays['target_ends']
+        return alignment_table
+
+    def to_arrays(self) -> Dict[str, Sequence]:
+        return {
+            'src_starts': self.src_starts,
+            'src_ends': self.src_ends,
+            'target_starts': self.target_starts,
+            'target_ends': self.target_ends
+        }
+
+    def __len__(self) -> int:
+        return len(self.src_starts)
+
+    def cpos_by_id(self, id: int) -> Tuple[int, int, int, int]:
+        ''' returns (src_start, src_end, target_start, target_end) '''
+        return (
+            self.src_starts[id],
+            self.src_ends[id],
+            self.target_starts[id],
+            self.target_ends[id]
+        )
+
+    def ids_by_cpos(self, cpos_list: List[int]) -> List[int]:
+        ''' returns -1 for every corpus position not inside an alignment '''
+        ids: List[int] = []
+        for cpos in cpos_list:
+            id: int = bisect_right(self.src_starts, cpos) - 1
+            ids.append(id if id >= 0 and cpos <= self.src_ends[id] else -1)
+        return ids
+
+    def target_cpos_by_cpos(
+        self,
+        cpos_list: List[int]
+    ) -> List[Optional[Tuple[int, int]]]:
+        '''
+        returns the (target_start, target_end) corpus positions of the
+        alignment containing each corpus position in <cpos_list>, None for
+        corpus positions not inside an alignment
+        '''
+        return [
+            None if id < 0 else (self.target_starts[id], self.target_ends[id])
+            for id in self.ids_by_cpos(cpos_list)
+        ]
+
+
+class RegionTable:
+    '''
+    The start and end corpus positions of all regions of a structural
+    attribute (see StructuralAttribute.region_table), as two int arrays
+    indexed by region ID.
+    '''
+
+    def __init__(self, regions: List[Tuple[int, int]]):
+        self.starts: Sequence[int] = array('l', (x[0] for x in regions))
+        self.ends: Sequence[int] = array('l', (x[1] for x in regions))
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, Sequence]) -> 'RegionTable':
+        '''
+        Build a table from the arrays of another table (see to_arrays),
+        without copying them.
+        '''
+        region_table: RegionTable = cls.__new__(cls)
+        region_table.starts = arrays['starts']
+        region_table.ends = arrays['ends']
+        return region_table
+
+    def to_arrays(self) -> Dict[str, Sequence]:
+        return {'starts': self.starts, 'ends': self.ends}
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def cpos_by_id(self, id: int) -> Tuple[int, int]:
+        return (self.starts[id], self.ends[id])
+
+    def ids_by_cpos(self, cpos_list: List[int]) -> List[int]:
+        '''
+        returns -1 for every corpus position not inside a structure region
+        '''
+        ids: List[int] = []
+        for cpos in cpos_list:
+            id: int = bisect_right(self.starts, cpos) - 1
+            ids.append(id if id >= 0 and cpos <= self.ends[id] else -1)
+        return ids
+
+    def sizes(self) -> List[int]:
+        ''' returns the number of tokens of each region '''
+        return [end - start + 1 for start, end in zip(self.starts, self.ends)]
+
+
+class FacetIndex:
+    '''
+    The values of all regions of a value-bearing structural attribute (see
+    StructuralAttribute.facet_index), dictionary encoded: each region is
+    mapped to the code of its value, i.e. the value's index in ``values``.
+    Predicates on values are evaluated once per distinct value.
+
+    Example:
+    >>> years = corpus.structural_attributes.get('text_year').facet_index()
+    >>> years.ranges(lambda x: int(x) > 1900)
+    [(1200, 5400), (9800, 12011)]
+    '''
+
+    def __init__(self, region_table: RegionTable, values: List[str]):
+        self.region_table: RegionTable = region_table
+        #: The distinct values, sorted
+        self.values: List[str] = sorted(set(values))
+        codes: Dict[str, int] = {x: i for i, x in enumerate(self.values)}
+        #: The code of each region's value, indexed by region ID
+        self.codes: array = array('l', (codes[x] for x in values))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def values_by_ids(self, id_list: List[int]) -> List[str]:
+        '''
+        returns "" for every region ID in <id_list> that is out of range
+        '''
+        n: int = len(self.codes)
+        return [
+            self.values[self.codes[x]] if 0 <= x < n else '' for x in id_list
+        ]
+
+    def values_by_cpos(self, cpos_list: List[int]) -> List[str]:
+        '''
+        returns the values of the regions enclosing the corpus positions in
+        <cpos_list>, "" for corpus positions not inside a region
+        '''
+        return self.values_by_ids(self.region_table.ids_by_cpos(cpos_list))
+
+    def counts(self, cpos_list: List[int]) -> Dict[str, int]:
+        '''
+        returns the number of corpus positions in <cpos_list> inside regions
+        with each value, sorted by count desc.
+        '''
+        code_counts: Counter = Counter(
+            self.codes[x] for x in self.region_table.ids_by_cpos(cpos_list)
+            if x >= 0
+        )
+        return {
+            self.values[code]: count
+            for code, count in code_counts.most_common()
+        }
+
+    def ids(self, predicate: Callable[[str], bool]) -> List[int]:
+        '''
+        returns the IDs of the regions whose value satisfies <predicate>
+        '''
+        matching_codes: Set[int] = {
+            i for i, x in enumerate(self.values) if predicate(x)
+        }
+        return [i for i, x in enumerate(self.codes) if x in matching_codes]
+
+    def ranges(
+        self,
+        predicate: Callable[[str], bool]
+    ) -> List[Tuple[int, int]]:
+        '''
+        returns the (start, end) corpus positions of the regions whose value
+        satisfies <predicate>, adjacent regions are merged
+        '''
+        ranges: List[Tuple[int, int]] = []
+        for id in self.ids(predicate):
+            start: int = self.region_table.starts[id]
+            end: int = self.region_table.ends[id]
+            if len(ranges) > 0 and ranges[-1][1] + 1 == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def filter(
+        self,
+        cpos_list: List[int],
+        predicate: Callable[[str], bool]
+    ) -> List[bool]:
+        '''
+        returns for each corpus position in <cpos_list> whether it is inside
+        a region whose value satisfies <predicate>
+        '''
+        matching_codes: Set[int] = {
+            i for i, x in enumerate(self.values) if predicate(x)
+        }
+        return [
+            x >= 0 and self.codes[x] in matching_codes
+            for x in self.region_table.ids_by_cpos(cpos_list)
+        ]
+
+
+class TokenTable:
+    '''
+    The tokens of the corpus positions <start> .. <end> in columns (see
+    Corpus.tokens): the lexicon IDs of positional attributes and the region
+    IDs of structural attributes, as int arrays. Their values are resolved
+    on first access, with one lookup of the distinct IDs per column.
+    '''
+
+    def __init__(
+        self,
+        start: int,
+        end: int,
+        attributes: Dict[str, ColumnAttribute],
+        ids: Dict[str, List[int]]
+    ):
+        self.start: int = start
+        self.end: int = end
+        #: The attributes of the columns by name
+        self.attributes: Dict[str, ColumnAttribute] = attributes
+        #: The lexicon IDs or region IDs of the columns by name; region ID
+        #: -1 marks tokens not inside a region
+        self.ids: Dict[str, array] = {
+            name: array('l', x) for name, x in ids.items()
+        }
+        self.__values: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def cpos(self) -> range:
+        return range(self.start, self.end + 1)
+
+    def values(self, name: str) -> List[str]:
+        '''
+        returns the values of column <name>; "" for tokens not inside a
+        region of a structural attribute or if it has no values
+        '''
+        if name not in self.__values:
+            ids: array = self.ids[name]
+            unique_ids: List[int] = sorted(set(ids) - {-1})
+            attribute: ColumnAttribute = self.attributes[name]
+            resolved: Dict[int, str] = {-1: ''}
+            if getattr(attribute, 'has_values', True):
+                resolved.update(
+                    zip(unique_ids, attribute.values_by_ids(unique_ids))
+                )
+            else:
+                resolved.update((x, '') for x in unique_ids)
+            self.__values[name] = [resolved[x] for x in ids]
+        return self.__values[name]
+
+    def region_starts(self, name: str) -> List[bool]:
+        '''
+        returns for each token whether it starts a region of the structural
+        attribute <name> (or the part of a region inside the table)
+        '''
+        ids: array = self.ids[name]
+        return [
+            x >= 0 and (i == 0 or ids[i - 1] != x) for i, x in enumerate(ids)
+        ]
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        ''' yields a {'cpos': cpos, name: value, ...} dict per token '''
+        columns: Dict[str, List[str]] = {
+            name: self.values(name) for name in self.ids
+        }
+        for i, cpos in enumerate(self.cpos):
+            row: Dict[str, Any] = {'cpos': cpos}
+            for name, values in columns.items():
+                row[name] = values[i]
+            yield row
@@ -0,0 +1,34 @@
+from typing import Iterator
+import pytest
+import cqi
+from fakeserver import FakeCQiServer
+
+
+@pytest.fixture
+def server() -> Iterator[FakeCQiServer]:
+    server: FakeCQiServer = FakeCQiServer()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def api(server: FakeCQiServer) -> cqi.APIClient:
+    api: cqi.APIClient = cqi.APIClient(server.host, server.port, timeout=5.0)
+    api.ctrl_connect('anonymous', '')
+    return api
+
+
+@pytest.fixture
+def client(server: FakeCQiServer) -> cqi.CQiClient:
+    client: cqi.CQiClient = cqi.CQiClient(
+        server.host,
+        server.port,
+        timeout=5.0
+    )
+    client.connect('anonymous', '')
+    return client
+
+
+@pytest.fixture
+def corpus(client: cqi.CQiClient):
+    return client.corpora.get('TOY')
@@ -0,0 +1,641 @@
+'''
+A fake CQi server for the tests. It serves small in-memory corpora over
+real sockets on localhost, so several instances can stand in for
+replicated cqpserver instances. As in cqpserver, subcorpora belong to the
+session (connection) that created them.
+'''
+from typing import Dict, List, Optional, Tuple
+import re
+import socket
+import struct
+import threading
+import time
+from cqi.api import specification
+
+
+#: Command names by command code, e.g. {0x1101: 'CL_ATTRIBUTE_SIZE'}
+COMMAND_NAMES: Dict[int, str] = {
+    value: name for name, value in vars(specification).items()
+    if name.startswith(('CTRL_', 'ASK_', 'CORPUS_', 'CL_', 'CQP_'))
+    and not name.startswith(('CL_ERROR', 'CQP_ERROR'))
+    and isinstance(value, int) and value > 0xff
+}
+
+#: The arguments of each command: B(yte), I(nt), S(tring), i(nt list),
+#: s(tring list)
+COMMAND_ARGS: Dict[str, str] = {
+    'CTRL_CONNECT': 'SS',
+    'CORPUS_CHARSET': 'S',
+    'CORPUS_PROPERTIES': 'S',
+    'CORPUS_POSITIONAL_ATTRIBUTES': 'S',
+    'CORPUS_STRUCTURAL_ATTRIBUTES': 'S',
+    'CORPUS_STRUCTURAL_ATTRIBUTE_HAS_VALUES': 'S',
+    'CORPUS_ALIGNMENT_ATTRIBUTES': 'S',
+    'CORPUS_FULL_NAME': 'S',
+    'CORPUS_INFO': 'S',
+    'CORPUS_DROP_CORPUS': 'S',
+    'CL_ATTRIBUTE_SIZE': 'S',
+    'CL_LEXICON_SIZE': 'S',
+    'CL_DROP_ATTRIBUTE': 'S',
+    'CL_STR2ID': 'Ss',
+    'CL_ID2STR': 'Si',
+    'CL_ID2FREQ': 'Si',
+    'CL_CPOS2ID': 'Si',
+    'CL_CPOS2STR': 'Si',
+    'CL_CPOS2STRUC': 'Si',
+    'CL_CPOS2LBOUND': 'Si',
+    'CL_CPOS2RBOUND': 'Si',
+    'CL_CPOS2ALG': 'Si',
+    'CL_STRUC2STR': 'Si',
+    'CL_ID2CPOS': 'SI',
+    'CL_IDLIST2CPOS': 'Si',
+    'CL_REGEX2ID': 'SS',
+    'CL_STRUC2CPOS': 'SI',
+    'CL_ALG2CPOS': 'SI',
+    'CQP_QUERY': 'SSS',
+    'CQP_LIST_SUBCORPORA': 'S',
+    'CQP_SUBCORPUS_SIZE': 'S',
+    'CQP_SUBCORPUS_HAS_FIELD': 'SB',
+    'CQP_DUMP_SUBCORPUS': 'SBII',
+    'CQP_DROP_SUBCORPUS': 'S',
+    'CQP_FDIST_1': 'SIBS',
+    'CQP_FDIST_2': 'SIBSBS'
+}
+
+
+class FakeError(Exception):
+    ''' answers a command with the error <code> '''
+
+    def __init__(self, code: int):
+        super().__init__(code)
+        self.code: int = code
+
+
+class FakeCorpus:
+    '''
+    A corpus with the positional attributes word and lemma (the lower-cased
+    words), structural attributes as {name: (regions, values or None)} and
+    alignment attributes as {name: [(src_start, src_end, target_start,
+    target_end), ...]}.
+    '''
+
+    def __init__(
+        self,
+        words: List[str],
+        structural_attributes: Optional[
+            Dict[str, Tuple[List[Tuple[int, int]], Optional[List[str]]]]
+        ] = None,
+        alignment_attributes: Optional[
+            Dict[str, List[Tuple[int, int, int, int]]]
+        ] = None
+    ):
+        self.size: int = len(words)
+        #: {name: (lexicon, lexicon ID of each corpus position)}
+        self.positional_attributes: Dict[
+            str,
+            Tuple[List[str], List[int]]
+        ] = {}
+        for name, values in (
+            ('word', words),
+            ('lemma', [x.lower() for x in words])
+        ):
+            lexicon: List[str] = list(dict.fromkeys(values))
+            ids: Dict[str, int] = {x: i for i, x in enumerate(lexicon)}
+            self.positional_attributes[name] = (
+                lexicon,
+                [ids[x] for x in values]
+            )
+        self.structural_attributes = structural_attributes or {}
+        self.alignment_attributes = alignment_attributes or {}
+
+
+def toy_corpus() -> FakeCorpus:
+    '''
+    0   1   2   3  4   5   6 | 7 8   9   10 11  12  13 | 14  15  16  17  18
+    The cat sat on the mat . | A dog and a  cat met . | The cat saw the dog
+    19
+    .
+    '''
+    words: List[str] = (
+        'The cat sat on the mat . A dog and a cat met . The cat saw the dog .'
+    ).split()
+    sentences: List[Tuple[int, int]] = [(0, 6), (7, 13), (14, 19)]
+    return FakeCorpus(
+        words,
+        {
+            's': (sentences, None),
+            'text': ([(0, 13), (14, 19)], None),
+            'text_year': ([(0, 13), (14, 19)], ['1890', '1920'])
+        },
+        {'toy_de': [(s, e, s + 100, e + 100) for s, e in sentences]}
+    )
+
+
+def other_corpus() -> FakeCorpus:
+    ''' a second corpus, whose words have other lexicon IDs than in TOY '''
+    words: List[str] = 'a dog and a cat .'.split()
+    return FakeCorpus(words, {'s': ([(0, 5)], None)})
+
+
+class FakeSession:
+    def __init__(self, server: 'FakeCQiServer', sock: socket.socket):
+        self.server: 'FakeCQiServer' = server
+        self.socket: socket.socket = sock
+        self.buffer: bytes = b''
+        #: The matches of the subcorpora of this session, by api name
+        self.subcorpora: Dict[str, List[Tuple[int, int]]] = {}
+
+    def serve(self):
+        while True:
+            try:
+                code: int = self.recv_word()
+            except (EOFError, OSError):
+                return
+            name: str = COMMAND_NAMES.get(code, hex(code))
+            args: List = [
+                self.recv_arg(x) for x in COMMAND_ARGS.get(name, '')
+            ]
+            with self.server.lock:
+                self.server.commands.append(name)
+                failures: List[int] = self.server.failures.get(name, [])
+                error_code: Optional[int] = (
+                    failures.pop(0) if len(failures) > 0 else None
+                )
+                delays: List[float] = self.server.delays.get(name, [])
+                delay: float = delays.pop(0) if len(delays) > 0 else 0.0
+            if name == 'CTRL_USER_ABORT':
+                continue
+            time.sleep(delay)
+            try:
+                if error_code is not None:
+                    raise FakeError(error_code)
+                response: bytes = getattr(self, name)(*args)
+            except FakeError as e:
+                response = struct.pack('!H', e.code)
+            except (KeyError, IndexError):
+                response = struct.pack(
+                    '!H',
+                    specification.CL_ERROR_NO_SUCH_ATTRIBUTE
+                )
+            try:
+                self.socket.sendall(response)
+            except OSError:
+                return
+            if name == 'CTRL_BYE':
+                self.socket.close()
+                return
+
+    def recv(self, num_bytes: int) -> bytes:
+        while len(self.buffer) < num_bytes:
+            data: bytes = self.socket.recv(65536)
+            if len(data) == 0:
+                raise EOFError()
+            self.buffer += data
+        data, self.buffer = (
+            self.buffer[:num_bytes],
+            self.buffer[num_bytes:]
+        )
+        return data
+
+    def recv_word(self) -> int:
+        return struct.unpack('!H', self.recv(2))[0]
+
+    def recv_arg(self, arg_type: str):
+        if arg_type == 'B':
+            return struct.unpack('!B', self.recv(1))[0]
+        if arg_type == 'I':
+            return struct.unpack('!i', self.recv(4))[0]
+        if arg_type == 'S':
+            return self.recv(self.recv_word()).decode()
+        n: int = struct.unpack('!i', self.recv(4))[0]
+        if arg_type == 'i':
+            return list(struct.unpack(f'!{n}i', self.recv(4 * n)))
+        return [self.recv_arg('S') for _ in range(n)]
+
+    # Responses
+
+    @staticmethod
+    def status(code: int) -> bytes:
+        return struct.pack('!H', code)
+
+    @staticmethod
+    def data_bool(value: bool) -> bytes:
+        return struct.pack('!HB', specification.DATA_BOOL, value)
+
+    @staticmethod
+    def data_int(value: int) -> bytes:
+        return struct.pack('!Hi', specification.DATA_INT, value)
+
+    @staticmethod
+    def data_string(value: str) -> bytes:
+        data: bytes = value.encode()
+        return struct.pack('!HH', specification.DATA_STRING, len(data)) + data
+
+    @staticmethod
+    def data_int_list(values: List[int]) -> bytes:
+        return struct.pack(
+            f'!Hi{len(values)}i',
+            specification.DATA_INT_LIST,
+            len(values),
+            *values
+        )
+
+    @staticmethod
+    def data_string_list(values: List[str]) -> bytes:
+        data: List[bytes] = [x.encode() for x in values]
+        return struct.pack(
+            '!Hi',
+            specification.DATA_STRING_LIST,
+            len(values)
+        ) + b''.join(struct.pack('!H', len(x)) + x for x in data)
+
+    # Lookups
+
+    def corpus(self, name: str) -> FakeCorpus:
+        if name not in self.server.corpora:
+            raise FakeError(specification.CL_ERROR_CORPUS_ACCESS)
+        return self.server.corpora[name]
+
+    def attribute(self, api_name: str, kind: str):
+        corpus_name, _, name = api_name.partition('.')
+        attributes: Dict = getattr(self.corpus(corpus_name), kind)
+        if name not in attributes:
+            raise FakeError(specification.CL_ERROR_NO_SUCH_ATTRIBUTE)
+        return attributes[name]
+
+    def matches(self, subcorpus: str) -> List[Tuple[int, int]]:
+        if subcorpus not in self.subcorpora:
+            raise FakeError(specification.CQP_ERROR_NO_SUCH_CORPUS)
+        return self.subcorpora[subcorpus]
+
+    def region(self, regions: List[Tuple[int, int]], cpos: int) -> int:
+        for i, (start, end) in enumerate(regions):
+            if start <= cpos <= end:
+                return i
+        return -1
+
+    # Commands
+
+    def CTRL_CONNECT(self, username: str, password: str) -> bytes:
+        return self.status(specification.STATUS_CONNECT_OK)
+
+    def CTRL_BYE(self) -> bytes:
+        return self.status(specification.STATUS_BYE_OK)
+
+    def CTRL_PING(self) -> bytes:
+        return self.status(specification.STATUS_PING_OK)
+
+    def CTRL_LAST_GENERAL_ERROR(self) -> bytes:
+        return self.data_string('no error')
+
+    def ASK_FEATURE_CQI_1_0(self) -> bytes:
+        return self.data_bool(True)
+
+    def ASK_FEATURE_CL_2_3(self) -> bytes:
+        return self.data_bool(True)
+
+    def ASK_FEATURE_CQP_2_3(self) -> bytes:
+        return self.data_bool(True)
+
+    def CORPUS_LIST_CORPORA(self) -> bytes:
+        return self.data_string_list(list(self.server.corpora))
+
+    def CORPUS_CHARSET(self, corpus: str) -> bytes:
+        self.corpus(corpus)
+        return self.data_string('utf8')
+
+    def CORPUS_PROPERTIES(self, corpus: str) -> bytes:
+        self.corpus(corpus)
+        return self.data_string_list([])
+
+    def CORPUS_POSITIONAL_ATTRIBUTES(self, corpus: str) -> bytes:
+        return self.data_string_list(
+            list(self.corpus(corpus).positional_attributes)
+        )
+
+    def CORPUS_STRUCTURAL_ATTRIBUTES(self, corpus: str) -> bytes:
+        return self.data_string_list(
+            list(self.corpus(corpus).structural_attributes)
+        )
+
+    def CORPUS_STRUCTURAL_ATTRIBUTE_HAS_VALUES(self, attribute: str) -> bytes:
+        _, values = self.attribute(attribute, 'structural_attributes')
+        return self.data_bool(values is not None)
+
+    def CORPUS_ALIGNMENT_ATTRIBUTES(self, corpus: str) -> bytes:
+        return self.data_string_list(
+            list(self.corpus(corpus).alignment_attributes)
+        )
+
+    def CORPUS_FULL_NAME(self, corpus: str) -> bytes:
+        self.corpus(corpus)
+        return self.data_string(corpus.lower())
+
+    def CORPUS_INFO(self, corpus: str) -> bytes:
+        self.corpus(corpus)
+        return self.data_string_list([])
+
+    def CORPUS_DROP_CORPUS(self, corpus: str) -> bytes:
+        self.corpus(corpus)
+        return self.status(specification.STATUS_OK)
+
+    def CL_ATTRIBUTE_SIZE(self, attribute: str) -> bytes:
+        corpus_name, _, name = attribute.partition('.')
+        corpus: FakeCorpus = self.corpus(corpus_name)
+        if name in corpus.positional_attributes:
+            return self.data_int(corpus.size)
+        if name in corpus.structural_attributes:
+            return self.data_int(len(corpus.structural_attributes[name][0]))
+        if name in corpus.alignment_attributes:
+            return self.data_int(len(corpus.alignment_attributes[name]))
+        raise FakeError(specification.CL_ERROR_NO_SUCH_ATTRIBUTE)
+
+    def CL_LEXICON_SIZE(self, attribute: str) -> bytes:
+        lexicon, _ = self.attribute(attribute, 'positional_attributes')
+        return self.data_int(len(lexicon))
+
+    def CL_DROP_ATTRIBUTE(self, attribute: str) -> bytes:
+        return self.status(specification.STATUS_OK)
+
+    def CL_STR2ID(self, attribute: str, strings: List[str]) -> bytes:
+        lexicon, _ = self.attribute(attribute, 'positional_attributes')
+        return self.data_int_list(
+            [lexicon.index(x) if x in lexicon else -1 for x in strings]
+        )
+
+    def CL_ID2STR(self, attribute: str, ids: List[int]) -> bytes:
+        lexicon, _ = self.attribute(attribute, 'positional_attributes')
+        return self.data_string_list(
+            [lexicon[x] if 0 <= x < len(lexicon) else '' for x in ids]
+        )
+
+    def CL_ID2FREQ(self, attribute: str, ids: List[int]) -> bytes:
+        _, cpos_ids = self.attribute(attribute, 'positional_attributes')
+        return self.data_int_list([cpos_ids.count(x) for x in ids])
+
+    def CL_CPOS2ID(self, attribute: str, cpos_list: List[int]) -> bytes:
+        _, ids = self.attribute(attribute, 'positional_attributes')
+        return self.data_int_list(
+            [ids[x] if 0 <= x < len(ids) else -1 for x in cpos_list]
+        )
+
+    def CL_CPOS2STR(self, attribute: str, cpos_list: List[int]) -> bytes:
+        lexicon, ids = self.attribute(attribute, 'positional_attributes')
+        return self.data_string_list(
+            [lexicon[ids[x]] if 0 <= x < len(ids) else '' for x in cpos_list]
+        )
+
+    def CL_CPOS2STRUC(self, attribute: str, cpos_list: List[int]) -> bytes:
+        regions, _ = self.attribute(attribute, 'structural_attributes')
+        return self.data_int_list([self.region(regions, x) for x in cpos_list])
+
+    def CL_CPOS2LBOUND(self, attribute: str, cpos_list: List[int]) -> bytes:
+        regions, _ = self.attribute(attribute, 'structural_attributes')
+        return self.data_int_list(
+            [
+                -1 if i < 0 else regions[i][0]
+                for i in (self.region(regions, x) for x in cpos_list)
+            ]
+        )
+
+    def CL_CPOS2RBOUND(self, attribute: str, cpos_list: List[int]) -> bytes:
+        regions, _ = self.attribute(attribute, 'structural_attributes')
+        return self.data_int_list(
+            [
+                -1 if i < 0 else regions[i][1]
+                for i in (self.region(regions, x) for x in cpos_list)
+            ]
+        )
+
+    def CL_CPOS2ALG(self, attribute: str, cpos_list: List[int]) -> bytes:
+        alignments = self.attribute(attribute, 'alignment_attributes')
+        return self.data_int_list(
+            [
+                self.region([x[:2] for x in alignments], x)
+                for x in cpos_list
+            ]
+        )
+
+    def CL_STRUC2STR(self, attribute: str, ids: List[int]) -> bytes:
+        _, values = self.attribute(attribute, 'structural_attributes')
+        if values is None:
+            raise FakeError(specification.CL_ERROR_WRONG_ATTRIBUTE_TYPE)
+        return self.data_string_list(
+            [values[x] if 0 <= x < len(values) else '' for x in ids]
+        )
+
+    def CL_ID2CPOS(self, attribute: str, id: int) -> bytes:
+        _, ids = self.attribute(attribute, 'positional_attributes')
+        return self.data_int_list([i for i, x in enumerate(ids) if x == id])
+
+    def CL_IDLIST2CPOS(self, attribute: str, id_list: List[int]) -> bytes:
+        _, ids = self.attribute(attribute, 'positional_attributes')
+        return self.data_int_list(
+            [i for i, x in enumerate(ids) if x in set(id_list)]
+        )
+
+    def CL_REGEX2ID(self, attribute: str, regex: str) -> bytes:
+        lexicon, _ = self.attribute(attribute, 'positional_attributes')
+        try:
+            pattern = re.compile(regex)
+        except re.error:
+            raise FakeError(specification.CL_ERROR_REGEX)
+        return self.data_int_list(
+            [i for i, x in enumerate(lexicon) if pattern.fullmatch(x)]
+        )
+
+    def CL_STRUC2CPOS(self, attribute: str, id: int) -> bytes:
+        regions, _ = self.attribute(attribute, 'structural_attributes')
+        if not 0 <= id < len(regions):
+            raise FakeError(specification.CL_ERROR_OUT_OF_RANGE)
+        return struct.pack('!Hii', specification.DATA_INT_INT, *regions[id])
+
+    def CL_ALG2CPOS(self, attribute: str, id: int) -> bytes:
+        alignments = self.attribute(attribute, 'alignment_attributes')
+        if not 0 <= id < len(alignments):
+            raise FakeError(specification.CL_ERROR_OUT_OF_RANGE)
+        return struct.pack(
+            '!Hiiii',
+            specification.DATA_INT_INT_INT_INT,
+            *alignments[id]
+        )
+
+    def CQP_QUERY(self, mother_corpus: str, name: str, query: str) -> bytes:
+        '''
+        Supports sequences of "regex", [word="regex"], [lemma="regex"] and
+        [] tokens, terminated by ';'.
+        '''
+        corpus: FakeCorpus = self.corpus(mother_corpus)
+        token_pattern: str = r'\s*(?:"([^"]*)"|\[(?:(\w+)="([^"]*)")?\])'
+        if not re.fullmatch(f'(?:{token_pattern})+\\s*;', query):
+            raise FakeError(specification.CQP_ERROR_GENERAL)
+        tokens: List[Optional[Tuple[str, str]]] = []
+        for x in re.finditer(token_pattern, query.rstrip(';')):
+            if x.group(1) is not None:
+                tokens.append(('word', x.group(1)))
+            elif x.group(2) is not None:
+                tokens.append((x.group(2), x.group(3)))
+            else:
+                tokens.append(None)
+        matches: List[Tuple[int, int]] = []
+        for start in range(corpus.size - len(tokens) + 1):
+            for i, token in enumerate(tokens):
+                if token is None:
+                    continue
+                lexicon, ids = corpus.positional_attributes[token[0]]
+                if not re.fullmatch(token[1], lexicon[ids[start + i]]):
+                    break
+            else:
+                matches.append((start, start + len(tokens) - 1))
+        self.subcorpora[f'{mother_corpus}:{name}'] = matches
+        return self.status(specification.STATUS_OK)
+
+    def CQP_LIST_SUBCORPORA(self, corpus: str) -> bytes:
+        return self.data_string_list(
+            [
+                x.split(':', 1)[1] for x in self.subcorpora
+                if x.split(':', 1)[0] == corpus
+            ]
+        )
+
+    def CQP_SUBCORPUS_SIZE(self, subcorpus: str) -> bytes:
+        return self.data_int(len(self.matches(subcorpus)))
+
+    def CQP_SUBCORPUS_HAS_FIELD(self, subcorpus: str, field: int) -> bytes:
+        self.matches(subcorpus)
+        return self.data_bool(
+            field in (
+                specification.CONST_FIELD_MATCH,
+                specification.CONST_FIELD_MATCHEND
+            )
+        )
+
+    def CQP_DUMP_SUBCORPUS(
+        self,
+        subcorpus: str,
+        field: int,
+        first: int,
+        last: int
+    ) -> bytes:
+        matches: List[Tuple[int, int]] = self.matches(subcorpus)
+        if not 0 <= first <= last < len(matches):
+            raise FakeError(specification.CQP_ERROR_OUT_OF_RANGE)
+        return self.data_int_list(
+            [x[self.field(field)] for x in matches[first:last + 1]]
+        )
+
+    def CQP_DROP_SUBCORPUS(self, subcorpus: str) -> bytes:
+        self.matches(subcorpus)
+        del self.subcorpora[subcorpus]
+        return self.status(specification.STATUS_OK)
+
+    def CQP_FDIST_1(
+        self,
+        subcorpus: str,
+        cutoff: int,
+        field: int,
+        attribute: str
+    ) -> bytes:
+        _, ids = self.attribute(attribute, 'positional_attributes')
+        counts: Dict[int, int] = {}
+        for match in self.matches(subcorpus):
+            id: int = ids[match[self.field(field)]]
+            counts[id] = counts.get(id, 0) + 1
+        return self.data_int_list(
+            [
+                x for id, count in sorted(
+                    counts.items(),
+                    key=lambda x: (-x[1], x[0])
+                )
+                if count >= cutoff for x in (id, count)
+            ]
+        )
+
+    def field(self, field: int) -> int:
+        if field == specification.CONST_FIELD_MATCH:
+            return 0
+        if field == specification.CONST_FIELD_MATCHEND:
+            return 1
+        raise FakeError(specification.CQP_ERROR_INVALID_FIELD)
+
+
+class FakeCQiServer:
+    '''
+    Serves <corpora> on a free port of localhost until stop() is called.
+
+    Args:
+    corpora (dict): The corpora by name.
+        Default: ``TOY`` (see toy_corpus) and ``OTHER``
+    '''
+
+    def __init__(self, corpora: Optional[Dict[str, FakeCorpus]] = None):
+        self.corpora: Dict[str, FakeCorpus] = (
+            corpora if corpora is not None
+            else {'TOY': toy_corpus(), 'OTHER': other_corpus()}
+        )
+        self.host: str = '127.0.0.1'
+        #: The names of all received commands, e.g. 'CL_ID2STR'
+        self.commands: List[str] = []
+        #: Error codes to answer the next commands of a name with
+        self.failures: Dict[str, List[int]] = {}
+        #: Seconds to wait before answering the next commands of a name
+        self.delays: Dict[str, List[float]] = {}
+        self.sessions: List[FakeSession] = []
+        self.lock: threading.Lock = threading.Lock()
+        self.socket: socket.socket = socket.socket()
+        self.socket.bind((self.host, 0))
+        self.socket.listen(16)
+        self.port: int = self.socket.getsockname()[1]
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+    def fail(self, command_name: str, error_code: int, times: int = 1):
+        ''' answer the next <times> <command_name> commands with an error '''
+        with self.lock:
+            self.failures.setdefault(command_name, []).extend(
+                [error_code] * times
+            )
+
+    def delay(self, command_name: str, seconds: float, times: int = 1):
+        ''' answer the next <times> <command_name> commands late '''
+        with self.lock:
+            self.delays.setdefault(command_name, []).extend(
+                [seconds] * times
+            )
+
+    def count(self, command_name: str) -> int:
+        ''' returns the number of received <command_name> commands '''
+        with self.lock:
+            return self.commands.count(command_name)
+
+    def stop(self):
+        ''' stop accepting connections and reset all open connections '''
+        try:
+            # Wakes up the blocked accept call
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+        for session in self.sessions:
+            try:
+                # Reset instead of closing gracefully, like a crashed server
+                session.socket.setsockopt(
+                    socket.SOL_SOCKET,
+                    socket.SO_LINGER,
+                    struct.pack('ii', 1, 0)
+                )
+                # Wakes up the blocked recv call without sending a FIN
+                session.socket.shutdown(socket.SHUT_RD)
+                session.socket.close()
+            except OSError:
+                pass
+
+    def __accept(self):
+        while True:
+            try:
+                sock, _ = self.socket.accept()
+            except OSError:
+                return
+            session: FakeSession = FakeSession(self, sock)
+            with self.lock:
+                self.sessions.append(session)
+            threading.Thread(target=session.serve, daemon=True).start()
@@ -0,0 +1,156 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import cqi
+from cqi import errors
+from cqi.api import (
+    ChunkingPolicy,
+    LoadBalancedAPIClient,
+    MemoryPressurePolicy,
+    RegexCache
+)
+from cqi.constants import FIELD_MATCH
+from fakeserver import FakeCQiServer
+
+
+@pytest.fixture
+def servers():
+    servers = [FakeCQiServer(), FakeCQiServer()]
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+def connect(servers, **kwargs):
+    client = cqi.CQiClient(
+        [(x.host, x.port) for x in servers],
+        timeout=5.0,
+        cooldown=60.0,
+        **kwargs
+    )
+    client.connect('anonymous', '')
+    return client
+
+
+def owner(servers, command_name):
+    ''' the server that received <command_name> '''
+    (server,) = [x for x in servers if x.count(command_name) > 0]
+    return server
+
+
+def test_any_sequence_of_endpoints_is_balanced(servers):
+    client = connect(tuple(servers))
+    assert isinstance(client.api, LoadBalancedAPIClient)
+    assert len(client.api.replicas) == 2
+
+
+def test_connect_skips_unreachable_replicas(servers):
+    servers[0].stop()
+    client = connect(servers)
+    assert [x.healthy for x in client.api.replicas] == [False, True]
+    assert client.api.cl_lexicon_size('TOY.word') == 13
+
+
+def test_failover_to_healthy_replica(servers):
+    client = connect(servers)
+    servers[0].stop()
+    for _ in range(3):
+        assert client.api.cl_id2str('TOY.word', [0, 1]) == ['The', 'cat']
+    assert [x.healthy for x in client.api.replicas] == [False, True]
+    assert servers[1].count('CL_ID2STR') == 3
+
+
+def test_idempotent_commands_are_retried(servers):
+    client = connect(servers)
+    replica = client.api.replicas[0]
+    # Make the broken replica the preferred one
+    replica.latency = 0.0
+    client.api.replicas[1].latency = 1.0
+    servers[0].stop()
+    assert client.api.pipeline(
+        [
+            ('cl_lexicon_size', ('TOY.word',)),
+            ('cl_cpos2id', ('TOY.word', [1]))
+        ]
+    ) == [13, [1]]
+    assert not replica.healthy
+
+
+def test_subcorpora_stay_on_their_replica(servers):
+    client = connect(servers)
+    corpus = client.corpora.get('TOY')
+    corpus.query('Cats', '"cat";')
+    server = owner(servers, 'CQP_QUERY')
+    other = servers[1 - servers.index(server)]
+    # Make the other replica the preferred one
+    for replica in client.api.replicas:
+        replica.latency = 0.0 if replica.port == other.port else 1.0
+    subcorpus = corpus.subcorpora.get('Cats')
+    assert subcorpus.size == 3
+    assert subcorpus.dump(FIELD_MATCH, 0, 2) == [1, 11, 15]
+    assert client.api.pipeline(
+        [('cqp_subcorpus_size', ('TOY:Cats',))]
+    ) == [3]
+    assert other.count('CQP_SUBCORPUS_SIZE') == 0
+    assert other.count('CQP_DUMP_SUBCORPUS') == 0
+    assert client.api.cqp_list_subcorpora('TOY') == ['Cats']
+
+
+def test_subcorpora_of_failed_replica_are_gone(servers):
+    client = connect(servers)
+    client.api.cqp_query('TOY', 'Cats', '"cat";')
+    owner(servers, 'CQP_QUERY').stop()
+    with pytest.raises(OSError):
+        client.api.cqp_subcorpus_size('TOY:Cats')
+    with pytest.raises(errors.CQPErrorNoSuchCorpus):
+        client.api.cqp_subcorpus_size('TOY:Cats')
+
+
+def test_policies_are_forwarded(servers):
+    regex_cache = RegexCache()
+    chunking_policy = ChunkingPolicy(
+        chunk_size=3,
+        min_chunk_size=3,
+        max_chunk_size=3
+    )
+    client = connect(
+        servers,
+        regex_cache=regex_cache,
+        chunking_policy=chunking_policy,
+        memory_pressure_policy=MemoryPressurePolicy(max_attempts=2)
+    )
+    assert client.api.regex_cache is regex_cache
+    assert client.api.chunking_policy is chunking_policy
+    assert client.api.cl_regex2id('TOY.word', 'c.*') == [1]
+    assert client.api.cl_regex2id('TOY.word', 'c.*') == [1]
+    assert regex_cache.num_hits == 1
+    assert list(
+        client.api.iter_chunks('cl_cpos2str', 'TOY.word', list(range(4)))
+    ) == [['The', 'cat', 'sat'], ['on']]
+    policies = [
+        x.api.memory_pressure_policy for x in client.api.replicas
+    ]
+    assert policies[0] is not policies[1]
+    assert all(x.max_attempts == 2 for x in policies)
+
+
+def test_last_general_error_needs_a_previous_command(servers):
+    client = connect(servers)
+    with pytest.raises(errors.CQiException):
+        client.api.ctrl_last_general_error()
+    with pytest.raises(errors.CQiException):
+        client.api.ctrl_user_abort()
+    client.api.cl_lexicon_size('TOY.word')
+    assert client.api.ctrl_last_general_error() == 'no error'
+
+
+def test_pending_commands_are_counted_across_threads(servers):
+    client = connect(servers)
+    with ThreadPoolExecutor(8) as executor:
+        sizes = list(
+            executor.map(
+                lambda _: client.api.cl_attribute_size('TOY.word'),
+                range(200)
+            )
+        )
+    assert sizes == [20] * 200
+    assert [x.num_pending for x in client.api.replicas] == [0, 0]
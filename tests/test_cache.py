@@ -0,0 +1,29 @@
+import cqi
+from cqi.cache import QueryCache
+
+
+def test_queries_are_executed_once(corpus, server):
+    first = corpus.cached_query('"cat";')
+    second = corpus.cached_query('"cat" ;')
+    assert first is second
+    assert first.size == 3
+    assert server.count('CQP_QUERY') == 1
+
+
+def test_custom_query_cache(server):
+    query_cache = QueryCache(max_size=1)
+    client = cqi.CQiClient(
+        server.host,
+        server.port,
+        timeout=5.0,
+        query_cache=query_cache
+    )
+    client.connect('anonymous', '')
+    corpus = client.corpora.get('TOY')
+    assert client.query_cache is query_cache
+    corpus.cached_query('"cat";')
+    corpus.cached_query('"dog";')
+    assert len(query_cache.subcorpora) == 1
+    assert corpus.subcorpora.list() == [
+        next(iter(query_cache.subcorpora.values()))
+    ]
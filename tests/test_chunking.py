@@ -0,0 +1,81 @@
+import pytest
+import cqi
+from cqi.api import ChunkingPolicy
+
+
+@pytest.fixture
+def chunked_api(server):
+    api = cqi.APIClient(
+        server.host,
+        server.port,
+        timeout=5.0,
+        chunking_policy=ChunkingPolicy(
+            chunk_size=3,
+            min_chunk_size=3,
+            max_chunk_size=3
+        )
+    )
+    api.ctrl_connect('anonymous', '')
+    return api
+
+
+def test_list_argument_is_split_and_reassembled(server, api, chunked_api):
+    expected = api.cl_cpos2str('TOY.word', list(range(20)))
+    assert chunked_api.cl_cpos2str('TOY.word', list(range(20))) == expected
+    # One unchunked command and seven chunks of three corpus positions
+    assert server.count('CL_CPOS2STR') == 1 + 7
+    assert chunked_api.chunking_policy.num_chunks == 7
+
+
+def test_idlist2cpos_chunks_are_merged_in_order(chunked_api):
+    assert chunked_api.cl_idlist2cpos('TOY.word', list(range(13))) == (
+        list(range(20))
+    )
+
+
+def test_pipeline_splits_large_commands(server, chunked_api):
+    ids, lexicon_size = chunked_api.pipeline(
+        [
+            ('cl_cpos2id', ('TOY.word', list(range(20)))),
+            ('cl_lexicon_size', ('TOY.word',))
+        ]
+    )
+    assert ids == [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 1, 11, 6, 0, 1, 12, 4,
+                   8, 6]
+    assert lexicon_size == 13
+    assert server.count('CL_CPOS2ID') == 7
+
+
+def test_iter_chunks(chunked_api):
+    chunks = list(
+        chunked_api.iter_chunks('cl_cpos2str', 'TOY.word', list(range(7)))
+    )
+    assert chunks == [['The', 'cat', 'sat'], ['on', 'the', 'mat'], ['.']]
+
+
+def test_stopped_iteration_keeps_the_session_usable(chunked_api):
+    chunks = chunked_api.iter_chunks(
+        'cl_cpos2str',
+        'TOY.word',
+        list(range(20))
+    )
+    assert next(chunks) == ['The', 'cat', 'sat']
+    chunks.close()
+    assert chunked_api.cl_lexicon_size('TOY.word') == 13
+
+
+def test_policy_adapts_to_throughput():
+    policy = ChunkingPolicy(
+        chunk_size=100,
+        min_chunk_size=10,
+        max_chunk_size=1000,
+        target_duration=0.1,
+        smoothing=1.0
+    )
+    policy.update(1000, 1.0)
+    assert policy.chunk_size == 100
+    policy.update(100000, 1.0)
+    assert policy.chunk_size == 1000
+    policy.update(1, 1.0)
+    assert policy.chunk_size == 10
+    assert policy.num_chunks == 3
@@ -0,0 +1,99 @@
+import threading
+import time
+import pytest
+import cqi
+from cqi.api import ChunkingPolicy, CoalescingAPIClient, MemoryPressurePolicy
+
+
+@pytest.fixture
+def coalescing_api(server):
+    api = CoalescingAPIClient(
+        cqi.APIClient(
+            server.host,
+            server.port,
+            timeout=5.0,
+            chunking_policy=ChunkingPolicy(
+                chunk_size=3,
+                min_chunk_size=3,
+                max_chunk_size=3
+            )
+        )
+    )
+    api.ctrl_connect('anonymous', '')
+    return api
+
+
+def test_duplicate_values_are_sent_once(server, coalescing_api):
+    assert coalescing_api.cl_cpos2str('TOY.word', [1, 0, 1, 1, 0]) == (
+        ['cat', 'The', 'cat', 'cat', 'The']
+    )
+    assert coalescing_api.num_deduplicated == 3
+    assert coalescing_api.pipeline(
+        [
+            ('cl_cpos2id', ('TOY.word', [15, 1, 15])),
+            ('cl_attribute_size', ('TOY.word',))
+        ]
+    ) == [[1, 1, 1], 20]
+    assert coalescing_api.num_deduplicated == 4
+    assert server.count('CL_CPOS2STR') == 1
+
+
+def test_identical_requests_in_flight_are_merged(server, coalescing_api):
+    server.delay('CL_CPOS2STR', 0.5)
+    results = []
+
+    def request():
+        results.append(coalescing_api.cl_cpos2str('TOY.word', [0, 1]))
+
+    threads = [threading.Thread(target=request) for _ in range(2)]
+    threads[0].start()
+    # Wait until the first request is being answered
+    while server.count('CL_CPOS2STR') == 0:
+        time.sleep(0.01)
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+    assert results == [['The', 'cat']] * 2
+    assert server.count('CL_CPOS2STR') == 1
+    assert coalescing_api.num_coalesced == 1
+
+
+def test_iter_chunks_reserves_the_session(coalescing_api):
+    chunks = coalescing_api.iter_chunks(
+        'cl_cpos2str',
+        'TOY.word',
+        list(range(20))
+    )
+    assert next(chunks) == ['The', 'cat', 'sat']
+    sizes = []
+    thread = threading.Thread(
+        target=lambda: sizes.append(
+            coalescing_api.cl_attribute_size('TOY.word')
+        )
+    )
+    thread.start()
+    thread.join(0.2)
+    # The command waits for the iteration to end
+    assert thread.is_alive()
+    chunks.close()
+    thread.join()
+    assert sizes == [20]
+
+
+def test_client_with_coalescing(server):
+    policy = MemoryPressurePolicy()
+    client = cqi.CQiClient(
+        server.host,
+        server.port,
+        timeout=5.0,
+        coalesce=True,
+        memory_pressure_policy=policy
+    )
+    assert isinstance(client.api, CoalescingAPIClient)
+    # Plain attributes are those of the wrapped client
+    assert client.api.memory_pressure_policy is policy
+    assert len(policy.listeners) == 1
+    assert client.api.timeout == 5.0
+    client.connect('anonymous', '')
+    word = client.corpora.get('TOY').positional_attributes.get('word')
+    assert word.values_by_cpos([0, 1, 0]) == ['The', 'cat', 'The']
@@ -0,0 +1,51 @@
+import copy
+import pickle
+import pytest
+from cqi import handles
+from cqi.handles import Handle
+from cqi.matchsets import MatchSet
+
+
+@pytest.fixture
+def configured(server):
+    handles.configure('anonymous', '', server.host, server.port, timeout=5.0)
+    yield
+    handles.configure('anonymous', '')
+
+
+def test_models_are_pickled_as_handles(corpus, configured):
+    word = corpus.positional_attributes.get('word')
+    assert word.lexicon_size == 13
+    handle = pickle.loads(pickle.dumps(word))
+    assert isinstance(handle, Handle)
+    assert handle.attrs['lexicon_size'] == 13
+    assert handle.values_by_ids([0, 1]) == ['The', 'cat']
+    assert handle.resolve().client is handles.get_client()
+
+
+def test_models_are_not_copied(corpus):
+    word = corpus.positional_attributes.get('word')
+    assert copy.copy(word) is word
+    assert copy.deepcopy(word) is word
+    assert copy.deepcopy([word])[0] is word
+
+
+def test_forked_child_gets_a_new_lock():
+    lock = handles._lock
+    with lock:
+        handles._forget_client()
+        assert handles._lock is not lock
+        assert not handles._lock.locked()
+    assert handles._client is None
+
+
+def test_subcorpora_are_not_pickled(corpus, configured):
+    corpus.query('Cats', '"cat";')
+    subcorpus = corpus.subcorpora.get('Cats')
+    with pytest.raises(TypeError, match='MatchSet'):
+        subcorpus.handle()
+    with pytest.raises(TypeError):
+        pickle.dumps(subcorpus)
+    # The matches can be passed instead
+    match_set = pickle.loads(pickle.dumps(MatchSet.from_subcorpus(subcorpus)))
+    assert list(match_set) == [(1, 1), (11, 11), (15, 15)]
@@ -0,0 +1,128 @@
+import random
+import pytest
+import cqi
+from cqi.lexicon import FrequencyVector, LexiconIndex, StringArray
+from fakeserver import FakeCorpus, FakeCQiServer
+
+
+def test_string_array():
+    strings = StringArray.from_strings(['über', '', 'cat'])
+    assert len(strings) == 3
+    assert list(strings) == ['über', '', 'cat']
+    assert strings[-1] == 'cat'
+    with pytest.raises(IndexError):
+        strings[3]
+
+
+def test_frequency_vector():
+    freqs = FrequencyVector([3, 0, 1, 3])
+    assert len(freqs) == 4
+    assert freqs[2] == 1
+    assert freqs.num_tokens == 7
+    assert freqs.num_types == 3
+    assert freqs.freqs_by_ids([0, 4, -1]) == [3, 0, 0]
+    assert freqs.top_k(2) == [(0, 3), (3, 3)]
+    assert freqs.band(1, 1) == [2]
+    assert freqs.band(1) == [0, 2, 3]
+    assert [freqs.rank(x) for x in range(4)] == [1, 4, 3, 1]
+    assert freqs.ranked_freqs() == [3, 3, 1, 0]
+
+
+def test_frequency_vector_from_arrays():
+    freqs = FrequencyVector([3, 0, 1, 3])
+    copy = FrequencyVector.from_arrays(
+        {'freqs': memoryview(freqs.freqs)}
+    )
+    assert copy.num_types == 3
+    assert copy.ranked_freqs() == [3, 3, 1, 0]
+
+
+def test_frequency_vector_of_attribute(corpus):
+    freqs = corpus.positional_attributes.get('word').frequency_vector()
+    assert len(freqs) == 13
+    assert freqs.num_tokens == 20
+    assert freqs.top_k(2) == [(1, 3), (6, 3)]
+
+
+def test_lexicon_index(corpus):
+    index = LexiconIndex(corpus.positional_attributes.get('word'))
+    assert len(index) == 13
+    assert index.values[1] == 'cat'
+    assert index.complete('c') == [('cat', 3)]
+    assert sorted(index.complete('', k=2)) == [('.', 3), ('cat', 3)]
+    assert index.complete('x') == []
+    assert sorted(index.complete_suffix('at')) == (
+        [('cat', 3), ('mat', 1), ('sat', 1)]
+    )
+    assert sorted(index.ids_by_prefix('T')) == [0]
+    assert sorted(index.ids_by_suffix('he')) == [0, 4]
+    ids = sorted(range(13), key=index.ranks().__getitem__)
+    assert [index.values[x] for x in ids] == sorted(index.values)
+
+
+def test_lexicon_index_from_arrays(corpus):
+    attribute = corpus.positional_attributes.get('word')
+    index = LexiconIndex(attribute)
+    copy = LexiconIndex.from_arrays(
+        attribute,
+        {k: memoryview(v) for k, v in index.to_arrays().items()}
+    )
+    assert copy.complete('', k=13) == index.complete('', k=13)
+    assert copy.complete_suffix('e', k=13) == index.complete_suffix('e', k=13)
+    assert copy.ranks() == index.ranks()
+
+
+@pytest.fixture
+def big_corpus():
+    rng = random.Random(1)
+    words = [
+        ''.join(rng.choice('ab\U0010ffff') for _ in range(rng.randint(1, 4)))
+        for _ in range(3000)
+    ]
+    server = FakeCQiServer(corpora={'BIG': FakeCorpus(words)})
+    client = cqi.CQiClient(server.host, server.port, timeout=5.0)
+    client.connect('anonymous', '')
+    yield client.corpora.get('BIG')
+    server.stop()
+
+
+def test_completions_are_the_most_frequent_values(big_corpus):
+    index = LexiconIndex(big_corpus.positional_attributes.get('word'))
+    values = [index.values[i] for i in range(len(index))]
+    for affix in ['', 'a', 'b', 'ab', '\U0010ffff', 'a\U0010ffff', 'bbbb']:
+        for k in [1, 5, 100]:
+            for complete, matches in (
+                (index.complete, lambda x: x.startswith(affix)),
+                (index.complete_suffix, lambda x: x.endswith(affix))
+            ):
+                expected = sorted(
+                    (
+                        (x, f) for x, f in zip(values, index.freqs)
+                        if matches(x)
+                    ),
+                    key=lambda x: -x[1]
+                )
+                result = complete(affix, k=k)
+                assert len(result) == min(k, len(expected))
+                assert [f for _, f in result] == (
+                    [f for _, f in expected[:k]]
+                )
+                assert all(matches(x) for x, _ in result)
+
+
+def test_lexicon_index_reuses_the_frequency_vector(corpus, server):
+    word = corpus.positional_attributes.get('word')
+    freqs = word.frequency_vector()
+    index = word.lexicon_index()
+    assert index.freqs is freqs.freqs
+    assert word.lexicon_index() is index
+    assert server.count('CL_ID2FREQ') == 1
+
+
+def test_tables_are_kept_until_reload(corpus, server):
+    word = corpus.positional_attributes.get('word')
+    freqs = word.frequency_vector()
+    assert word.frequency_vector() is freqs
+    word.reload()
+    assert word.frequency_vector() is not freqs
+    assert server.count('CL_ID2FREQ') == 2
@@ -0,0 +1,86 @@
+import pytest
+from cqi import errors
+from cqi.constants import FIELD_MATCH, FIELD_MATCHEND
+from cqi.matchsets import MatchSet
+
+
+def pairs(match_set):
+    return list(match_set)
+
+
+def test_matches_are_sorted_and_unique():
+    match_set = MatchSet([9, 1, 5, 1], [9, 2, 6, 2])
+    assert pairs(match_set) == [(1, 2), (5, 6), (9, 9)]
+    assert (5, 6) in match_set
+    assert (5, 5) not in match_set
+    assert len(match_set) == match_set.size == 3
+
+
+def test_set_operations():
+    a = MatchSet([1, 5, 9], [2, 6, 9])
+    b = MatchSet([5, 9, 12], [6, 10, 12])
+    assert pairs(a & b) == [(5, 6)]
+    assert pairs(a | b) == [(1, 2), (5, 6), (9, 9), (9, 10), (12, 12)]
+    assert pairs(a - b) == [(1, 2), (9, 9)]
+    assert a & b == MatchSet([5], [6])
+
+
+def test_interval_filters():
+    a = MatchSet([1, 4, 8], [2, 6, 9])
+    b = MatchSet([0, 5], [3, 5])
+    assert pairs(a.within(b)) == [(1, 2)]
+    assert pairs(a.containing(b)) == [(4, 6)]
+    assert pairs(a.overlapping(b)) == [(1, 2), (4, 6)]
+
+
+def test_dump():
+    match_set = MatchSet([1, 5, 9], [2, 6, 9])
+    assert match_set.dump(FIELD_MATCHEND, 1, 2) == [6, 9]
+    with pytest.raises(errors.CQPErrorOutOfRange):
+        match_set.dump(FIELD_MATCH, 2, 3)
+    with pytest.raises(errors.CQPErrorInvalidField):
+        match_set.dump(0, 0, 0)
+
+
+def test_from_subcorpus(corpus):
+    corpus.query('Cats', '"cat";')
+    subcorpus = corpus.subcorpora.get('Cats')
+    match_set = MatchSet.from_subcorpus(subcorpus, page_size=2)
+    assert pairs(match_set) == [(1, 1), (11, 11), (15, 15)]
+
+
+def test_analyses(corpus):
+    word = corpus.positional_attributes.get('word')
+    corpus.query('Cats', '"cat" [];')
+    match_set = MatchSet.from_subcorpus(corpus.subcorpora.get('Cats'))
+    assert match_set.fdist_1(0, FIELD_MATCHEND, word) == [2, 1, 11, 1, 12, 1]
+    assert match_set.fdist_span(word) == [
+        (('cat', 'sat'), 1),
+        (('cat', 'met'), 1),
+        (('cat', 'saw'), 1)
+    ]
+    assert match_set.facet_counts(
+        corpus.structural_attributes.get('text_year')
+    ) == {'1890': 2, '1920': 1}
+
+
+def test_keyness_against_subcorpora_and_match_sets(corpus):
+    word = corpus.positional_attributes.get('word')
+    corpus.query('Cats', '"cat" [];')
+    corpus.query('Dogs', '"dog" [];')
+    cats = MatchSet.from_subcorpus(corpus.subcorpora.get('Cats'))
+    dogs = corpus.subcorpora.get('Dogs')
+    by_subcorpus = cats.keyness(word, dogs, measure='log_ratio')
+    by_match_set = cats.keyness(
+        word,
+        MatchSet.from_subcorpus(dogs),
+        measure='log_ratio'
+    )
+    assert by_subcorpus == by_match_set
+    assert sorted((x[0], x[1], x[2]) for x in by_subcorpus) == [
+        ('cat', 3, 0),
+        ('dog', 0, 2)
+    ]
+    assert dogs.keyness(word, cats, measure='log_ratio')[0][:3] == (
+        'dog', 2, 0
+    )
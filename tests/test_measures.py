@@ -0,0 +1,43 @@
+import math
+import pytest
+from cqi import measures
+
+
+def test_association_measures_at_expected_frequency():
+    # The expected co-occurrence frequency is 100 * 20 / 1000 = 2
+    assert measures.log_likelihood(2, 100, 20, 1000) == pytest.approx(0.0)
+    assert measures.mi(2, 100, 20, 1000) == pytest.approx(0.0)
+    assert measures.t_score(2, 100, 20, 1000) == pytest.approx(0.0)
+
+
+def test_association_measures_above_expected_frequency():
+    assert measures.log_likelihood(4, 100, 20, 1000) > 0
+    assert measures.mi(4, 100, 20, 1000) == pytest.approx(1.0)
+    assert measures.t_score(4, 100, 20, 1000) == pytest.approx(1.0)
+    assert measures.log_dice(4, 100, 20, 1000) == pytest.approx(
+        14 + math.log2(8 / 120)
+    )
+
+
+def test_keyness_measures():
+    assert measures.signed_log_likelihood(20, 100, 10, 100) > 0
+    assert measures.signed_log_likelihood(10, 100, 20, 100) < 0
+    assert measures.percent_diff(2, 100, 1, 100) == pytest.approx(100.0)
+    assert measures.percent_diff(2, 100, 0, 100) == math.inf
+    assert measures.log_ratio(4, 100, 1, 100) == pytest.approx(2.0)
+    assert measures.log_ratio(1, 100, 0, 100) == pytest.approx(1.0)
+
+
+def test_keyness_measures_of_empty_target_or_reference():
+    for measure in measures.keyness_measures.values():
+        assert measure(0, 0, 5, 100) == 0.0
+        assert measure(5, 100, 0, 0) == 0.0
+
+
+def test_dispersion_measures():
+    assert measures.juilland_d([5, 5], [50, 50]) == pytest.approx(1.0)
+    assert measures.juilland_d([10, 0], [50, 50]) == pytest.approx(0.0)
+    assert measures.juilland_d([3], [10]) == 1.0
+    assert measures.dp([5, 5], [50, 50]) == pytest.approx(0.0)
+    assert measures.dp([10, 0], [50, 50]) == pytest.approx(0.5)
+    assert measures.dp([0, 0], [50, 50]) == 1.0
@@ -0,0 +1,69 @@
+import pytest
+import cqi
+from cqi import errors
+from cqi.api import MemoryPressurePolicy, specification
+
+
+def connect(server, policy):
+    api = cqi.APIClient(
+        server.host,
+        server.port,
+        timeout=5.0,
+        memory_pressure_policy=policy
+    )
+    api.ctrl_connect('anonymous', '')
+    return api
+
+
+def test_out_of_memory_drops_least_recently_used_subcorpus(server):
+    policy = MemoryPressurePolicy()
+    api = connect(server, policy)
+    api.cqp_query('TOY', 'A', '"cat";')
+    api.cqp_query('TOY', 'B', '"dog";')
+    server.fail('CL_ID2FREQ', specification.CL_ERROR_OUT_OF_MEMORY)
+    assert api.cl_id2freq('TOY.word', [1]) == [3]
+    assert api.cqp_list_subcorpora('TOY') == ['B']
+    assert policy.num_errors == 1
+    assert policy.num_retries == 1
+    assert policy.num_recoveries == 1
+    assert policy.num_dropped_subcorpora == 1
+
+
+def test_out_of_memory_is_raised_without_policy(api, server):
+    server.fail('CL_ID2FREQ', specification.CL_ERROR_OUT_OF_MEMORY)
+    with pytest.raises(errors.CLErrorOutOfMemory):
+        api.cl_id2freq('TOY.word', [1])
+    assert api.cl_id2freq('TOY.word', [1]) == [3]
+
+
+def test_retries_are_limited(server):
+    policy = MemoryPressurePolicy(max_attempts=1)
+    api = connect(server, policy)
+    for name in ('A', 'B', 'C'):
+        api.cqp_query('TOY', name, '"cat";')
+    server.fail('CL_ID2FREQ', specification.CL_ERROR_OUT_OF_MEMORY, times=2)
+    with pytest.raises(errors.CLErrorOutOfMemory):
+        api.cl_id2freq('TOY.word', [1])
+    assert policy.num_retries == 1
+    assert policy.num_recoveries == 0
+
+
+def test_dropped_subcorpora_are_forgotten(server):
+    client = cqi.CQiClient(
+        server.host,
+        server.port,
+        timeout=5.0,
+        memory_pressure_policy=MemoryPressurePolicy()
+    )
+    client.connect('anonymous', '')
+    corpus = client.corpora.get('TOY')
+    corpus.query('A', '"cat";')
+    a = corpus.subcorpora.get('A')
+    assert a.size == 3
+    corpus.query('B', '"dog";')
+    server.fail('CL_ID2FREQ', specification.CL_ERROR_OUT_OF_MEMORY)
+    client.api.cl_id2freq('TOY.word', [1])
+    assert corpus.subcorpora.get('A') is not a
+    with pytest.raises(errors.CQPErrorNoSuchCorpus):
+        corpus.subcorpora.get('A').size
+    assert corpus.subcorpora.get('B').size == 2
@@ -0,0 +1,32 @@
+import pytest
+from cqi import errors
+from cqi.models.resource import Attrs
+
+
+def test_failed_load_is_retried():
+    calls = []
+
+    def load():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError()
+        return {'size': 20}
+
+    attrs = Attrs({'name': 'TOY'}, load)
+    with pytest.raises(ConnectionError):
+        attrs['size']
+    assert attrs['size'] == 20
+    assert len(calls) == 2
+    with pytest.raises(KeyError):
+        attrs['nope']
+
+
+def test_get_checks_that_the_corpus_exists(client, server):
+    with pytest.raises(errors.CQPErrorNoSuchCorpus):
+        client.corpora.get('NOPE')
+    corpus = client.corpora.get('TOY')
+    assert client.corpora.get('TOY') is corpus
+    assert server.count('CORPUS_LIST_CORPORA') == 2
+    # The attributes are loaded on first access
+    assert server.count('CORPUS_CHARSET') == 0
+    assert corpus.size == 20
@@ -0,0 +1,69 @@
+from cqi.phrases import (
+    PhraseEngine,
+    PostingCache,
+    Regex,
+    decode_positions,
+    encode_positions
+)
+
+
+def test_positions_are_delta_encoded():
+    encoded = encode_positions([3, 10, 200])
+    assert encoded.typecode == 'B'
+    assert decode_positions(encoded) == [3, 10, 200]
+    encoded = encode_positions([3, 1000, 70000])
+    assert encoded.typecode == 'I'
+    assert decode_positions(encoded) == [3, 1000, 70000]
+    assert decode_positions(encode_positions([])) == []
+
+
+def test_posting_cache_evicts_least_recently_used():
+    cache = PostingCache(max_entries=4)
+    cache.put(('TOY.word', 'word', 'a'), [1, 2])
+    cache.put(('TOY.word', 'word', 'b'), [3, 4])
+    assert cache.get(('TOY.word', 'word', 'a')) == [1, 2]
+    cache.put(('TOY.word', 'word', 'c'), [5])
+    assert ('TOY.word', 'word', 'b') not in cache
+    assert cache.get(('TOY.word', 'word', 'a')) == [1, 2]
+    assert cache.num_entries == 3
+
+
+def test_postings(corpus):
+    engine = PhraseEngine(corpus.positional_attributes.get('word'))
+    assert engine.postings('cat') == [1, 11, 15]
+    assert engine.postings('nope') == []
+    assert engine.postings(Regex('[Tt]he')) == [0, 4, 14, 17]
+    assert engine.postings(['mat', 'dog']) == [5, 8, 18]
+
+
+def test_phrase(corpus):
+    engine = PhraseEngine(corpus.positional_attributes.get('word'))
+    assert engine.phrase([Regex('[Tt]he'), 'cat']) == [(0, 1), (14, 15)]
+    assert engine.phrase([['cat', 'dog'], Regex('s.*')]) == (
+        [(1, 2), (15, 16)]
+    )
+    assert engine.phrase(['cat', 'nope']) == []
+    assert engine.phrase([]) == []
+
+
+def test_near(corpus):
+    engine = PhraseEngine(corpus.positional_attributes.get('word'))
+    assert engine.near('cat', 'dog', 3) == [(8, 11), (15, 18)]
+    assert engine.near('cat', 'dog', 3, ordered=True) == [(15, 18)]
+
+
+def test_posting_lists_are_cached(corpus, server):
+    engine = PhraseEngine(corpus.positional_attributes.get('word'))
+    engine.phrase(['the', 'cat'])
+    num_commands = len(server.commands)
+    engine.phrase(['cat', 'the'])
+    assert len(server.commands) == num_commands
+
+
+def test_engines_of_different_attributes_share_a_cache(corpus):
+    cache = PostingCache()
+    word = PhraseEngine(corpus.positional_attributes.get('word'), cache)
+    lemma = PhraseEngine(corpus.positional_attributes.get('lemma'), cache)
+    assert word.postings('the') == [4, 17]
+    assert lemma.postings('the') == [0, 4, 14, 17]
+    assert word.postings('the') == [4, 17]
@@ -0,0 +1,44 @@
+import pytest
+import cqi
+from cqi import errors
+
+
+def test_responses_are_returned_in_order(api):
+    assert api.pipeline(
+        [
+            ('cl_attribute_size', ('TOY.word',)),
+            ('cl_lexicon_size', ('TOY.word',)),
+            ('cl_cpos2str', ('TOY.word', [0, 1])),
+            ('cl_struc2cpos', ('TOY.s', 1))
+        ]
+    ) == [20, 13, ['The', 'cat'], (7, 13)]
+
+
+def test_empty_pipeline(api):
+    assert api.pipeline([]) == []
+
+
+def test_commands_are_sent_in_several_frames(server):
+    api = cqi.APIClient(
+        server.host,
+        server.port,
+        timeout=5.0,
+        pipeline_bufsize=16
+    )
+    api.ctrl_connect('anonymous', '')
+    responses = api.pipeline(
+        [('cl_struc2cpos', ('TOY.s', i)) for i in range(3)] * 10
+    )
+    assert responses == [(0, 6), (7, 13), (14, 19)] * 10
+
+
+def test_error_is_raised_after_all_responses(api):
+    with pytest.raises(errors.CLErrorNoSuchAttribute):
+        api.pipeline(
+            [
+                ('cl_lexicon_size', ('TOY.nope',)),
+                ('cl_lexicon_size', ('TOY.word',))
+            ]
+        )
+    # No response is left over for the next command
+    assert api.cl_lexicon_size('TOY.lemma') == 11
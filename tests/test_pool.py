@@ -0,0 +1,57 @@
+import time
+import pytest
+from cqi.pool import BatchExecutor, SessionPool, fdist_1
+from cqi.constants import FIELD_MATCH
+
+
+@pytest.fixture
+def pool(server):
+    pool = SessionPool(
+        server.host,
+        'anonymous',
+        '',
+        size=1,
+        port=server.port,
+        timeout=5.0
+    )
+    yield pool
+    pool.close()
+
+
+def test_search_all_corpora(client, pool, server):
+    results = {
+        x.job[0]: (x.size, x.result, x.error)
+        for x in client.corpora.search('"cat";', pool, page_size=2)
+    }
+    assert results == {
+        'TOY': (3, [(1, 1), (11, 11)], None),
+        'OTHER': (1, [(4, 4)], None)
+    }
+    # The size is fetched once per corpus
+    assert server.count('CQP_SUBCORPUS_SIZE') == 2
+    assert server.count('CQP_DROP_SUBCORPUS') == 2
+
+
+def test_post_processing(pool):
+    fdist = fdist_1(0, FIELD_MATCH, 'word')
+    (result,) = BatchExecutor(pool).execute([('TOY', '"[Tt]he";', fdist)])
+    assert result.size == 4
+    assert result.result == [0, 2, 4, 2]
+
+
+def test_timeout_is_enforced_per_job(pool, server):
+    server.delay('CQP_QUERY', 1.0)
+    started = time.monotonic()
+    # With a single session, the second job waits for the first one
+    results = list(
+        BatchExecutor(pool).execute(
+            [('TOY', '"cat";'), ('TOY', '"dog";')],
+            timeout=0.5
+        )
+    )
+    assert time.monotonic() - started < 1.0
+    assert [type(x.error) for x in results] == [TimeoutError, type(None)]
+    assert results[1].size == 2
+    # The aborted session has been replaced
+    with pool.session(timeout=1.0) as api:
+        assert api.corpus_list_corpora() == ['TOY', 'OTHER']
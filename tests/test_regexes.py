@@ -0,0 +1,70 @@
+import pytest
+import cqi
+from cqi.api import RegexCache
+
+
+@pytest.fixture
+def regex_cache():
+    return RegexCache()
+
+
+@pytest.fixture
+def cached_api(server, regex_cache):
+    api = cqi.APIClient(
+        server.host,
+        server.port,
+        timeout=5.0,
+        regex_cache=regex_cache
+    )
+    api.ctrl_connect('anonymous', '')
+    return api
+
+
+def test_results_are_cached(server, cached_api, regex_cache):
+    assert cached_api.cl_regex2id('TOY.word', '.at') == [1, 2, 5]
+    assert cached_api.cl_regex2id('TOY.word', '.at') == [1, 2, 5]
+    assert cached_api.cl_regex2id('TOY.lemma', '.at') == [1, 2, 4]
+    assert server.count('CL_REGEX2ID') == 2
+    assert regex_cache.num_hits == 1
+    assert regex_cache.num_misses == 2
+    assert regex_cache.num_entries == 6
+
+
+def test_least_recently_used_results_are_evicted():
+    regex_cache = RegexCache(max_entries=3)
+    regex_cache.put('TOY.word', 'a', [1, 2])
+    regex_cache.put('TOY.word', 'b', [3])
+    assert regex_cache.get('TOY.word', 'a') == [1, 2]
+    regex_cache.put('TOY.word', 'c', [4])
+    assert regex_cache.get('TOY.word', 'b') is None
+    assert regex_cache.get('TOY.word', 'a') == [1, 2]
+    assert regex_cache.get('TOY.word', 'c') == [4]
+    assert regex_cache.num_entries == 3
+
+
+def test_dropping_the_corpus_invalidates(server, cached_api, regex_cache):
+    cached_api.cl_regex2id('TOY.word', '.at')
+    cached_api.cl_regex2id('OTHER.word', 'a')
+    cached_api.corpus_drop_corpus('TOY')
+    assert list(regex_cache.results) == [('OTHER.word', 'a')]
+    cached_api.cl_regex2id('TOY.word', '.at')
+    assert server.count('CL_REGEX2ID') == 3
+
+
+def test_changed_lexicon_size_invalidates(server):
+    regex_cache = RegexCache(max_age=0.0)
+    api = cqi.APIClient(
+        server.host,
+        server.port,
+        timeout=5.0,
+        regex_cache=regex_cache
+    )
+    api.ctrl_connect('anonymous', '')
+    assert api.cl_regex2id('TOY.word', 'b.*') == []
+    assert api.cl_regex2id('TOY.word', 'b.*') == []
+    assert server.count('CL_REGEX2ID') == 1
+    # A new type is added to the lexicon, e.g. by re-encoding the corpus
+    lexicon, _ = server.corpora['TOY'].positional_attributes['word']
+    lexicon.append('bird')
+    assert api.cl_regex2id('TOY.word', 'b.*') == [13]
+    assert server.count('CL_REGEX2ID') == 2
@@ -0,0 +1,86 @@
+from array import array
+import os
+import pytest
+import cqi
+from cqi.sharedtables import SharedTableCache
+
+
+@pytest.fixture
+def table_cache(tmp_path):
+    return SharedTableCache(str(tmp_path))
+
+
+def test_arrays_are_stored_and_mapped(table_cache):
+    table_cache.store(
+        'key',
+        {
+            'ints': array('q', [1, -2, 3]),
+            'blob': 'über'.encode(),
+            'empty': array('l')
+        }
+    )
+    arrays = table_cache.load('key')
+    assert arrays['ints'].tolist() == [1, -2, 3]
+    assert bytes(arrays['blob']).decode() == 'über'
+    assert len(arrays['empty']) == 0
+    assert arrays['ints'].readonly
+
+
+def test_tables_are_built_once(table_cache, tmp_path):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {'values': array('q', [4, 5])}
+
+    assert table_cache.get_or_build('key', build)['values'].tolist() == [4, 5]
+    assert SharedTableCache(str(tmp_path)).get_or_build(
+        'key',
+        build
+    )['values'].tolist() == [4, 5]
+    assert len(builds) == 1
+    assert table_cache.load('missing') is None
+
+
+def test_forget_and_clear(table_cache):
+    table_cache.store('a', {'values': array('q', [1])})
+    table_cache.store('b', {'values': array('q', [2])})
+    table_cache.forget('a')
+    assert table_cache.load('a') is None
+    table_cache.clear()
+    assert table_cache.load('b') is None
+    assert os.listdir(table_cache.directory) == []
+
+
+def test_attribute_tables_are_shared(server, tmp_path):
+    clients = []
+    for _ in range(2):
+        client = cqi.CQiClient(
+            server.host,
+            server.port,
+            timeout=5.0,
+            table_cache=SharedTableCache(str(tmp_path))
+        )
+        client.connect('anonymous', '')
+        clients.append(client)
+    results = []
+    for client in clients:
+        corpus = client.corpora.get('TOY')
+        word = corpus.positional_attributes.get('word')
+        s = corpus.structural_attributes.get('s')
+        results.append(
+            (
+                word.frequency_vector().top_k(2),
+                word.lexicon_index().complete('c'),
+                s.region_table().sizes()
+            )
+        )
+    assert results[0] == results[1] == (
+        [(1, 3), (6, 3)],
+        [('cat', 3)],
+        [7, 7, 6]
+    )
+    assert clients[0].table_cache.num_misses == 3
+    assert clients[1].table_cache.num_misses == 0
+    assert server.count('CL_ID2STR') == 1
+    assert 'TOY.word.freqs.20.13.v1.tbl' in os.listdir(str(tmp_path))
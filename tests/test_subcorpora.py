@@ -0,0 +1,249 @@
+import math
+import pytest
+import cqi
+from cqi import measures
+from cqi.constants import FIELD_MATCH, FIELD_MATCHEND
+from fakeserver import FakeCorpus, FakeCQiServer
+
+
+@pytest.fixture
+def parallel_client():
+    ''' TOY_EN, whose first two sentences are aligned with TOY_DE '''
+    server = FakeCQiServer(
+        {
+            'TOY_EN': FakeCorpus(
+                'The cat sat . A dog and a cat met . The cat ran .'.split(),
+                {'s': ([(0, 3), (4, 10), (11, 14)], None)},
+                {'toy_de': [(0, 3, 0, 3), (4, 10, 4, 11)]}
+            ),
+            'TOY_DE': FakeCorpus(
+                'Die Katze sass . Ein Hund und eine Katze trafen sich .'
+                .split()
+            )
+        }
+    )
+    client = cqi.CQiClient(server.host, server.port, timeout=5.0)
+    client.connect('anonymous', '')
+    yield server, client
+    server.stop()
+
+
+def test_collocates_count_overlapping_windows_once(corpus):
+    word = corpus.positional_attributes.get('word')
+    corpus.query('Cats', '"cat";')
+    subcorpus = corpus.subcorpora.get('Cats')
+    collocates = {
+        value: (freq, corpus_freq, score)
+        for value, freq, corpus_freq, score in subcorpus.collocates(
+            word,
+            left=4,
+            right=4
+        )
+    }
+    assert all(freq <= c1 for freq, c1, _ in collocates.values())
+    # The windows cover 18 of the 20 tokens, 12 .. 14 are in two of them
+    assert collocates['met'][:2] == (1, 1)
+    assert collocates['.'][:2] == (2, 3)
+    assert collocates['met'][2] == (
+        measures.association_measures['log_likelihood'](1, 18, 1, 20)
+    )
+
+
+def test_collocates_within_structures(corpus):
+    word = corpus.positional_attributes.get('word')
+    s = corpus.structural_attributes.get('s')
+    corpus.query('Cats', '"cat";')
+    subcorpus = corpus.subcorpora.get('Cats')
+    collocates = subcorpus.collocates(
+        word,
+        left=4,
+        right=4,
+        structural_attribute=s
+    )
+    assert sorted((x[0], x[1]) for x in collocates) == [
+        ('.', 2),
+        ('A', 1),
+        ('The', 2),
+        ('a', 1),
+        ('and', 1),
+        ('dog', 2),
+        ('mat', 1),
+        ('met', 1),
+        ('on', 1),
+        ('sat', 1),
+        ('saw', 1),
+        ('the', 2)
+    ]
+
+
+def test_keyness_against_the_rest_of_the_corpus(corpus):
+    word = corpus.positional_attributes.get('word')
+    corpus.query('Cats', '"cat" [];')
+    subcorpus = corpus.subcorpora.get('Cats')
+    # The target's tokens are subtracted from the corpus frequencies
+    assert subcorpus.keyness(word, corpus, measure='log_ratio') == [
+        ('cat', 3, 0, pytest.approx(math.log2(3 / 3 / (0.5 / 17))))
+    ]
+
+
+def test_keyness_of_empty_subcorpora(corpus):
+    word = corpus.positional_attributes.get('word')
+    corpus.query('Cats', '"cat";')
+    corpus.query('None', '"nope";')
+    cats = corpus.subcorpora.get('Cats')
+    empty = corpus.subcorpora.get('None')
+    assert empty.keyness(word, corpus) == []
+    assert empty.keyness(word, cats) == []
+    assert cats.keyness(word, empty) == []
+
+
+def test_fdist_span_agrees_with_fdist_1(corpus):
+    word = corpus.positional_attributes.get('word')
+    corpus.query('Cats', '[] "cat";')
+    subcorpus = corpus.subcorpora.get('Cats')
+    spans = subcorpus.fdist_span(word)
+    assert spans == [(('The', 'cat'), 2), (('a', 'cat'), 1)]
+    # The values at each offset of the spans are counted like by the server
+    for offset, field in enumerate((FIELD_MATCH, FIELD_MATCHEND)):
+        fdist = subcorpus.fdist_1(0, field, word)
+        expected = dict(
+            zip(word.values_by_ids(fdist[0::2]), fdist[1::2])
+        )
+        counts = {}
+        for values, freq in spans:
+            counts[values[offset]] = counts.get(values[offset], 0) + freq
+        assert counts == expected
+
+
+def test_keyness_requires_the_same_corpus(client, corpus):
+    other = client.corpora.get('OTHER')
+    word = corpus.positional_attributes.get('word')
+    corpus.query('Cats', '"cat";')
+    other.query('Cats', '"cat";')
+    cats = corpus.subcorpora.get('Cats')
+    other_cats = other.subcorpora.get('Cats')
+    with pytest.raises(ValueError):
+        cats.keyness(word, other_cats)
+    with pytest.raises(ValueError):
+        cats.keyness(word, other)
+    with pytest.raises(ValueError):
+        other_cats.keyness(word, other)
+
+
+def test_dispersion_across_texts(corpus):
+    text = corpus.structural_attributes.get('text')
+    corpus.query('Cats', '"cat";')
+    dispersion = corpus.subcorpora.get('Cats').dispersion(text)
+    # The matches 1 and 11 are in the first text (0 .. 13), 15 in the second
+    # (14 .. 19)
+    assert dispersion == {
+        'frequency': 3,
+        'range': 2,
+        'juilland_d': pytest.approx(measures.juilland_d([2, 1], [14, 6])),
+        'dp': pytest.approx(measures.dp([2, 1], [14, 6])),
+        'regions': {0: (2, 2 / 14), 1: (1, 1 / 6)}
+    }
+
+
+def test_metadata_of_elements_with_a_common_prefix():
+    words = 'The cat sat . A cat met . The cat ran .'.split()
+    server = FakeCQiServer(
+        {
+            'TOY': FakeCorpus(
+                words,
+                {
+                    'text_id': ([(0, 7), (8, 11)], ['a', 'b']),
+                    # Not part of text, nor sharing its regions
+                    'text_part_id': (
+                        [(0, 3), (4, 7), (8, 10)],
+                        ['a1', 'a2', 'b1']
+                    )
+                }
+            )
+        }
+    )
+    try:
+        client = cqi.CQiClient(server.host, server.port, timeout=5.0)
+        client.connect('anonymous', '')
+        corpus = client.corpora.get('TOY')
+        corpus.query('Stops', '"\\.";')
+        subcorpus = corpus.subcorpora.get('Stops')
+        s_attrs = corpus.structural_attributes.list()
+        num_commands = len(server.commands)
+        assert subcorpus.metadata(s_attrs) == {
+            'text_id': ['a', 'a', 'b'],
+            'text_part_id': ['a1', 'a2', '']
+        }
+        assert server.commands[num_commands:].count('CL_CPOS2STRUC') == 2
+    finally:
+        server.stop()
+
+
+def test_aligned_regions(parallel_client):
+    server, client = parallel_client
+    corpus = client.corpora.get('TOY_EN')
+    toy_de = corpus.alignment_attributes.get('toy_de')
+    de_word = client.corpora.get('TOY_DE').positional_attributes.get('word')
+    corpus.query('Cats', '"cat";')
+    subcorpus = corpus.subcorpora.get('Cats')
+    # The third match is in the last sentence, which is not aligned
+    assert subcorpus.aligned_regions(toy_de, de_word) == [
+        ['Die', 'Katze', 'sass', '.'],
+        ['Ein', 'Hund', 'und', 'eine', 'Katze', 'trafen', 'sich', '.'],
+        None
+    ]
+    assert server.count('CL_ALG2CPOS') == 2
+    # The alignment table is downloaded once and then used locally
+    assert subcorpus.aligned_regions(toy_de, de_word, first=1, last=2) == [
+        ['Ein', 'Hund', 'und', 'eine', 'Katze', 'trafen', 'sich', '.'],
+        None
+    ]
+    assert server.count('CL_ALG2CPOS') == 2
+    assert server.count('CL_CPOS2ALG') == 0
+
+
+def test_samples_are_reproducible(corpus):
+    corpus.query('Tokens', '[];')
+    subcorpus = corpus.subcorpora.get('Tokens')
+    sample = subcorpus.sample(5, seed=1)
+    assert len(sample) == 5
+    assert all(match == matchend for match, matchend in sample)
+    assert subcorpus.sample(5, seed=1) == sample
+    assert len(subcorpus.sample(30)) == 20
+
+
+def test_nearby_sampled_indices_are_dumped_together(server, corpus):
+    corpus.query('Tokens', '[];')
+    subcorpus = corpus.subcorpora.get('Tokens')
+    subcorpus.size
+    num_dumps = server.count('CQP_DUMP_SUBCORPUS')
+    # All indices are less than two apart and form one range
+    subcorpus.sample(20, seed=1, max_gap=2)
+    assert server.count('CQP_DUMP_SUBCORPUS') == num_dumps + 2
+    subcorpus.sample(20, seed=1, max_gap=1)
+    assert server.count('CQP_DUMP_SUBCORPUS') == num_dumps + 2 + 40
+
+
+def test_sort_by_the_following_token(corpus):
+    word = corpus.positional_attributes.get('word')
+    corpus.query('Cats', '"cat";')
+    cats = corpus.subcorpora.get('Cats')
+    # The cats are followed by sat, met and saw
+    assert list(cats.sort_by(word).order) == [1, 0, 2]
+    assert list(cats.sort_by(word, reverse=True).order) == [2, 0, 1]
+    corpus.query('Stops', '"\\.";')
+    stops = corpus.subcorpora.get('Stops')
+    # The last full stop is followed by no token at all, which comes first
+    assert list(stops.sort_by(word).order) == [2, 0, 1]
+
+
+def test_sorted_pages_are_dumped_on_request(server, corpus):
+    word = corpus.positional_attributes.get('word')
+    corpus.query('Cats', '"cat";')
+    sorted_matches = corpus.subcorpora.get('Cats').sort_by(word)
+    num_dumps = server.count('CQP_DUMP_SUBCORPUS')
+    assert len(sorted_matches) == 3
+    assert server.count('CQP_DUMP_SUBCORPUS') == num_dumps
+    assert sorted_matches.page(0, page_size=2) == [(11, 11), (1, 1)]
+    assert server.count('CQP_DUMP_SUBCORPUS') == num_dumps + 2
+    assert sorted_matches.page(1, page_size=2) == [(15, 15)]
@@ -0,0 +1,69 @@
+from array import array
+from cqi.tables import AlignmentTable, FacetIndex, RegionTable
+
+
+def test_region_table():
+    regions = RegionTable([(0, 6), (7, 13), (15, 19)])
+    assert len(regions) == 3
+    assert regions.cpos_by_id(1) == (7, 13)
+    assert regions.ids_by_cpos([0, 6, 7, 14, 19, 20, -1]) == (
+        [0, 0, 1, -1, 2, -1, -1]
+    )
+    assert regions.sizes() == [7, 7, 5]
+
+
+def test_region_table_from_arrays_shares_the_arrays():
+    regions = RegionTable([(0, 6), (7, 13)])
+    arrays = {k: memoryview(v) for k, v in regions.to_arrays().items()}
+    copy = RegionTable.from_arrays(arrays)
+    assert copy.starts is arrays['starts']
+    assert copy.ids_by_cpos([3, 10, 14]) == [0, 1, -1]
+
+
+def test_alignment_table():
+    alignments = AlignmentTable([(0, 6, 100, 104), (7, 13, 105, 112)])
+    assert alignments.cpos_by_id(1) == (7, 13, 105, 112)
+    assert alignments.ids_by_cpos([6, 7, 14]) == [0, 1, -1]
+    assert alignments.target_cpos_by_cpos([6, 14]) == [(100, 104), None]
+    copy = AlignmentTable.from_arrays(alignments.to_arrays())
+    assert copy.ids_by_cpos([6, 7, 14]) == [0, 1, -1]
+
+
+def test_facet_index():
+    regions = RegionTable([(0, 4), (5, 9), (10, 14), (20, 24)])
+    facets = FacetIndex(regions, ['b', 'a', 'b', 'b'])
+    assert facets.values == ['a', 'b']
+    assert facets.codes == array('l', [1, 0, 1, 1])
+    assert facets.values_by_ids([1, 3, 4]) == ['a', 'b', '']
+    assert facets.values_by_cpos([0, 7, 17]) == ['b', 'a', '']
+    assert facets.counts([0, 1, 7, 17]) == {'b': 2, 'a': 1}
+    assert facets.ids(lambda x: x == 'b') == [0, 2, 3]
+    # Adjacent regions are merged
+    assert facets.ranges(lambda x: x == 'a' or x == 'b') == [(0, 14), (20, 24)]
+    assert facets.filter([0, 7, 17], lambda x: x == 'b') == (
+        [True, False, False]
+    )
+
+
+def test_token_table(corpus):
+    word = corpus.positional_attributes.get('word')
+    text_year = corpus.structural_attributes.get('text_year')
+    s = corpus.structural_attributes.get('s')
+    table = corpus.tokens(12, 15, [word], [text_year, s])
+    assert len(table) == 4
+    assert list(table.cpos) == [12, 13, 14, 15]
+    assert table.values('word') == ['met', '.', 'The', 'cat']
+    assert table.values('text_year') == ['1890', '1890', '1920', '1920']
+    assert table.region_starts('s') == [True, False, True, False]
+    assert next(table.rows()) == {
+        'cpos': 12,
+        'word': 'met',
+        'text_year': '1890',
+        's': ''
+    }
+
+
+def test_token_table_without_structural_attributes(corpus):
+    word = corpus.positional_attributes.get('word')
+    table = corpus.tokens(0, 1, [word])
+    assert table.values('word') == ['The', 'cat']